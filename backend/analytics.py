@@ -0,0 +1,165 @@
+"""文献计量统计
+
+把文章列表转换为列式数组（年份、期刊、被引数、关键词），用NumPy做向量化
+聚合：年份分布、高频期刊、被引分位数与h指数、关键词共现。10万篇规模的
+语料在一秒内完成，前端只需接收聚合结果。
+"""
+from typing import Dict, Iterable, List, Optional
+import json
+import numpy as np
+from .cache import redis_client, make_cache_key
+from .exporter import iter_harvest
+
+PERCENTILES = (50, 75, 90, 95, 99)
+KEYWORD_SEPARATORS = " ;；,，"
+
+
+def _normalize_keywords(keywords: Optional[Iterable[str]]) -> List[str]:
+    """去掉详情页关键词后的分隔符，并去重"""
+    normalized = []
+    for keyword in keywords or []:
+        keyword = keyword.strip(KEYWORD_SEPARATORS)
+        if keyword and keyword not in normalized:
+            normalized.append(keyword)
+    return normalized
+
+
+class ArticleColumns:
+    """文章列表的列式表示"""
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.journals: List[str] = []
+        self.dates: List[str] = []
+        self.citations: List[int] = []
+        self.keywords: List[List[str]] = []
+
+    def append(self, article: Dict) -> None:
+        self.ids.append(article.get("id", ""))
+        self.journals.append(article.get("journal") or "")
+        self.dates.append(article.get("date") or "")
+        self.citations.append(int(article.get("citations") or 0))
+        self.keywords.append(_normalize_keywords(article.get("keywords")))
+
+    @classmethod
+    def from_articles(cls, articles: Iterable[Dict]) -> "ArticleColumns":
+        columns = cls()
+        for article in articles:
+            columns.append(article)
+        return columns
+
+    @classmethod
+    def from_harvest(cls, harvest: Dict) -> "ArticleColumns":
+        """逐条读取采集输出，只读到最后一次提交的位置；尚未写出第一页时为空"""
+        return cls.from_articles(iter_harvest(harvest))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def fill_cached_keywords(self, batch_size: int = 1000) -> int:
+        """检索结果不含关键词，从已缓存的文章详情中补全；返回补全的篇数"""
+        missing = [i for i, keywords in enumerate(self.keywords) if not keywords]
+        filled = 0
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            values = redis_client.mget(
+                [make_cache_key("summary_stale", self.ids[i]) for i in batch] +
+                [make_cache_key("article", self.ids[i]) for i in batch]
+            )
+            for i, summary, detail in zip(batch, values[:len(batch)], values[len(batch):]):
+                # 优先取完整分析中的详情，其次是单独缓存的文章详情（fast模式、预热写入）
+                if summary:
+                    info = json.loads(summary)["data"]["article_info"]
+                elif detail:
+                    info = json.loads(detail)
+                else:
+                    continue
+                self.keywords[i] = _normalize_keywords(info.get("keywords"))
+                filled += 1
+        return filled
+
+
+def _factorize(values: Iterable[str]):
+    """把字符串映射为整数编码（哈希，O(n)），比对object数组排序去重快得多"""
+    index: Dict[str, int] = {}
+    codes = np.fromiter((index.setdefault(v, len(index)) for v in values), dtype=np.int64)
+    return list(index), codes
+
+
+def year_distribution(dates: List[str]) -> Dict[str, int]:
+    years = np.array([d[:4] if d[:4].isdigit() else "0" for d in dates], dtype=np.int32)
+    years = years[years > 0]
+    if years.size == 0:
+        return {}
+    values, counts = np.unique(years, return_counts=True)
+    return {str(year): int(count) for year, count in zip(values, counts)}
+
+
+def top_counts(values: List[str], top_n: int) -> List[Dict]:
+    names, codes = _factorize(v for v in values if v)
+    if codes.size == 0:
+        return []
+    counts = np.bincount(codes)
+    order = np.argsort(-counts, kind="stable")[:top_n]
+    return [{"name": names[i], "count": int(counts[i])} for i in order]
+
+
+def citation_stats(citations: List[int]) -> Dict:
+    array = np.asarray(citations, dtype=np.int64)
+    if array.size == 0:
+        return {"count": 0}
+    ranked = np.sort(array)[::-1]
+    h_index = int(np.sum(ranked >= np.arange(1, ranked.size + 1)))
+    return {
+        "count": int(array.size),
+        "total": int(array.sum()),
+        "mean": float(array.mean()),
+        "max": int(ranked[0]),
+        "uncited": int(np.count_nonzero(array == 0)),
+        "h_index": h_index,
+        "percentiles": {
+            f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(array, PERCENTILES))
+        }
+    }
+
+
+def keyword_cooccurrence(keywords: List[List[str]], top_n: int) -> Dict:
+    """高频关键词及其两两共现次数（文章×关键词的0/1矩阵相乘）"""
+    names, inverse = _factorize(k for article_keywords in keywords for k in article_keywords)
+    if inverse.size == 0:
+        return {"keywords": [], "pairs": []}
+
+    frequency = np.bincount(inverse)
+    top = np.argsort(-frequency, kind="stable")[:top_n]
+    column = np.full(len(names), -1, dtype=np.int64)
+    column[top] = np.arange(top.size)
+
+    lengths = np.fromiter((len(k) for k in keywords), dtype=np.int64, count=len(keywords))
+    rows = np.repeat(np.arange(len(keywords)), lengths)
+    cols = column[inverse]
+    keep = cols >= 0
+    matrix = np.zeros((len(keywords), top.size), dtype=np.float32)
+    matrix[rows[keep], cols[keep]] = 1.0
+    cooccurrence = matrix.T @ matrix
+
+    upper_i, upper_j = np.triu_indices(top.size, k=1)
+    counts = cooccurrence[upper_i, upper_j]
+    order = np.argsort(-counts, kind="stable")
+    order = order[counts[order] > 0][:top_n]
+    return {
+        "keywords": [{"name": names[i], "count": int(frequency[i])} for i in top],
+        "pairs": [
+            {"source": names[top[upper_i[k]]], "target": names[top[upper_j[k]]], "count": int(counts[k])}
+            for k in order
+        ]
+    }
+
+
+def analyze(columns: ArticleColumns, top_n: int = 20) -> Dict:
+    return {
+        "article_count": len(columns),
+        "year_distribution": year_distribution(columns.dates),
+        "top_journals": top_counts(columns.journals, top_n),
+        "citations": citation_stats(columns.citations),
+        "keyword_cooccurrence": keyword_cooccurrence(columns.keywords, top_n)
+    }
@@ -1,16 +1,108 @@
-import redis
 import logging
 import json
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Dict, Optional
 import asyncio
 import random
+import threading
+import time
+from fastapi import Request
+import redis.asyncio as aioredis
+from .config import REDIS_URL, BAN_CACHE_SIZE, BAN_CACHE_ALLOW_TTL
+from .monitoring import create_redis_client, ANTI_CRAWLER_DELAY, CACHE_REQUESTS
 
 logger = logging.getLogger(__name__)
 
+redis_client = create_redis_client(REDIS_URL)
+
+BAN_CHANNEL = "ip_bans:updates"
+
+
+class BanCache:
+    """进程内的IP封禁判定缓存
+
+    封禁结果缓存到封禁到期为止；未封禁结果缓存 allow_ttl 秒。任一worker封禁或解封IP时
+    通过Redis发布订阅通知所有worker更新本地结果，因此"未封禁"可以放心缓存，
+    allow_ttl只是订阅断开期间漏掉通知时的兜底。
+    """
+
+    def __init__(self, max_size: int = BAN_CACHE_SIZE, allow_ttl: float = BAN_CACHE_ALLOW_TTL):
+        self.max_size = max_size
+        self.allow_ttl = allow_ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # ip -> (到期时间, 是否封禁)
+        self._lock = threading.Lock()
+
+    def get(self, ip: str) -> Optional[bool]:
+        with self._lock:
+            entry = self._entries.get(ip)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[ip]
+                return None
+            self._entries.move_to_end(ip)
+            return entry[1]
+
+    def set(self, ip: str, banned: bool, ttl: Optional[float] = None) -> None:
+        ttl = self.allow_ttl if ttl is None else ttl
+        if ttl <= 0 or self.max_size <= 0:
+            self.discard(ip)
+            return
+        with self._lock:
+            self._entries[ip] = (time.monotonic() + ttl, banned)
+            self._entries.move_to_end(ip)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, ip: str) -> None:
+        with self._lock:
+            self._entries.pop(ip, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def apply(self, message: Dict) -> None:
+        """处理其他worker发布的封禁变更，ttl为0表示解封"""
+        if message["ttl"] > 0:
+            self.set(message["ip"], True, message["ttl"])
+        else:
+            self.set(message["ip"], False)
+
+    async def listen(self, client: Optional[aioredis.Redis] = None) -> None:
+        """订阅封禁变更；每次（重新）订阅时清空本地结果，避免沿用断开期间错过的状态
+
+        使用 redis.asyncio 在事件循环中等待消息，不占用线程池线程；取消任务即停止订阅。
+        """
+        owns_client = client is None
+        client = client or aioredis.from_url(REDIS_URL)
+        try:
+            while True:
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                try:
+                    await pubsub.subscribe(BAN_CHANNEL)
+                    self.clear()
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self.apply(json.loads(message["data"]))
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error("订阅IP封禁变更失败: %s", e)
+                    await asyncio.sleep(5)
+                finally:
+                    await pubsub.aclose()
+        finally:
+            if owns_client:
+                await client.aclose()
+
+
+ban_cache = BanCache()
+
 class AntiCrawlerHandler:
     def __init__(self):
-        self.redis_client = redis.from_url("redis://localhost:6379/0")
+        self.redis_client = create_redis_client(REDIS_URL)
         self.ip_pattern_key = "ip_patterns:{}"
         self.ip_ban_key = "ip_bans:{}"
         self.request_interval_key = "request_intervals:{}"
@@ -25,16 +117,40 @@ class AntiCrawlerHandler:
         
         # 根据模式分数调整延迟
         if pattern_score > 0.8:  # 高风险
-            return base_delay * 3
+            delay = base_delay * 3
         elif pattern_score > 0.5:  # 中风险
-            return base_delay * 2
-        return base_delay
+            delay = base_delay * 2
+        else:
+            delay = base_delay
+            
+        ANTI_CRAWLER_DELAY.observe(delay)
+        return delay
     
     @staticmethod
     async def is_ip_banned(ip: str) -> bool:
-        """检查IP是否被封禁"""
+        """检查IP是否被封禁，优先使用进程内缓存"""
+        banned = ban_cache.get(ip)
+        if banned is not None:
+            CACHE_REQUESTS.labels(cache="ip_ban", result="local_hit").inc()
+            return banned
+        
+        CACHE_REQUESTS.labels(cache="ip_ban", result="miss").inc()
+        ban_key = f"ip_bans:{ip}"
+        ttl_ms = redis_client.pttl(ban_key)  # -2: 不存在，-1: 没有过期时间
+        banned = ttl_ms != -2
+        ban_cache.set(ip, banned, ttl_ms / 1000 if ttl_ms > 0 else None)
+        return banned
+    
+    @staticmethod
+    def ban_ip(ip: str, duration: int) -> None:
+        """封禁IP并通知所有worker；duration为0表示解封"""
         ban_key = f"ip_bans:{ip}"
-        return bool(redis_client.exists(ban_key))
+        if duration > 0:
+            redis_client.setex(ban_key, duration, "1")
+        else:
+            redis_client.delete(ban_key)
+        ban_cache.apply({"ip": ip, "ttl": duration})
+        redis_client.publish(BAN_CHANNEL, json.dumps({"ip": ip, "ttl": duration}))
     
     @staticmethod
     async def record_request_pattern(ip: str, request: Request) -> None:
@@ -98,18 +214,17 @@ class AntiCrawlerHandler:
     @staticmethod
     async def handle_access_denied(ip: str) -> None:
         """处理访问被拒绝的情况"""
-        ban_key = f"ip_bans:{ip}"
         pattern_score = await AntiCrawlerHandler._get_pattern_score(ip)
         
         if pattern_score > 0.8:
             # 高风险IP，封禁24小时
-            redis_client.setex(ban_key, 86400, "1")
+            AntiCrawlerHandler.ban_ip(ip, 86400)
         elif pattern_score > 0.5:
             # 中风险IP，封禁1小时
-            redis_client.setex(ban_key, 3600, "1")
+            AntiCrawlerHandler.ban_ip(ip, 3600)
         else:
             # 低风险IP，封禁10分钟
-            redis_client.setex(ban_key, 600, "1")
+            AntiCrawlerHandler.ban_ip(ip, 600)
             
     async def monitor_ip_status(self) -> None:
         """监控IP状态的后台任务"""
@@ -128,7 +243,7 @@ class AntiCrawlerHandler:
                 await asyncio.sleep(3600)  # 每小时执行一次
                 
             except Exception as e:
-                logger.error(f"监控IP状态时出错: {str(e)}")
+                logger.error("监控IP状态时出错: %s", e)
                 await asyncio.sleep(60)
                 
     async def close(self) -> None:
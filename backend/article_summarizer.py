@@ -1,46 +1,123 @@
 import os
-from typing import Dict, List
+from typing import Dict, List, Optional
 import logging
 import json
 import httpx
 from datetime import datetime
+from contextlib import asynccontextmanager
+from .config import DEEPSEEK_API_BASE
+from .monitoring import LLM_LATENCY, LLM_TOKENS, QUEUE_DEPTH
+from .llm_scheduler import INTERACTIVE, llm_scheduler
+from .circuit_breaker import CircuitOpenError, get_breaker
+from .extractive_summarizer import ExtractiveSummarizer
+from .tracing import span
+import time
+from urllib.parse import urlparse
 
 logger = logging.getLogger(__name__)
 
 class ArticleSummarizer:
-    def __init__(self):
+    def __init__(
+        self,
+        user: Optional[str] = None,
+        priority: str = INTERACTIVE,
+        fallback: bool = True,
+        client: Optional[httpx.AsyncClient] = None
+    ):
+        self.user = user  # 用于大模型调度的公平排队
+        self.priority = priority
+        self.fallback = fallback  # 大模型熔断或额度耗尽时是否退化为抽取式摘要
+        self.client = client  # 共享连接池的客户端；未提供时每次调用临时创建
         self.api_key = os.getenv("DEEPSEEK_API_KEY")
         if not self.api_key:
             raise ValueError("未设置DEEPSEEK_API_KEY环境变量")
             
-        self.api_base = "https://api.deepseek.com/v1"
+        self.api_base = DEEPSEEK_API_BASE
         self.model = "deepseek-chat-7b"  # 使用DeepSeek的中文模型
+        self.breaker = get_breaker(urlparse(self.api_base).netloc)
         
-    async def _call_api(self, messages: List[Dict], temperature: float = 0.7) -> str:
+    @asynccontextmanager
+    async def _client(self):
+        if self.client is not None:
+            yield self.client
+        else:
+            async with httpx.AsyncClient() as client:
+                yield client
+        
+    async def _call_api(self, messages: List[Dict], temperature: float = 0.7, section: str = "general") -> str:
         """调用DeepSeek API"""
+        start_time = time.perf_counter()
+        outcome = "error"
+        QUEUE_DEPTH.labels(queue="llm").inc()
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.api_base}/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": self.model,
-                        "messages": messages,
-                        "temperature": temperature,
-                        "max_tokens": 2000,
-                        "stream": False
-                    },
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                return response.json()["choices"][0]["message"]["content"]
+            with span("llm.chat", section=section, model=self.model, priority=self.priority) as llm_span:
+                # 熔断中不必排队；半开探测名额在拿到调度名额后才占用，排队时被取消不会占着名额
+                self.breaker.raise_if_open()
+                # 排队等待调度名额，等待时间单独计入 llm_queue_wait_seconds
+                with span("llm.queue"):
+                    await llm_scheduler.acquire(self.user, self.priority)
+                start_time = time.perf_counter()
+                try:
+                    self.breaker.check()
+                    try:
+                        async with self._client() as client:
+                            response = await client.post(
+                                f"{self.api_base}/chat/completions",
+                                headers={
+                                    "Authorization": f"Bearer {self.api_key}",
+                                    "Content-Type": "application/json",
+                                    "traceparent": llm_span.traceparent
+                                },
+                                json={
+                                    "model": self.model,
+                                    "messages": messages,
+                                    "temperature": temperature,
+                                    "max_tokens": 2000,
+                                    "stream": False
+                                },
+                                timeout=30.0
+                            )
+                            llm_span.set_attribute("http.status_code", response.status_code)
+                            if response.status_code in (402, 429):
+                                # 余额不足或超出限额：立即熔断，后续请求直接走降级
+                                self.breaker.trip()
+                                raise CircuitOpenError(self.breaker.name, self.breaker.retry_after)
+                            response.raise_for_status()
+                            result = response.json()
+                            content = result["choices"][0]["message"]["content"]
+                        self.breaker.record_success()
+                    except CircuitOpenError:
+                        raise
+                    except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                        if isinstance(e, httpx.HTTPStatusError) and e.response.status_code < 500:
+                            self.breaker.record_success()  # 服务可达，错误在请求本身
+                        else:
+                            self.breaker.record_failure()
+                        raise
+                    except Exception:
+                        self.breaker.record_failure()  # 响应不是预期的JSON结构
+                        raise
+                    except BaseException:
+                        # 请求被取消时没有结果，归还半开探测名额
+                        self.breaker.release()
+                        raise
+                finally:
+                    llm_scheduler.release()
+
+                usage = result.get("usage") or {}
+                for kind in ("prompt_tokens", "completion_tokens"):
+                    if kind in usage:
+                        llm_span.set_attribute(f"llm.usage.{kind}", usage[kind])
+                        LLM_TOKENS.labels(section=section, kind=kind).observe(usage[kind])
+                outcome = "ok"
+                return content
                 
         except Exception as e:
-            logger.error(f"调用DeepSeek API失败: {str(e)}")
+            logger.error("调用DeepSeek API失败: %s", e)
             raise
+        finally:
+            QUEUE_DEPTH.labels(queue="llm").dec()
+            LLM_LATENCY.labels(section=section, outcome=outcome).observe(time.perf_counter() - start_time)
     
     def _build_summary_prompt(self, content: Dict) -> str:
         """构建总结提示词"""
@@ -132,21 +209,21 @@ class ArticleSummarizer:
             summary = await self._call_api([{
                 "role": "user",
                 "content": summary_prompt
-            }])
+            }], section="summary")
 
             # 分析研究方法
             methodology_prompt = self._build_methodology_prompt(content)
             methodology_analysis = await self._call_api([{
                 "role": "user",
                 "content": methodology_prompt
-            }])
+            }], section="methodology")
 
             # 分析创新点
             innovation_prompt = self._build_innovation_prompt(content)
             innovation_analysis = await self._call_api([{
                 "role": "user",
                 "content": innovation_prompt
-            }])
+            }], section="innovation")
 
             return {
                 "summary": summary,
@@ -159,8 +236,15 @@ class ArticleSummarizer:
                 }
             }
 
+        except CircuitOpenError as e:
+            if not self.fallback:
+                raise
+            logger.warning("大模型不可用，使用抽取式摘要: %s", e)
+            result = ExtractiveSummarizer().summarize(content)
+            result["fallback_reason"] = str(e)
+            return result
         except Exception as e:
-            logger.error(f"生成文献分析失败: {str(e)}")
+            logger.error("生成文献分析失败: %s", e)
             return {
                 "error": str(e),
                 "generated_at": datetime.now().isoformat()
@@ -186,8 +270,8 @@ class ArticleSummarizer:
             return await self._call_api([{
                 "role": "user",
                 "content": prompt
-            }])
+            }], section="references")
             
         except Exception as e:
-            logger.error(f"分析参考文献失败: {str(e)}")
+            logger.error("分析参考文献失败: %s", e)
             return f"分析参考文献时发生错误：{str(e)}" 
\ No newline at end of file
@@ -3,12 +3,14 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from typing import Optional
+from .config import ADMIN_USERS
 
 SECRET_KEY = "your-secret-key"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -30,4 +32,31 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
             raise credentials_exception
         return username
     except JWTError:
-        raise credentials_exception 
\ No newline at end of file
+        raise credentials_exception 
+
+async def get_optional_user(token: Optional[str] = Depends(optional_oauth2_scheme)) -> Optional[str]:
+    """允许匿名访问的接口使用：令牌有效时返回用户名，否则返回None"""
+    if not token:
+        return None
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        return None
+
+async def get_admin_user(username: str = Depends(get_current_user)):
+    if username not in ADMIN_USERS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="需要管理员权限",
+        )
+    return username
+
+def is_admin_token(authorization: Optional[str]) -> bool:
+    """校验Authorization头中的Bearer令牌是否属于管理员（供中间件使用）"""
+    if not authorization or not authorization.startswith("Bearer "):
+        return False
+    try:
+        payload = jwt.decode(authorization[len("Bearer "):], SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return False
+    return payload.get("sub") in ADMIN_USERS
\ No newline at end of file
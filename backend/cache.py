@@ -1,33 +1,106 @@
+from collections import OrderedDict
 from functools import wraps
+import hashlib
 import json
-from typing import Optional
-import redis
-from .config import REDIS_URL
+import threading
+import time
+from typing import Any, Optional
+from .config import REDIS_URL, CACHE_L1_SIZE, CACHE_L1_TTL
+from .monitoring import create_redis_client, CACHE_REQUESTS
+from .tracing import span
 
-redis_client = redis.from_url(REDIS_URL)
+redis_client = create_redis_client(REDIS_URL)
+
+
+class LocalCache:
+    """进程内L1缓存（LRU + 短TTL），位于共享的Redis（L2）之前
+
+    保存序列化后的JSON，读取时重新解析，调用方修改返回值不会影响缓存。
+    其他worker写入的新值最多延迟ttl秒可见。
+    """
+
+    def __init__(self, max_size: int = CACHE_L1_SIZE, ttl: float = CACHE_L1_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: bytes) -> None:
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+local_cache = LocalCache()
+
+def make_cache_key(prefix: str, *parts: Any) -> str:
+    """生成稳定的缓存键（内置hash()在不同进程间不一致，不能用于共享缓存）"""
+    digest = hashlib.sha1(json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str).encode()).hexdigest()
+    return f"{prefix}:{digest}"
+
+def get_cached(cache_key: str, cache: str) -> Optional[Any]:
+    """读取缓存（先本进程L1，再Redis），未命中返回None"""
+    cached_result = local_cache.get(cache_key)
+    if cached_result is not None:
+        CACHE_REQUESTS.labels(cache=cache, result="local_hit").inc()
+        return json.loads(cached_result)
+    
+    with span("cache.lookup", cache=cache) as lookup:
+        cached_result = redis_client.get(cache_key)
+        lookup.set_attribute("cache.hit", bool(cached_result))
+    if cached_result:
+        CACHE_REQUESTS.labels(cache=cache, result="hit").inc()
+        local_cache.set(cache_key, cached_result)
+        return json.loads(cached_result)
+    CACHE_REQUESTS.labels(cache=cache, result="miss").inc()
+    return None
+
+def set_cached(cache_key: str, value: Any, expire_time: int) -> None:
+    serialized = json.dumps(value, ensure_ascii=False)
+    redis_client.setex(
+        cache_key,
+        expire_time,
+        serialized
+    )
+    local_cache.set(cache_key, serialized.encode())
 
 def cache_result(expire_time: int = 3600):
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
             # 生成缓存键
-            cache_key = f"{func.__name__}:{hash(str(args) + str(kwargs))}"
+            cache_key = make_cache_key(func.__name__, args, kwargs)
             
             # 尝试从缓存获取
-            cached_result = redis_client.get(cache_key)
-            if cached_result:
-                return json.loads(cached_result)
+            cached_result = get_cached(cache_key, func.__name__)
+            if cached_result is not None:
+                return cached_result
             
             # 执行原函数
             result = await func(*args, **kwargs)
             
             # 存入缓存
-            redis_client.setex(
-                cache_key,
-                expire_time,
-                json.dumps(result)
-            )
+            set_cached(cache_key, result, expire_time)
             
             return result
         return wrapper
-    return decorator 
\ No newline at end of file
+    return decorator
\ No newline at end of file
@@ -0,0 +1,171 @@
+from collections import deque
+from typing import Callable, Dict
+import logging
+import threading
+import time
+from .config import (
+    BREAKER_FAILURE_THRESHOLD, BREAKER_RECOVERY_TIMEOUT, RETRY_BUDGET_RATIO, RETRY_BUDGET_MIN_PER_SECOND
+)
+from .monitoring import CIRCUIT_STATE, UPSTREAM_RETRIES
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开时快速失败"""
+
+    def __init__(self, host: str, retry_after: float):
+        super().__init__(f"上游服务 {host} 暂时不可用（熔断中），{retry_after:.0f}秒后重试")
+        self.host = host
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    _STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+        self._lock = threading.Lock()
+        self._set_state(self.CLOSED)
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            logger.warning("熔断器 %s: %s -> %s", self.name, self.state, state)
+        self.state = state
+        CIRCUIT_STATE.labels(host=self.name).set(self._STATE_VALUES[state])
+
+    @property
+    def retry_after(self) -> float:
+        return max(self.opened_at + self.recovery_timeout - self.clock(), 0.0)
+
+    def is_open(self) -> bool:
+        """熔断中且未到恢复时间（不占用半开探测名额）"""
+        return self.state == self.OPEN and self.retry_after > 0
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN:
+                if self.retry_after > 0:
+                    return False
+                self._set_state(self.HALF_OPEN)
+                self.half_open_calls = 0
+
+            if self.state == self.HALF_OPEN:
+                if self.half_open_calls >= self.half_open_max_calls:
+                    return False
+                self.half_open_calls += 1
+            return True
+
+    def raise_if_open(self) -> None:
+        """熔断中时快速失败，用于在执行昂贵的前置步骤前提前判断"""
+        if self.is_open():
+            raise CircuitOpenError(self.name, self.retry_after)
+
+    def check(self) -> None:
+        if not self.allow_request():
+            raise CircuitOpenError(self.name, self.retry_after)
+
+    def release(self) -> None:
+        """归还未得出结果的半开探测名额（如请求被取消），不改变熔断状态"""
+        with self._lock:
+            if self.state == self.HALF_OPEN and self.half_open_calls > 0:
+                self.half_open_calls -= 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._set_state(self.CLOSED)
+
+    def trip(self) -> None:
+        """立即熔断（如大模型额度耗尽），不等待失败次数达到阈值"""
+        with self._lock:
+            self.opened_at = self.clock()
+            self._set_state(self.OPEN)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+                self._set_state(self.OPEN)
+
+
+class RetryBudget:
+    """全局重试预算：窗口内重试次数不超过 请求数×ratio + 每秒保底次数×窗口长度"""
+
+    def __init__(
+        self,
+        ratio: float = 0.2,
+        min_per_second: float = 1.0,
+        window: float = 10.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window = window
+        self.clock = clock
+        self._requests: deque = deque()
+        self._retries: deque = deque()
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float) -> None:
+        for events in (self._requests, self._retries):
+            while events and events[0] <= now - self.window:
+                events.popleft()
+
+    def record_request(self) -> None:
+        with self._lock:
+            now = self.clock()
+            self._expire(now)
+            self._requests.append(now)
+
+    def try_acquire(self) -> bool:
+        """申请一次重试，预算耗尽时返回False"""
+        with self._lock:
+            now = self.clock()
+            self._expire(now)
+            allowed = len(self._requests) * self.ratio + self.min_per_second * self.window
+            if len(self._retries) >= allowed:
+                UPSTREAM_RETRIES.labels(outcome="budget_exhausted").inc()
+                return False
+            self._retries.append(now)
+            UPSTREAM_RETRIES.labels(outcome="allowed").inc()
+            return True
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(host: str) -> CircuitBreaker:
+    """按上游主机获取熔断器"""
+    with _breakers_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker(
+                host,
+                failure_threshold=BREAKER_FAILURE_THRESHOLD,
+                recovery_timeout=BREAKER_RECOVERY_TIMEOUT
+            )
+        return _breakers[host]
+
+
+retry_budget = RetryBudget(ratio=RETRY_BUDGET_RATIO, min_per_second=RETRY_BUDGET_MIN_PER_SECOND)
@@ -0,0 +1,301 @@
+"""本地引文网络
+
+把详情页中的参考文献字符串解析为 标题/作者/年份/来源，按规范化标题与已知
+文献（检索、采集过的文章）关联，存入SQLite。查询时把边表加载为CSR邻接数组
+（indptr/indices），出边、入边、同被引（co-citation）都是数组切片与bincount；
+图有写入后，下一次查询从SQLite重新加载全部边并重建邻接数组（O(E)，多次写入
+只在查询时重建一次）；PageRank以上一次的结果为迭代初值（热启动），通常几轮即可
+收敛，但不是增量维护。多个worker进程共用同一个数据库文件：节点编号在写事务内
+分配，其他进程提交的写入通过 PRAGMA data_version 发现。
+"""
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import numpy as np
+from .config import CITATION_DB_PATH
+
+logger = logging.getLogger(__name__)
+
+# GB/T 7714：作者.题名[文献类型标识]//来源 或 .来源,年,卷(期):页码.
+REFERENCE_PATTERN = re.compile(
+    r"^(?P<authors>[^.]+?)\.\s*(?P<title>.+?)\s*\[(?P<type>[A-Z]+(?:/OL)?)\]\s*(?://|\.)?\s*(?P<rest>.*)$"
+)
+YEAR_PATTERN = re.compile(r"(?<!\d)(19|20)\d{2}(?!\d)")
+AUTHOR_SEPARATORS = re.compile(r"[,，;；、]")
+
+
+def title_key(title: str) -> str:
+    """规范化标题：小写并去掉空白与标点，用于匹配同一篇文献"""
+    return re.sub(r"[\W_]+", "", (title or "").lower())
+
+
+def parse_reference(text: str) -> Dict:
+    """解析一条参考文献，无法识别格式时整条作为标题"""
+    text = re.sub(r"^\s*\[\d+\]\s*", "", text or "").strip()
+    match = REFERENCE_PATTERN.match(text)
+    if match is None:
+        year = YEAR_PATTERN.search(text)
+        return {"title": text, "authors": [], "year": int(year.group()) if year else None, "venue": "", "type": ""}
+
+    rest = match.group("rest")
+    year = YEAR_PATTERN.search(rest)
+    venue = rest[:year.start()] if year else rest
+    authors = [
+        a.strip() for a in AUTHOR_SEPARATORS.split(match.group("authors"))
+        if a.strip() and a.strip() not in ("et al", "等")
+    ]
+    return {
+        "title": match.group("title").strip(),
+        "authors": authors,
+        "year": int(year.group()) if year else None,
+        "venue": re.split(r"[,，.]\s*", venue.strip())[0].strip(),
+        "type": match.group("type")
+    }
+
+
+class CitationGraph:
+    def __init__(self, path: str, damping: float = 0.85):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.damping = damping
+        self._lock = threading.Lock()
+        with self._lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS nodes (
+                    idx INTEGER PRIMARY KEY,
+                    id TEXT NOT NULL UNIQUE,
+                    title TEXT NOT NULL,
+                    title_key TEXT NOT NULL,
+                    meta TEXT NOT NULL,
+                    known INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS nodes_title_key ON nodes (title_key);
+                CREATE TABLE IF NOT EXISTS edges (
+                    src INTEGER NOT NULL,
+                    dst INTEGER NOT NULL,
+                    PRIMARY KEY (src, dst)
+                ) WITHOUT ROWID;
+            """)
+        self._version = 0  # 本连接每次写入递增；其他连接的写入体现在 data_version 中
+        self._built_version: Optional[Tuple[int, int]] = None
+        self._out: Tuple[np.ndarray, np.ndarray] = (np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int32))
+        self._in: Tuple[np.ndarray, np.ndarray] = (np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int32))
+        self._ranks = np.zeros(0)
+        self._pending: Set[asyncio.Task] = set()
+
+    # ---- 写入 ----
+
+    @contextmanager
+    def _write(self) -> Iterator[None]:
+        """写事务：BEGIN IMMEDIATE 先取得数据库写锁，多进程写入时分配的节点编号不会冲突"""
+        with self._lock, self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            yield
+            self._version += 1
+
+    def _find(self, article_id: Optional[str], key: str) -> Optional[sqlite3.Row]:
+        if article_id:
+            row = self.conn.execute("SELECT * FROM nodes WHERE id = ?", (article_id,)).fetchone()
+            if row:
+                return row
+        if key:
+            # 已知文献优先，其次是之前的参考文献节点
+            return self.conn.execute(
+                "SELECT * FROM nodes WHERE title_key = ? ORDER BY known DESC, idx LIMIT 1", (key,)
+            ).fetchone()
+        return None
+
+    def _upsert(self, article_id: Optional[str], title: str, meta: Dict) -> int:
+        key = title_key(title)
+        row = self._find(article_id, key)
+        if row is not None and article_id and row["known"] and row["id"] != article_id:
+            row = None  # 标题相同的另一篇已知文献，不合并
+        if row is not None:
+            if article_id:
+                # 之前只作为参考文献出现过的节点成为已知文献时沿用原节点，已有的入边自然保留
+                merged = json.loads(row["meta"]) if row["known"] else {}
+                merged.update({k: v for k, v in meta.items() if v})
+                self.conn.execute(
+                    "UPDATE nodes SET id = ?, title = ?, meta = ?, known = 1 WHERE idx = ?",
+                    (article_id, title or row["title"], json.dumps(merged, ensure_ascii=False), row["idx"])
+                )
+            return row["idx"]
+
+        idx = self.conn.execute("SELECT COALESCE(MAX(idx) + 1, 0) FROM nodes").fetchone()[0]
+        node_id = article_id or f"ref:{hashlib.sha1(key.encode()).hexdigest()[:16]}"
+        self.conn.execute(
+            "INSERT INTO nodes (idx, id, title, title_key, meta, known) VALUES (?, ?, ?, ?, ?, ?)",
+            (idx, node_id, title, key, json.dumps(meta, ensure_ascii=False), int(bool(article_id)))
+        )
+        return idx
+
+    def write_in_background(self, write: Callable, *args) -> None:
+        """在线程中执行写入（如 add_articles），请求既不阻塞事件循环也不等待索引；失败只记录日志"""
+        task = asyncio.get_running_loop().create_task(asyncio.to_thread(write, *args))
+        self._pending.add(task)
+        task.add_done_callback(self._write_done)
+
+    def _write_done(self, task: asyncio.Task) -> None:
+        self._pending.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("写入引文网络失败: %s", task.exception())
+
+    async def flush(self) -> None:
+        """等待后台写入完成（关闭服务时调用）"""
+        await asyncio.gather(*self._pending, return_exceptions=True)
+
+    def add_articles(self, articles: List[Dict]) -> None:
+        """登记检索/采集到的文献，使后续参考文献能够关联到文献ID"""
+        with self._write():
+            for article in articles:
+                self._upsert(article["id"], article.get("title", ""), {
+                    k: article.get(k) for k in ("authors", "journal", "date", "citations")
+                })
+
+    def add_article(self, article_id: str, content: Dict) -> int:
+        """登记一篇文献的详情及其参考文献，返回新增的引用边数"""
+        references = [parse_reference(ref) for ref in content.get("references", [])]
+        with self._write():
+            src = self._upsert(article_id, content.get("title", ""), {"doi": content.get("doi", "")})
+            edges = []
+            for ref in references:
+                if not title_key(ref["title"]):
+                    continue
+                dst = self._upsert(None, ref["title"], {k: ref[k] for k in ("authors", "year", "venue", "type")})
+                if dst != src:
+                    edges.append((src, dst))
+            added = self.conn.executemany("INSERT OR IGNORE INTO edges (src, dst) VALUES (?, ?)", edges).rowcount
+        return max(added, 0)
+
+    # ---- 查询 ----
+
+    @staticmethod
+    def _csr(rows: np.ndarray, cols: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        order = np.argsort(rows, kind="stable")
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+        return indptr, cols[order].astype(np.int32)
+
+    def _ensure_built(self) -> None:
+        """图有写入后重新加载全部边、重建CSR邻接数组，PageRank以上一次结果为初值重新迭代（调用方持有锁）"""
+        version = (self._version, self.conn.execute("PRAGMA data_version").fetchone()[0])
+        if self._built_version == version:
+            return
+        edges = np.array(self.conn.execute("SELECT src, dst FROM edges").fetchall(), dtype=np.int64).reshape(-1, 2)
+        # 节点数在读取边之后取，其他进程并发写入时也能覆盖已读到的边的端点
+        n = self.conn.execute("SELECT COALESCE(MAX(idx) + 1, 0) FROM nodes").fetchone()[0]
+        src, dst = edges[:, 0], edges[:, 1]
+        self._out = self._csr(src, dst, n)
+        self._in = self._csr(dst, src, n)
+        self._ranks = self._pagerank(src, dst, n, self._ranks)
+        self._built_version = version
+
+    def _pagerank(
+        self, src: np.ndarray, dst: np.ndarray, n: int, previous: np.ndarray, tol: float = 1e-8, max_iter: int = 100
+    ) -> np.ndarray:
+        if n == 0:
+            return np.zeros(0)
+        # 以上一次结果为初值（新节点取均值），图只增加少量边时很快收敛
+        ranks = np.full(n, 1.0 / n)
+        ranks[:previous.size] = previous
+        ranks /= ranks.sum()
+
+        out_degree = np.bincount(src, minlength=n).astype(np.float64)
+        dangling = out_degree == 0
+        edge_weight = np.where(dangling, 0.0, 1.0 / np.maximum(out_degree, 1))[src]
+        for iteration in range(max_iter):
+            spread = np.bincount(dst, weights=ranks[src] * edge_weight, minlength=n)
+            new_ranks = (1 - self.damping) / n + self.damping * (spread + ranks[dangling].sum() / n)
+            delta = np.abs(new_ranks - ranks).sum()
+            ranks = new_ranks
+            if delta < tol:
+                break
+        logger.debug("PageRank %s 轮收敛, %s 个节点, %s 条边", iteration + 1, n, src.size)
+        return ranks
+
+    def _node(self, row: sqlite3.Row, ranks: np.ndarray) -> Dict:
+        return {
+            "id": row["id"],
+            "title": row["title"],
+            "known": bool(row["known"]),
+            "pagerank": float(ranks[row["idx"]]) if row["idx"] < ranks.size else 0.0,
+            **json.loads(row["meta"])
+        }
+
+    def _nodes(self, indices: np.ndarray, ranks: np.ndarray) -> List[Dict]:
+        if indices.size == 0:
+            return []
+        placeholders = ",".join("?" * indices.size)
+        rows = self.conn.execute(
+            f"SELECT * FROM nodes WHERE idx IN ({placeholders})", [int(i) for i in indices]
+        ).fetchall()
+        by_idx = {row["idx"]: row for row in rows}
+        return [self._node(by_idx[int(i)], ranks) for i in indices if int(i) in by_idx]
+
+    def neighbors(self, article_id: str, limit: int = 20) -> Optional[Dict]:
+        """参考文献（出边）、施引文献（入边）、同被引文献及PageRank"""
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM nodes WHERE id = ?", (article_id,)).fetchone()
+            if row is None:
+                return None
+            self._ensure_built()
+            idx = row["idx"]
+            out_indptr, out_indices = self._out
+            in_indptr, in_indices = self._in
+            references = out_indices[out_indptr[idx]:out_indptr[idx + 1]]
+            cited_by = in_indices[in_indptr[idx]:in_indptr[idx + 1]]
+            co_cited = self._co_citation(idx, limit)
+            ranks = self._ranks
+
+            result = self._node(row, ranks)
+            result.update({
+                "pagerank_rank": int(np.count_nonzero(ranks > ranks[idx])) + 1,
+                "references": self._nodes(references, ranks),
+                "cited_by": self._nodes(cited_by[:limit], ranks),
+                "cited_by_count": int(cited_by.size),
+                "co_cited": [
+                    {**node, "co_citations": count, "score": score}
+                    for node, (count, score) in zip(self._nodes(co_cited[0], ranks), zip(*co_cited[1:]))
+                ]
+            })
+            return result
+
+    def _co_citation(self, idx: int, limit: int) -> Tuple[np.ndarray, List[int], List[float]]:
+        """与idx被同一篇文献共同引用的次数，score为Salton余弦归一化"""
+        out_indptr, out_indices = self._out
+        in_indptr, in_indices = self._in
+        citers = in_indices[in_indptr[idx]:in_indptr[idx + 1]]
+        if citers.size == 0:
+            return np.zeros(0, dtype=np.int32), [], []
+        starts, ends = out_indptr[citers], out_indptr[citers + 1]
+        co_cited = np.concatenate([out_indices[s:e] for s, e in zip(starts, ends)])
+        counts = np.bincount(co_cited, minlength=self._ranks.size)
+        counts[idx] = 0
+        top = np.argsort(-counts, kind="stable")[:limit]
+        top = top[counts[top] > 0]
+        in_degree = np.diff(in_indptr)
+        scores = counts[top] / np.sqrt(in_degree[top] * citers.size)
+        return top, [int(c) for c in counts[top]], [float(s) for s in scores]
+
+    def top_ranked(self, limit: int = 20, known_only: bool = False) -> List[Dict]:
+        with self._lock:
+            self._ensure_built()
+            ranks = self._ranks
+            order = np.argsort(-ranks, kind="stable")
+            if known_only:
+                known = np.zeros(ranks.size, dtype=bool)
+                known[[r[0] for r in self.conn.execute("SELECT idx FROM nodes WHERE known = 1") if r[0] < ranks.size]] = True
+                order = order[known[order]]
+            return self._nodes(order[:limit], ranks)
+
+
+citation_graph = CitationGraph(CITATION_DB_PATH)
@@ -1,7 +1,7 @@
 import httpx
 from bs4 import BeautifulSoup
 import asyncio
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import random
 import time
 import json
@@ -9,19 +9,48 @@ from fake_useragent import UserAgent
 from datetime import datetime
 import logging
 from .proxy_pool import ProxyPool
+from .config import CNKI_KNS_URL, MAX_RETRIES, RETRY_DELAY, RETRY_BACKOFF_BASE
+from .circuit_breaker import get_breaker, retry_budget
+from .monitoring import (
+    CRAWLER_ERROR_COUNT, PARSE_LATENCY, QUEUE_DEPTH, UPSTREAM_FETCH_LATENCY, track_latency
+)
+from .tracing import span
+from .log_pipeline import record_upstream
+from .session_manager import session_manager
+from urllib.parse import urlparse
 
 logger = logging.getLogger(__name__)
 
+# 检索结果排序字段，relevance 使用上游默认的相关度排序
+SORT_FIELDS = {
+    "date": ("发表时间/(发表时间,'TIME')", "desc"),
+    "citations": ("被引/(被引频次,'INT')", "desc"),
+    "downloads": ("下载/(下载频次,'INT')", "desc"),
+}
+
+class AccessDeniedError(Exception):
+    """上游返回访问受限页面"""
+    pass
+
 class CNKICrawler:
-    def __init__(self, max_papers: int = 100, min_citations: int = 0):
-        self.base_url = "https://kns.cnki.net"
-        self.search_url = "https://kns.cnki.net/kns8/Brief/GetGridTableHtml"
-        self.detail_url = "https://kns.cnki.net/KCMS/detail/detail.aspx"
-        self.ua = UserAgent()
-        self.proxy_pool = ProxyPool()
-        self.session_params = {}
-        self.max_retries = 3
-        self.retry_delay = 5
+    def __init__(
+        self,
+        max_papers: int = 100,
+        min_citations: int = 0,
+        cookie: Optional[Dict] = None,
+        ua: Optional[UserAgent] = None,
+        proxy_pool: Optional[ProxyPool] = None
+    ):
+        self.base_url = CNKI_KNS_URL
+        self.search_url = f"{CNKI_KNS_URL}/kns8/Brief/GetGridTableHtml"
+        self.detail_url = f"{CNKI_KNS_URL}/KCMS/detail/detail.aspx"
+        self.cookie = cookie or {}  # Cookie池中的登录Cookie
+        # UserAgent加载数据较慢，服务内由组件注册表提供共享实例，见 components
+        self.ua = ua or UserAgent()
+        self.proxy_pool = proxy_pool or ProxyPool()
+        self.session_params = {}  # 指向共享会话，见 session_manager
+        self.max_retries = MAX_RETRIES
+        self.retry_delay = RETRY_DELAY  # 退避上限
         self.max_papers = max_papers  # 最大爬取文献数
         self.min_citations = min_citations  # 最小引用数
         
@@ -37,61 +66,80 @@ class CNKICrawler:
             "TE": "Trailers",
         }
     
-    async def _init_session(self) -> None:
-        """初始化会话参数"""
-        try:
-            async with httpx.AsyncClient(headers=self._get_headers()) as client:
-                # 访问首页获取初始Cookie
-                response = await client.get(f"{self.base_url}/kns8/defaultresult/index")
-                self.session_params['cookies'] = dict(response.cookies)
-                
-                # 获取必要的token和参数
-                soup = BeautifulSoup(response.text, 'html.parser')
-                self.session_params['token'] = soup.select_one('input[name="token"]')['value']
-                
-                # 初始化搜索参数
-                init_params = {
-                    "action": "init",
-                    "NaviCode": "*",
-                    "ua": "1.21",
-                    "PageName": "ASP.brief_default_result_aspx",
-                    "DbPrefix": "SCDB",
-                    "DbCatalog": "中国学术文献网络出版总库"
-                }
-                
-                await client.post(
-                    f"{self.base_url}/kns8/Brief/GetGridTableHtml",
-                    data=init_params,
-                    cookies=self.session_params['cookies']
-                )
-                
-        except Exception as e:
-            logger.error(f"初始化会话失败: {str(e)}")
-            raise
+    async def _ensure_session(self, refresh: bool = False) -> None:
+        """从进程内共享的会话管理器获取检索会话，refresh时先使当前会话失效"""
+        if refresh:
+            await session_manager.invalidate(self.session_params)
+        self.session_params = await session_manager.get_session(self._get_headers())
+    
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """5xx、429和网络错误可重试；其余4xx、访问受限等不重试"""
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code >= 500 or error.response.status_code == 429
+        return isinstance(error, httpx.TransportError)
     
     async def _make_request(self, method: str, url: str, **kwargs) -> httpx.Response:
-        """发送请求并处理重试逻辑"""
+        """发送请求并处理熔断、重试预算与指数退避"""
+        parsed_url = urlparse(url)
+        endpoint = parsed_url.path
+        breaker = get_breaker(parsed_url.netloc)
+        retry_budget.record_request()
+        
         for attempt in range(self.max_retries):
-            try:
-                proxy = await self.proxy_pool.get_proxy()
-                async with httpx.AsyncClient(
-                    headers=self._get_headers(),
-                    proxies=proxy,
-                    timeout=30.0
-                ) as client:
-                    response = await getattr(client, method)(url, **kwargs)
-                    response.raise_for_status()
-                    return response
-            except Exception as e:
-                logger.warning(f"请求失败 (尝试 {attempt + 1}/{self.max_retries}): {str(e)}")
-                if attempt == self.max_retries - 1:
+            breaker.check()
+            start_time = time.perf_counter()
+            outcome = "error"
+            with span("upstream.fetch", method=method.upper(), endpoint=endpoint, attempt=attempt + 1) as fetch_span:
+                try:
+                    proxy = await self.proxy_pool.get_proxy()
+                    async with httpx.AsyncClient(
+                        headers=self._get_headers(),
+                        proxies=proxy,
+                        timeout=30.0
+                    ) as client:
+                        with QUEUE_DEPTH.labels(queue="upstream").track_inprogress():
+                            response = await getattr(client, method)(url, **kwargs)
+                        fetch_span.set_attribute("http.status_code", response.status_code)
+                        response.raise_for_status()
+                        if "访问受限" in response.text:
+                            outcome = "denied"
+                            raise AccessDeniedError("访问受限")
+                        outcome = "ok"
+                        breaker.record_success()
+                        return response
+                except Exception as e:
+                    fetch_span.record_exception(e)
+                    retryable = self._is_retryable(e)
+                    if retryable or isinstance(e, AccessDeniedError):
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()  # 上游可达，错误在请求本身
+                    logger.warning("请求失败 (尝试 %s/%s): %s", attempt + 1, self.max_retries, e, extra={
+                        "upstream": endpoint,
+                        "attempt": attempt + 1,
+                        "duration_ms": round((time.perf_counter() - start_time) * 1000, 1)
+                    })
+                    if not retryable or attempt == self.max_retries - 1 or not retry_budget.try_acquire():
+                        raise
+                except BaseException:
+                    # 请求被取消（客户端断开、任务停止）时没有结果，归还探测名额
+                    breaker.release()
                     raise
-                await asyncio.sleep(self.retry_delay * (attempt + 1))
+                finally:
+                    duration = time.perf_counter() - start_time
+                    UPSTREAM_FETCH_LATENCY.labels(endpoint=endpoint, outcome=outcome).observe(duration)
+                    record_upstream(duration)
+            
+            # 指数退避 + 全抖动
+            delay = random.uniform(0, min(self.retry_delay, RETRY_BACKOFF_BASE * 2 ** attempt))
+            with span("upstream.backoff", attempt=attempt + 1, delay=delay):
+                await asyncio.sleep(delay)
     
-    def _build_search_params(self, query: str, page: int = 1) -> Dict:
+    def _build_search_params(self, query: str, page: int = 1, sort_by: str = "relevance") -> Dict:
         """构建搜索参数"""
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        return {
+        params = {
             "QueryJson": json.dumps({
                 "Platform": "",
                 "DBCode": "SCDB",
@@ -125,49 +173,92 @@ class CNKICrawler:
             "QueryTime": current_time,
             "token": self.session_params.get('token', '')
         }
+        if sort_by in SORT_FIELDS:
+            params["CurrSortField"], params["CurrSortFieldType"] = SORT_FIELDS[sort_by]
+        return params
+    
+    def _get_cookies(self) -> Dict:
+        """合并会话Cookie与登录Cookie"""
+        return {**self.session_params.get('cookies', {}), **self.cookie}
+    
+    def _parse_search_page(self, html: str) -> Tuple[List[Dict], int]:
+        """解析检索结果页，返回文章列表和总结果数"""
+        with span("parse.search"), track_latency(PARSE_LATENCY, page="search"):
+            soup = BeautifulSoup(html, 'html.parser')
+            page_articles = []
+            
+            # 获取总结果数
+            total_count = int(soup.select_one('.pagerTitleCell').text.split('共')[1].split('条')[0])
+            
+            for tr in soup.select('tr.odd, tr.even'):
+                try:
+                    citations = int(tr.select_one('.quote').text.strip() or 0)
+                    if citations >= self.min_citations:
+                        article = {
+                            "id": f"{tr.get('data-dbcode', '')}.{tr.get('data-filename', '')}",
+                            "title": tr.select_one('.name a').text.strip(),
+                            "authors": tr.select_one('.author').text.strip(),
+                            "journal": tr.select_one('.source').text.strip(),
+                            "date": tr.select_one('.date').text.strip(),
+                            "citations": citations,
+                            "downloads": int(tr.select_one('.download').text.strip() or 0)
+                        }
+                        page_articles.append(article)
+                except (AttributeError, KeyError) as e:
+                    logger.warning("解析文章数据失败: %s", e)
+                    continue
+                    
+            return page_articles, total_count
+    
+    def _parse_detail_page(self, html: str) -> Dict:
+        """解析文章详情页"""
+        with span("parse.detail"), track_latency(PARSE_LATENCY, page="detail"):
+            soup = BeautifulSoup(html, 'html.parser')
+            
+            return {
+                "title": soup.select_one('.title').text.strip(),
+                "abstract": soup.select_one('#ChDivSummary').text.strip(),
+                "keywords": [k.text.strip() for k in soup.select('.keywords a')],
+                "doi": soup.select_one('.doi').text.strip() if soup.select_one('.doi') else "",
+                "fund": soup.select_one('.fund').text.strip() if soup.select_one('.fund') else "",
+                "references": [
+                    ref.text.strip() 
+                    for ref in soup.select('.references-list .refer-item')
+                ]
+            }
+    
+    async def _fetch_search_page(self, query: str, page: int, sort_by: str = "relevance") -> str:
+        """请求一页检索结果，会话失效时刷新会话并重试一次"""
+        for attempt in range(2):
+            response = await self._make_request(
+                'post',
+                self.search_url,
+                data=self._build_search_params(query, page, sort_by),
+                cookies=self._get_cookies()
+            )
+            if not session_manager.is_invalid_response(response.text):
+                return response.text
+            if attempt == 0:
+                await self._ensure_session(refresh=True)
+        raise Exception("检索会话初始化后仍然无效")
+    
+    async def search_page(self, query: str, page: int = 1, sort_by: str = "relevance") -> Tuple[List[Dict], int]:
+        """获取并解析一页检索结果，返回文章列表和总结果数；供采集、订阅等逐页处理的任务使用"""
+        await self._ensure_session()
+        html = await self._fetch_search_page(query, page, sort_by)
+        return self._parse_search_page(html)
     
     async def search(self, query: str, page: int = 1) -> Dict:
         """搜索文献"""
-        if not self.session_params:
-            await self._init_session()
+        await self._ensure_session()
         
         all_articles = []
         current_page = 1
         
         while len(all_articles) < self.max_papers:
             try:
-                search_params = self._build_search_params(query, current_page)
-                response = await self._make_request(
-                    'post',
-                    self.search_url,
-                    data=search_params,
-                    cookies=self.session_params['cookies']
-                )
-                
-                soup = BeautifulSoup(response.text, 'html.parser')
-                page_articles = []
-                
-                # 获取总结果数
-                total_count = int(soup.select_one('.pagerTitleCell').text.split('共')[1].split('条')[0])
-                
-                for tr in soup.select('tr.odd, tr.even'):
-                    try:
-                        citations = int(tr.select_one('.quote').text.strip() or 0)
-                        if citations >= self.min_citations:
-                            article = {
-                                "id": f"{tr.get('data-dbcode', '')}.{tr.get('data-filename', '')}",
-                                "title": tr.select_one('.name a').text.strip(),
-                                "authors": tr.select_one('.author').text.strip(),
-                                "journal": tr.select_one('.source').text.strip(),
-                                "date": tr.select_one('.date').text.strip(),
-                                "citations": citations,
-                                "downloads": int(tr.select_one('.download').text.strip() or 0)
-                            }
-                            page_articles.append(article)
-                    except (AttributeError, KeyError) as e:
-                        logger.warning(f"解析文章数据失败: {str(e)}")
-                        continue
-                
+                html = await self._fetch_search_page(query, current_page)
+                page_articles, total_count = self._parse_search_page(html)
                 all_articles.extend(page_articles)
                 
                 # 如果没有更多结果或达到最大页数，退出循环
@@ -179,7 +270,8 @@ class CNKICrawler:
                 await asyncio.sleep(random.uniform(2, 5))
                 
             except Exception as e:
-                logger.error(f"搜索失败: {str(e)}")
+                CRAWLER_ERROR_COUNT.inc()
+                logger.error("搜索失败: %s", e)
                 raise
                 
         return {
@@ -192,6 +284,8 @@ class CNKICrawler:
     
     async def get_article_content(self, article_id: str) -> Dict:
         """获取文章详细内容"""
+        await self._ensure_session()
+        
         try:
             dbcode, filename = article_id.split('.')
             params = {
@@ -204,23 +298,12 @@ class CNKICrawler:
                 'get',
                 self.detail_url,
                 params=params,
-                cookies=self.session_params['cookies']
+                cookies=self._get_cookies()
             )
             
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            return {
-                "title": soup.select_one('.title').text.strip(),
-                "abstract": soup.select_one('#ChDivSummary').text.strip(),
-                "keywords": [k.text.strip() for k in soup.select('.keywords a')],
-                "doi": soup.select_one('.doi').text.strip() if soup.select_one('.doi') else "",
-                "fund": soup.select_one('.fund').text.strip() if soup.select_one('.fund') else "",
-                "references": [
-                    ref.text.strip() 
-                    for ref in soup.select('.references-list .refer-item')
-                ]
-            }
+            return self._parse_detail_page(response.text)
             
         except Exception as e:
-            logger.error(f"获取文章详情失败: {str(e)}")
+            CRAWLER_ERROR_COUNT.inc()
+            logger.error("获取文章详情失败: %s", e)
             raise
\ No newline at end of file
@@ -0,0 +1,107 @@
+"""应用级组件注册表
+
+构造开销大或持有连接的组件（UserAgent数据、代理池、大模型HTTP连接池、抽取式摘要器）
+在每个worker中只创建一次：首次使用时加锁构造（双重检查，多线程并发获取也只构造一次），
+lifespan启动时预先构造耗时的组件，关闭时统一释放。每个请求只创建携带自身参数
+（max_papers、min_citations、Cookie、用户、优先级）的轻量视图，共享底层组件。
+"""
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import logging
+import threading
+import time
+import httpx
+from fake_useragent import UserAgent
+from .article_summarizer import ArticleSummarizer
+from .cnki_crawler import CNKICrawler
+from .extractive_summarizer import ExtractiveSummarizer
+from .llm_scheduler import INTERACTIVE
+from .proxy_pool import ProxyPool
+
+logger = logging.getLogger(__name__)
+
+# lifespan中预先构造的组件，避免第一个请求承担构造开销
+WARM_COMPONENTS = ("user_agent", "proxy_pool", "extractive_summarizer")
+
+
+class ComponentRegistry:
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._closers: Dict[str, Callable[[Any], Awaitable]] = {}
+        self._lock = threading.RLock()  # 可重入：工厂内部可以获取其他组件
+        self.construction_seconds: Dict[str, float] = {}
+
+    def register(self, name: str, factory: Callable[[], Any], close: Optional[Callable[[Any], Awaitable]] = None) -> None:
+        with self._lock:
+            self._factories[name] = factory
+            if close is not None:
+                self._closers[name] = close
+            self._instances.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            instance = self._instances.get(name)
+            if instance is None:
+                start = time.perf_counter()
+                instance = self._factories[name]()
+                self.construction_seconds[name] = time.perf_counter() - start
+                logger.info("初始化组件 %s，耗时 %.1fms", name, self.construction_seconds[name] * 1000)
+                self._instances[name] = instance
+            return instance
+
+    def is_initialized(self, name: str) -> bool:
+        return name in self._instances
+
+    def warm(self, *names: str) -> None:
+        for name in names or tuple(self._factories):
+            self.get(name)
+
+    async def start(self, names=WARM_COMPONENTS) -> None:
+        """在线程中预先构造组件，不阻塞事件循环"""
+        try:
+            await asyncio.to_thread(self.warm, *names)
+        except Exception as e:
+            logger.error("预先初始化组件失败: %s", e)
+
+    async def aclose(self) -> None:
+        with self._lock:
+            instances, self._instances = self._instances, {}
+        for name, instance in instances.items():
+            if name in self._closers:
+                try:
+                    await self._closers[name](instance)
+                except Exception as e:
+                    logger.error("关闭组件 %s 失败: %s", name, e)
+
+    # 以下为每个请求使用的轻量视图
+
+    def crawler(self, max_papers: int = 100, min_citations: int = 0, cookie: Optional[Dict] = None) -> CNKICrawler:
+        return CNKICrawler(
+            max_papers=max_papers,
+            min_citations=min_citations,
+            cookie=cookie,
+            ua=self.get("user_agent"),
+            proxy_pool=self.get("proxy_pool")
+        )
+
+    def summarizer(self, user: Optional[str] = None, priority: str = INTERACTIVE, fallback: bool = True) -> ArticleSummarizer:
+        return ArticleSummarizer(user=user, priority=priority, fallback=fallback, client=self.get("llm_client"))
+
+    def extractive_summarizer(self) -> ExtractiveSummarizer:
+        return self.get("extractive_summarizer")
+
+
+def create_registry() -> ComponentRegistry:
+    registry = ComponentRegistry()
+    registry.register("user_agent", UserAgent)
+    registry.register("proxy_pool", ProxyPool)
+    registry.register("llm_client", lambda: httpx.AsyncClient(timeout=30.0), close=lambda client: client.aclose())
+    registry.register("extractive_summarizer", ExtractiveSummarizer)
+    return registry
+
+
+components = create_registry()
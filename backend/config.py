@@ -7,26 +7,111 @@ load_dotenv()
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
 # CNKI配置
-CNKI_BASE_URL = "https://www.cnki.net"
-CNKI_LOGIN_URL = "https://login.cnki.net/login/"
+CNKI_BASE_URL = os.getenv("CNKI_BASE_URL", "https://www.cnki.net")
+CNKI_LOGIN_URL = os.getenv("CNKI_LOGIN_URL", "https://login.cnki.net/login/")
+CNKI_KNS_URL = os.getenv("CNKI_KNS_URL", "https://kns.cnki.net")
 
 # DeepSeek配置
 DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
-DEEPSEEK_API_BASE = "https://api.deepseek.com/v1"
+DEEPSEEK_API_BASE = os.getenv("DEEPSEEK_API_BASE", "https://api.deepseek.com/v1")
 DEEPSEEK_MODEL = "deepseek-chat-7b"
 
 # 爬虫配置
 MAX_RETRIES = 3
-RETRY_DELAY = 5
+RETRY_DELAY = 5  # 单次退避的上限（秒）
+RETRY_BACKOFF_BASE = float(os.getenv("RETRY_BACKOFF_BASE", "0.5"))  # 指数退避基数（秒）
 REQUEST_TIMEOUT = 30
+SESSION_TTL = int(os.getenv("SESSION_TTL", "1800"))  # 检索会话（Cookie/token）复用时长（秒）
+
+# 熔断与重试预算配置
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RECOVERY_TIMEOUT = float(os.getenv("BREAKER_RECOVERY_TIMEOUT", "30"))
+RETRY_BUDGET_RATIO = 0.2  # 重试次数最多占请求数的20%
+RETRY_BUDGET_MIN_PER_SECOND = 1.0
+STALE_CACHE_TTL = 86400  # 熔断期间可返回的历史结果保留时间（秒）
 
 # Cookie池配置
 MIN_COOKIES = 5
 COOKIE_CHECK_INTERVAL = 300  # 5分钟
 
 # 代理池配置
+PROXY_API_URL = os.getenv("PROXY_API_URL")  # 未配置时不拉取代理，直连
 MIN_PROXIES = 10
 PROXY_CHECK_INTERVAL = 300  # 5分钟
 
 # 限流配置
-RATE_LIMIT_PER_MINUTE = 10 
\ No newline at end of file
+RATE_LIMIT_PER_MINUTE = int(os.getenv("RATE_LIMIT_PER_MINUTE", "10")) 
+
+# 链路追踪配置
+SERVICE_NAME = os.getenv("SERVICE_NAME", "cnki-backend")
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none")  # none / file / otlp
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+OTLP_ENDPOINT = os.getenv("OTLP_ENDPOINT", "http://localhost:4318")
+
+# 日志配置
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # json / text
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # 待写出日志队列长度，满时丢弃新记录
+LOG_SAMPLE_WINDOW = float(os.getenv("LOG_SAMPLE_WINDOW", "60"))  # 重复警告采样窗口（秒）
+LOG_SAMPLE_BURST = int(os.getenv("LOG_SAMPLE_BURST", "10"))  # 每个窗口内同一位置最多输出的警告数
+
+# 管理员配置（逗号分隔的用户名）
+ADMIN_USERS = [u.strip() for u in os.getenv("ADMIN_USERS", "").split(",") if u.strip()]
+
+# 批量采集配置
+HARVEST_DIR = os.getenv("HARVEST_DIR", "data/harvests")  # 断点数据库与输出文件目录
+HARVEST_PAGE_DELAY = float(os.getenv("HARVEST_PAGE_DELAY", "2"))  # 翻页间隔下限（秒），实际在[x, 2.5x]内随机
+HARVEST_MAX_ARTICLES = 10000
+HARVEST_HEARTBEAT_INTERVAL = 30  # 运行中任务的心跳间隔（秒）
+HARVEST_STALE_AFTER = 120  # 超过该时间没有心跳的running任务视为中断，由主节点恢复
+
+# 订阅（watchlist）配置
+WATCHLIST_POLL_INTERVAL = float(os.getenv("WATCHLIST_POLL_INTERVAL", "60"))  # 调度器检查到期订阅的间隔（秒）
+WATCHLIST_MIN_INTERVAL = 3600  # 订阅刷新间隔下限（秒）
+WATCHLIST_MAX_PAGES = 5  # 单次刷新最多翻页数
+WATCHLIST_DETAIL_BATCH = 10  # 每轮最多处理的详情/总结任务数
+WATCHLIST_FETCH_DELAY = float(os.getenv("WATCHLIST_FETCH_DELAY", "2"))  # 上游请求间隔下限（秒）
+WATCHLIST_MAX_HITS = 500  # 每个订阅保留的最近新增文献数
+
+# 大模型调度配置
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))  # 同时进行的DeepSeek调用数
+# 用户权重，格式 "alice:2,bob:0.5"，未配置的用户权重为1
+LLM_USER_WEIGHTS = {
+    user.strip(): float(weight)
+    for user, weight in (item.split(":") for item in os.getenv("LLM_USER_WEIGHTS", "").split(",") if ":" in item)
+}
+
+# 引文网络配置
+CITATION_DB_PATH = os.getenv("CITATION_DB_PATH", "data/citations.sqlite3")  # 引文网络数据库
+
+# HTTP缓存与压缩配置
+COMPRESSION_MIN_SIZE = 1024  # 小于该字节数的响应不压缩
+COMPRESSION_LEVEL = 6  # gzip压缩级别，brotli的quality
+SUMMARY_MAX_AGE = 3600  # 完整分析结果的Cache-Control max-age（秒）
+
+# 多worker部署配置
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))  # worker进程数
+SHUTDOWN_GRACE_PERIOD = int(os.getenv("SHUTDOWN_GRACE_PERIOD", "30"))  # 关闭时等待进行中请求的最长时间（秒）
+LEADER_LOCK_TTL = 30  # 后台任务主节点锁有效期（秒）
+LEADER_RENEW_INTERVAL = 10  # 主节点续期与其他worker竞选的间隔（秒）
+CACHE_L1_SIZE = 1024  # 每个worker的进程内缓存条目数
+CACHE_L1_TTL = float(os.getenv("CACHE_L1_TTL", "30"))  # 进程内缓存有效期（秒），0表示关闭
+
+# IP封禁判定的进程内缓存
+BAN_CACHE_SIZE = 10000  # 缓存的IP数
+BAN_CACHE_ALLOW_TTL = float(os.getenv("BAN_CACHE_ALLOW_TTL", "60"))  # "未封禁"结果的缓存时间（秒）
+
+# 热点缓存与预热配置（TTL为0表示关闭对应的缓存）
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", "600"))  # 检索结果直接返回缓存的时长（秒）
+DETAIL_CACHE_TTL = int(os.getenv("DETAIL_CACHE_TTL", "21600"))  # 文章详情缓存时长（秒）
+SUMMARY_CACHE_TTL = int(os.getenv("SUMMARY_CACHE_TTL", "21600"))  # 完整分析缓存时长（秒）
+POPULARITY_HALF_LIFE = float(os.getenv("POPULARITY_HALF_LIFE", "86400"))  # 热度计数的半衰期（秒）
+POPULARITY_MAX_ENTRIES = 5000  # 每类热度计数保留的条目数
+POPULARITY_DECAY_INTERVAL = 300  # 关闭预热时衰减、裁剪热度计数的周期（秒）
+WARM_INTERVAL = float(os.getenv("WARM_INTERVAL", "300"))  # 预热周期（秒），0表示关闭
+WARM_REFRESH_AHEAD = float(os.getenv("WARM_REFRESH_AHEAD", "180"))  # 缓存剩余时间少于该值时刷新（秒）
+WARM_HOT_QUERIES = 100  # 每轮检查的热门检索数
+WARM_HOT_ARTICLES = 200  # 每轮检查的热门文献数
+WARM_UPSTREAM_BUDGET = int(os.getenv("WARM_UPSTREAM_BUDGET", "30"))  # 每轮最多上游请求数
+WARM_LLM_BUDGET = int(os.getenv("WARM_LLM_BUDGET", "5"))  # 每轮最多生成的完整分析数（每篇3次大模型调用）
+WARM_FETCH_DELAY = float(os.getenv("WARM_FETCH_DELAY", "2"))  # 预热上游请求间隔下限（秒）
\ No newline at end of file
@@ -5,15 +5,18 @@ import json
 import random
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
-import redis
-from .config import REDIS_URL
+from .config import REDIS_URL, CNKI_BASE_URL, CNKI_LOGIN_URL
+from .monitoring import create_redis_client
 
 logger = logging.getLogger(__name__)
 
+redis_client = create_redis_client(REDIS_URL)
+COOKIE_KEY = "cnki_cookies"
+
 class CookiePool:
     def __init__(self):
-        self.redis_client = redis.from_url(REDIS_URL)
-        self.cookie_key = "cnki_cookies"
+        self.redis_client = create_redis_client(REDIS_URL)
+        self.cookie_key = COOKIE_KEY
         self.cookie_status_key = "cnki_cookie_status"
         self.min_cookies = 5
         self.check_interval = 300  # 5分钟检查一次
@@ -25,7 +28,7 @@ class CookiePool:
             with open('accounts.json', 'r') as f:
                 return json.load(f)
         except Exception as e:
-            logger.error(f"加载账号配置失败: {str(e)}")
+            logger.error("加载账号配置失败: %s", e)
             return []
             
     async def _login_cnki(self, username: str, password: str) -> Optional[Dict]:
@@ -33,7 +36,7 @@ class CookiePool:
         try:
             async with aiohttp.ClientSession() as session:
                 # 访问登录页面获取必要参数
-                async with session.get("https://login.cnki.net/login/") as response:
+                async with session.get(CNKI_LOGIN_URL) as response:
                     html = await response.text()
                     # 解析登录表单参数...
                 
@@ -45,7 +48,7 @@ class CookiePool:
                 }
                 
                 async with session.post(
-                    "https://login.cnki.net/login/",
+                    CNKI_LOGIN_URL,
                     data=login_data
                 ) as response:
                     if response.status == 200:
@@ -59,7 +62,7 @@ class CookiePool:
                         }
             return None
         except Exception as e:
-            logger.error(f"登录CNKI失败: {str(e)}")
+            logger.error("登录CNKI失败: %s", e)
             return None
             
     async def _refresh_cookies(self) -> None:
@@ -87,7 +90,7 @@ class CookiePool:
     @staticmethod
     async def get_cookie() -> Optional[Dict]:
         """获取一个可用的Cookie"""
-        cookies = self.redis_client.hgetall(self.cookie_key)
+        cookies = redis_client.hgetall(COOKIE_KEY)
         if not cookies:
             return None
             
@@ -97,8 +100,8 @@ class CookiePool:
         
         # 更新最后使用时间
         cookie_data["last_used"] = datetime.now().isoformat()
-        self.redis_client.hset(
-            self.cookie_key,
+        redis_client.hset(
+            COOKIE_KEY,
             cookie_id,
             json.dumps(cookie_data)
         )
@@ -112,7 +115,7 @@ class CookiePool:
         if not cookie_id:
             return
             
-        cookie_data = self.redis_client.hget(self.cookie_key, cookie_id)
+        cookie_data = redis_client.hget(COOKIE_KEY, cookie_id)
         if not cookie_data:
             return
             
@@ -124,10 +127,10 @@ class CookiePool:
             
         # 如果失败次数过多，删除该Cookie
         if cookie_data["fail_count"] >= 3:
-            self.redis_client.hdel(self.cookie_key, cookie_id)
+            redis_client.hdel(COOKIE_KEY, cookie_id)
         else:
-            self.redis_client.hset(
-                self.cookie_key,
+            redis_client.hset(
+                COOKIE_KEY,
                 cookie_id,
                 json.dumps(cookie_data)
             )
@@ -147,7 +150,7 @@ class CookiePool:
             # 验证Cookie是否还有效
             try:
                 async with aiohttp.ClientSession(cookies=cookie_data["cookies"]) as session:
-                    async with session.get("https://www.cnki.net/") as response:
+                    async with session.get(f"{CNKI_BASE_URL}/") as response:
                         if response.status != 200:
                             self.redis_client.hdel(self.cookie_key, cookie_id)
             except:
@@ -156,7 +159,7 @@ class CookiePool:
     @staticmethod
     async def get_pool_size() -> int:
         """获取Cookie池大小"""
-        return self.redis_client.hlen(self.cookie_key)
+        return redis_client.hlen(COOKIE_KEY)
         
     async def start_monitoring(self) -> None:
         """开始监控Cookie池"""
@@ -167,7 +170,7 @@ class CookiePool:
                     await self._refresh_cookies()
                 await asyncio.sleep(self.check_interval)
             except Exception as e:
-                logger.error(f"监控Cookie池时出错: {str(e)}")
+                logger.error("监控Cookie池时出错: %s", e)
                 await asyncio.sleep(60)
                 
     async def close(self) -> None:
@@ -0,0 +1,245 @@
+"""批量导出（CSV / BibTeX / RIS / Parquet）
+
+导出内容来自检索结果或采集输出，逐批（EXPORT_BATCH_SIZE 篇）从缓存补全摘要、
+关键词等详情及已生成的总结，编码后立即交给响应流；可选的gzip也是流式压缩。
+全程只在内存中保留一批记录，导出5万篇与导出50篇的内存占用相同。
+"""
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List
+import csv
+import io
+import json
+import re
+import zlib
+from .cache import redis_client, make_cache_key
+
+EXPORT_BATCH_SIZE = 500
+EXPORT_FIELDS = (
+    "id", "title", "authors", "journal", "date", "citations", "downloads",
+    "doi", "keywords", "abstract", "summary"
+)
+# 格式 -> (Content-Type, 文件扩展名)
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "bibtex": ("application/x-bibtex; charset=utf-8", "bib"),
+    "ris": ("application/x-research-info-systems; charset=utf-8", "ris"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def iter_jsonl(path: str, limit: int) -> Iterator[Dict]:
+    """逐行读取JSONL采集输出，只读到最后一次提交的偏移量，不会读到写了一半的页"""
+    with open(path, "rb") as f:
+        for line in f:
+            limit -= len(line)
+            if limit < 0:
+                break
+            yield json.loads(line)
+
+
+def iter_parquet(path: str) -> Iterator[Dict]:
+    """按分片、按批读取Parquet采集输出"""
+    import pyarrow.parquet as pq
+
+    for part in sorted(Path(path).glob("part-*.parquet")):
+        for batch in pq.ParquetFile(part).iter_batches(batch_size=EXPORT_BATCH_SIZE):
+            yield from batch.to_pylist()
+
+
+def iter_harvest(harvest: Dict) -> Iterator[Dict]:
+    if harvest["format"] == "parquet":
+        return iter_parquet(harvest["output_path"])
+    if not Path(harvest["output_path"]).exists():
+        return iter([])
+    return iter_jsonl(harvest["output_path"], harvest["output_offset"])
+
+
+def _batches(records: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _authors(value) -> List[str]:
+    if isinstance(value, list):
+        return value
+    return [a.strip() for a in re.split(r"[;；,，]", value or "") if a.strip()]
+
+
+def to_record(article: Dict, cached: Dict = None, detail: Dict = None) -> Dict:
+    """合并检索结果与缓存中的详情、总结，得到统一的导出记录
+
+    cached 为完整分析的缓存；没有时用 detail（文章详情缓存）补全摘要、关键词等。
+    """
+    info = cached["data"]["article_info"] if cached else detail or {}
+    summary = cached["data"]["summary"].get("summary", "") if cached else ""
+    return {
+        "id": article.get("id", ""),
+        "title": article.get("title") or info.get("title", ""),
+        "authors": _authors(article.get("authors")),
+        "journal": article.get("journal", ""),
+        "date": article.get("date", ""),
+        "citations": int(article.get("citations") or 0),
+        "downloads": int(article.get("downloads") or 0),
+        "doi": info.get("doi", ""),
+        "keywords": [k.strip(" ;；,，") for k in info.get("keywords", []) if k.strip(" ;；,，")],
+        "abstract": info.get("abstract", ""),
+        "summary": summary,
+    }
+
+
+def iter_records(articles: Iterable[Dict], details: bool = True) -> Iterator[List[Dict]]:
+    """按批生成导出记录，details为True时用一次MGET补全整批的缓存分析与详情"""
+    for batch in _batches(articles, EXPORT_BATCH_SIZE):
+        if details:
+            ids = [a.get("id", "") for a in batch]
+            values = redis_client.mget(
+                [make_cache_key("summary_stale", i) for i in ids] + [make_cache_key("article", i) for i in ids]
+            )
+            summaries, article_details = values[:len(batch)], values[len(batch):]
+            yield [
+                to_record(a, json.loads(s) if s else None, json.loads(d) if d else None)
+                for a, s, d in zip(batch, summaries, article_details)
+            ]
+        else:
+            yield [to_record(a) for a in batch]
+
+
+def _year(record: Dict) -> str:
+    return record["date"][:4] if record["date"][:4].isdigit() else ""
+
+
+def encode_csv(batches: Iterable[List[Dict]]) -> Iterator[bytes]:
+    # 带BOM，Excel打开中文不乱码
+    buffer = io.StringIO()
+    buffer.write("\ufeff")
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for batch in batches:
+        for record in batch:
+            writer.writerow([
+                "; ".join(record[f]) if isinstance(record[f], list) else record[f] for f in EXPORT_FIELDS
+            ])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _bibtex_value(value: str) -> str:
+    return re.sub(r"[{}]", "", str(value)).replace("\n", " ")
+
+
+def bibtex_entry(record: Dict) -> str:
+    fields = [
+        ("title", record["title"]),
+        ("author", " and ".join(record["authors"])),
+        ("journal", record["journal"]),
+        ("year", _year(record)),
+        ("doi", record["doi"]),
+        ("keywords", ", ".join(record["keywords"])),
+        ("abstract", record["abstract"]),
+        ("note", record["summary"]),
+    ]
+    key = re.sub(r"[^\w.-]", "", record["id"]) or "article"
+    body = ",\n".join(f"  {name} = {{{_bibtex_value(value)}}}" for name, value in fields if value)
+    return f"@article{{{key},\n{body}\n}}\n\n"
+
+
+def ris_entry(record: Dict) -> str:
+    lines = ["TY  - JOUR", f"TI  - {record['title']}"]
+    lines += [f"AU  - {author}" for author in record["authors"]]
+    tags = (("JO", record["journal"]), ("PY", _year(record)), ("DA", record["date"]), ("DO", record["doi"]))
+    lines += [f"{tag}  - {value}" for tag, value in tags if value]
+    lines += [f"KW  - {keyword}" for keyword in record["keywords"]]
+    if record["abstract"]:
+        lines.append(f"AB  - {record['abstract']}")
+    if record["summary"]:
+        lines.append(f"N1  - {' '.join(record['summary'].splitlines())}")
+    lines += [f"UR  - https://kns.cnki.net/kcms/detail/detail.aspx?filename={record['id']}", "ER  - ", "", ""]
+    return "\n".join(lines)
+
+
+def encode_text(batches: Iterable[List[Dict]], entry) -> Iterator[bytes]:
+    for batch in batches:
+        yield "".join(entry(record) for record in batch).encode("utf-8")
+
+
+class _ChunkSink:
+    """只追加的输出流：ParquetWriter写入后取走已生成的字节，tell()返回累计偏移量供写页脚"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def encode_parquet(batches: Iterable[List[Dict]]) -> Iterator[bytes]:
+    """每批写一个row group，写完即输出"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        (field, pa.int64() if field in ("citations", "downloads")
+         else pa.list_(pa.string()) if field in ("authors", "keywords") else pa.string())
+        for field in EXPORT_FIELDS
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema)
+    try:
+        for batch in batches:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31：gzip格式
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(articles: Iterable[Dict], output_format: str, details: bool = True, compress: bool = False) -> Iterator[bytes]:
+    """把文章流编码为指定格式的字节流"""
+    batches = iter_records(articles, details)
+    if output_format == "csv":
+        chunks = encode_csv(batches)
+    elif output_format == "bibtex":
+        chunks = encode_text(batches, bibtex_entry)
+    elif output_format == "ris":
+        chunks = encode_text(batches, ris_entry)
+    elif output_format == "parquet":
+        chunks = encode_parquet(batches)
+    else:
+        raise ValueError(f"不支持的导出格式: {output_format}")
+    return gzip_stream(chunks) if compress else chunks
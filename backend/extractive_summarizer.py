@@ -0,0 +1,101 @@
+"""抽取式摘要（不调用大模型）
+
+对摘要做分句，以句子间字符二元组（bigram）重叠度构图，用TextRank计算句子
+重要性，并按句中出现的论文关键词加权，取得分最高的几句按原文顺序输出。
+中文不做分词也能工作，纯CPU计算，单篇耗时在毫秒级。
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+import math
+import re
+
+SENTENCE_DELIMITERS = re.compile(r"(?<=[。！？；!?;])|(?<=\.)\s+|\n+")
+# 研究方法与创新点的提示词，用于从摘要中挑选对应句子
+METHOD_CUES = ("方法", "采用", "利用", "基于", "通过", "构建", "模型", "算法", "实验", "数据")
+INNOVATION_CUES = ("提出", "创新", "首次", "新的", "新型", "改进", "优于", "提高", "提升", "显著")
+
+
+def split_sentences(text: str) -> List[str]:
+    """按中英文句末标点分句，去掉过短的片段"""
+    sentences = [s.strip() for s in SENTENCE_DELIMITERS.split(text or "")]
+    return [s for s in sentences if len(s) >= 4]
+
+
+def _bigrams(sentence: str) -> Set[str]:
+    chars = re.sub(r"[\s\W_]+", "", sentence.lower())
+    return {chars[i:i + 2] for i in range(len(chars) - 1)}
+
+
+def _similarity(a: Set[str], b: Set[str]) -> float:
+    if len(a) < 2 or len(b) < 2:
+        return 0.0
+    return len(a & b) / (math.log(len(a)) + math.log(len(b)))
+
+
+def textrank(sentences: List[str], damping: float = 0.85, max_iter: int = 50, tol: float = 1e-6) -> List[float]:
+    """返回每个句子的TextRank得分"""
+    n = len(sentences)
+    if n == 0:
+        return []
+    grams = [_bigrams(s) for s in sentences]
+    weights = [[_similarity(grams[i], grams[j]) if i != j else 0.0 for j in range(n)] for i in range(n)]
+    out_sums = [sum(row) for row in weights]
+
+    scores = [1.0 / n] * n
+    for _ in range(max_iter):
+        new_scores = [
+            (1 - damping) / n + damping * sum(
+                weights[j][i] / out_sums[j] * scores[j] for j in range(n) if out_sums[j]
+            )
+            for i in range(n)
+        ]
+        delta = sum(abs(a - b) for a, b in zip(new_scores, scores))
+        scores = new_scores
+        if delta < tol:
+            break
+    return scores
+
+
+class ExtractiveSummarizer:
+    def __init__(self, max_sentences: int = 3, keyword_weight: float = 0.5):
+        self.max_sentences = max_sentences
+        self.keyword_weight = keyword_weight  # 每命中一个关键词，得分乘以(1 + keyword_weight)
+
+    def rank(self, sentences: List[str], keywords: List[str]) -> List[float]:
+        """TextRank得分按关键词命中数加权"""
+        # 详情页的关键词带有分隔符，如 "深度学习;"
+        keywords = [k.strip(" ;；,，").lower() for k in keywords]
+        keywords = [k for k in keywords if k]
+        return [
+            score * (1 + self.keyword_weight) ** sum(1 for k in keywords if k in sentence.lower())
+            for sentence, score in zip(sentences, textrank(sentences))
+        ]
+
+    def _select(self, sentences: List[str], scores: List[float], cues: Optional[tuple] = None) -> List[str]:
+        candidates = [
+            i for i, sentence in enumerate(sentences)
+            if cues is None or any(cue in sentence for cue in cues)
+        ]
+        top = sorted(candidates, key=lambda i: scores[i], reverse=True)[:self.max_sentences]
+        return [sentences[i] for i in sorted(top)]
+
+    def summarize(self, content: Dict) -> Dict:
+        """生成与 ArticleSummarizer.summarize 结构一致的抽取式摘要"""
+        sentences = split_sentences(content.get("abstract", ""))
+        scores = self.rank(sentences, content.get("keywords", []))
+        key_sentences = self._select(sentences, scores)
+        methodology = self._select(sentences, scores, METHOD_CUES)
+        innovation = self._select(sentences, scores, INNOVATION_CUES)
+
+        return {
+            "summary": "\n".join(f"- {s}" for s in key_sentences) or "摘要为空，无法生成快速摘要",
+            "methodology_analysis": "\n".join(f"- {s}" for s in methodology) or "未识别到研究方法相关内容",
+            "innovation_analysis": "\n".join(f"- {s}" for s in innovation) or "未识别到创新点相关内容",
+            "key_sentences": key_sentences,
+            "mode": "fast",
+            "generated_at": datetime.now().isoformat(),
+            "model_info": {
+                "model": "textrank",
+                "version": "1.0"
+            }
+        }
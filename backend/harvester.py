@@ -0,0 +1,320 @@
+"""断点续传的批量采集（harvest）
+
+逐页请求检索结果，每页解析后立即追加写入输出文件，并在同一个SQLite事务中
+记录已见文献ID与下一页游标。进程崩溃或重启后从最后完成的页继续，输出文件
+截断到最后一次提交的位置，因此不会出现重复或半行记录；内存占用只与单页大小有关。
+"""
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from .citation_graph import citation_graph
+from .config import HARVEST_DIR, HARVEST_HEARTBEAT_INTERVAL, HARVEST_PAGE_DELAY, HARVEST_STALE_AFTER
+from .tracing import span
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 20
+OUTPUT_FORMATS = ("jsonl", "parquet")
+
+
+class HarvestStore:
+    """采集任务与已见文献ID的本地存储（SQLite）"""
+
+    def __init__(self, path: str):
+        self.output_dir = Path(path).parent  # 输出文件与数据库放在同一目录
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS harvests (
+                    id TEXT PRIMARY KEY,
+                    query TEXT NOT NULL,
+                    format TEXT NOT NULL,
+                    output_path TEXT NOT NULL,
+                    max_articles INTEGER NOT NULL,
+                    min_citations INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    next_page INTEGER NOT NULL DEFAULT 1,
+                    output_offset INTEGER NOT NULL DEFAULT 0,
+                    total_count INTEGER,
+                    articles INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS harvest_articles (
+                    harvest_id TEXT NOT NULL,
+                    article_id TEXT NOT NULL,
+                    PRIMARY KEY (harvest_id, article_id)
+                ) WITHOUT ROWID;
+            """)
+
+    def create(self, query: str, output_format: str, max_articles: int, min_citations: int) -> Dict:
+        harvest_id = uuid.uuid4().hex[:12]
+        suffix = "jsonl" if output_format == "jsonl" else "parquet"  # parquet输出为按页分片的目录
+        output_path = str(self.output_dir / f"{harvest_id}.{suffix}")
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO harvests (id, query, format, output_path, max_articles, min_citations, status, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, 'pending', ?, ?)",
+                (harvest_id, query, output_format, output_path, max_articles, min_citations, now, now)
+            )
+        return self.get(harvest_id)
+
+    def get(self, harvest_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM harvests WHERE id = ?", (harvest_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list(self, status: Optional[str] = None) -> List[Dict]:
+        with self._lock:
+            if status is None:
+                rows = self.conn.execute("SELECT * FROM harvests ORDER BY created_at DESC").fetchall()
+            else:
+                rows = self.conn.execute(
+                    "SELECT * FROM harvests WHERE status = ? ORDER BY created_at", (status,)
+                ).fetchall()
+        return [dict(row) for row in rows]
+
+    def set_status(self, harvest_id: str, status: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            self.conn.execute(
+                "UPDATE harvests SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, error, time.time(), harvest_id)
+            )
+
+    def filter_new(self, harvest_id: str, article_ids: List[str]) -> List[str]:
+        """返回尚未采集过的文献ID（保持原顺序，并去除本页内的重复）"""
+        if not article_ids:
+            return []
+        placeholders = ",".join("?" * len(article_ids))
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT article_id FROM harvest_articles WHERE harvest_id = ? AND article_id IN ({placeholders})",
+                (harvest_id, *article_ids)
+            ).fetchall()
+        seen = {row[0] for row in rows}
+        new_ids = []
+        for article_id in article_ids:
+            if article_id not in seen:
+                seen.add(article_id)
+                new_ids.append(article_id)
+        return new_ids
+
+    def touch(self, harvest_ids: List[str]) -> None:
+        """运行中任务的心跳：更新updated_at，其他worker据此判断任务是否仍有进程在执行"""
+        if not harvest_ids:
+            return
+        placeholders = ",".join("?" * len(harvest_ids))
+        with self._lock:
+            self.conn.execute(
+                f"UPDATE harvests SET updated_at = ? WHERE id IN ({placeholders})", (time.time(), *harvest_ids)
+            )
+
+    def commit_page(
+        self, harvest_id: str, page: int, article_ids: List[str], output_offset: int, total_count: int
+    ) -> None:
+        """在一个事务中记录本页新文献ID与游标，作为断点"""
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO harvest_articles (harvest_id, article_id) VALUES (?, ?)",
+                    [(harvest_id, article_id) for article_id in article_ids]
+                )
+                self.conn.execute(
+                    "UPDATE harvests SET next_page = ?, output_offset = ?, total_count = ?, "
+                    "articles = articles + ?, updated_at = ? WHERE id = ?",
+                    (page + 1, output_offset, total_count, len(article_ids), time.time(), harvest_id)
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+
+class JsonlWriter:
+    """逐页追加JSONL；打开时截断到最后一次提交的偏移量，丢弃崩溃前未提交的数据"""
+
+    def __init__(self, path: str, offset: int):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(path, "a+b")
+        self.file.truncate(offset)
+        self.file.seek(offset)
+
+    def write_page(self, page: int, rows: List[Dict]) -> int:
+        for row in rows:
+            self.file.write(json.dumps(row, ensure_ascii=False).encode("utf-8") + b"\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class ParquetWriter:
+    """每页写一个Parquet分片（part-00001.parquet ...），整个目录可作为一个数据集读取"""
+
+    def __init__(self, path: str, offset: int):
+        import pyarrow  # noqa: F401  仅在使用Parquet输出时需要
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def write_page(self, page: int, rows: List[Dict]) -> int:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if rows:
+            part = self.path / f"part-{page:05d}.parquet"
+            tmp = part.with_suffix(".tmp")
+            pq.write_table(pa.Table.from_pylist(rows), tmp)
+            os.replace(tmp, part)  # 重跑同一页时覆盖旧分片
+        return 0
+
+    def close(self) -> None:
+        pass
+
+
+WRITERS = {"jsonl": JsonlWriter, "parquet": ParquetWriter}
+
+
+class Harvester:
+    """执行与恢复采集任务，每个任务一个后台协程"""
+
+    def __init__(
+        self,
+        store: HarvestStore,
+        crawler_factory: Callable,
+        page_delay: float = HARVEST_PAGE_DELAY,
+        stale_after: float = HARVEST_STALE_AFTER
+    ):
+        self.store = store
+        self.crawler_factory = crawler_factory  # async (min_citations) -> CNKICrawler
+        self.page_delay = page_delay
+        self.stale_after = stale_after  # 超过该时间没有心跳的running任务视为中断
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def is_running(self, harvest_id: str) -> bool:
+        task = self._tasks.get(harvest_id)
+        return task is not None and not task.done()
+
+    def is_active(self, harvest: Dict) -> bool:
+        """本进程或其他worker（心跳未过期）正在执行该任务"""
+        if self.is_running(harvest["id"]):
+            return True
+        return harvest["status"] == "running" and time.time() - harvest["updated_at"] < self.stale_after
+
+    def start(self, harvest_id: str) -> bool:
+        """启动（或恢复）采集任务，已在运行时返回False"""
+        if self.is_running(harvest_id):
+            return False
+        self.store.set_status(harvest_id, "running")
+        self._tasks[harvest_id] = asyncio.create_task(self.run(harvest_id))
+        return True
+
+    def resume_interrupted(self) -> int:
+        """恢复中断（状态仍为running，但没有进程在执行）的任务"""
+        harvests = [harvest for harvest in self.store.list(status="running") if not self.is_active(harvest)]
+        for harvest in harvests:
+            logger.info("恢复采集任务 %s，从第 %s 页继续", harvest['id'], harvest['next_page'])
+            self.start(harvest["id"])
+        return len(harvests)
+
+    async def heartbeat(self, interval: float = HARVEST_HEARTBEAT_INTERVAL) -> None:
+        """每个worker都运行：为本进程执行中的任务续心跳"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                running = [harvest_id for harvest_id in self._tasks if self.is_running(harvest_id)]
+                await asyncio.to_thread(self.store.touch, running)
+            except Exception as e:
+                logger.error("更新采集任务心跳失败: %s", e)
+
+    async def watch_interrupted(self, interval: float = HARVEST_HEARTBEAT_INTERVAL) -> None:
+        """只在主节点运行：接管重启或其他worker退出后遗留的任务"""
+        while True:
+            try:
+                self.resume_interrupted()
+            except Exception as e:
+                logger.error("恢复中断的采集任务失败: %s", e)
+            await asyncio.sleep(interval)
+
+    async def stop(self) -> None:
+        """关闭时取消运行中的任务，状态保持running以便下次启动时恢复"""
+        tasks = [task for task in self._tasks.values() if not task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    def _finished(harvest: Dict, page: int) -> bool:
+        total_count = harvest["total_count"]
+        if harvest["articles"] >= harvest["max_articles"]:
+            return True
+        return total_count is not None and (page - 1) * PAGE_SIZE >= total_count
+
+    def _save_page(self, harvest: Dict, writer, page: int, articles: List[Dict], total_count: int) -> Dict:
+        """写出本页新文献并提交断点（同步IO，在线程池中执行），返回更新后的任务"""
+        harvest_id = harvest["id"]
+        remaining = harvest["max_articles"] - harvest["articles"]
+        new_ids = self.store.filter_new(harvest_id, [a["id"] for a in articles])[:remaining]
+        by_id = {a["id"]: a for a in articles}
+        rows = [by_id[article_id] for article_id in new_ids]
+
+        offset = writer.write_page(page, rows)
+        self.store.commit_page(harvest_id, page, new_ids, offset, total_count)
+        citation_graph.add_articles(rows)
+        harvest = self.store.get(harvest_id)
+        logger.info(
+            f"采集任务 {harvest_id} 第 {page} 页完成，新增 {len(rows)} 篇，"
+            f"累计 {harvest['articles']}/{min(total_count, harvest['max_articles'])}"
+        )
+        return harvest
+
+    async def run(self, harvest_id: str) -> None:
+        harvest = await asyncio.to_thread(self.store.get, harvest_id)
+        crawler = await self.crawler_factory(harvest["min_citations"])
+        writer = await asyncio.to_thread(WRITERS[harvest["format"]], harvest["output_path"], harvest["output_offset"])
+        saving = None
+        try:
+            with span("harvest.run", harvest_id=harvest_id, start_page=harvest["next_page"]):
+                while not self._finished(harvest, harvest["next_page"]):
+                    page = harvest["next_page"]
+                    articles, total_count = await crawler.search_page(harvest["query"], page)
+
+                    # 文件写入、fsync与SQLite提交都在线程中执行，不阻塞事件循环
+                    saving = asyncio.ensure_future(
+                        asyncio.to_thread(self._save_page, harvest, writer, page, articles, total_count)
+                    )
+                    harvest = await asyncio.shield(saving)
+
+                    if not self._finished(harvest, harvest["next_page"]) and self.page_delay:
+                        await asyncio.sleep(random.uniform(self.page_delay, self.page_delay * 2.5))
+
+            await asyncio.to_thread(self.store.set_status, harvest_id, "completed")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("采集任务 %s 失败: %s", harvest_id, e)
+            await asyncio.to_thread(self.store.set_status, harvest_id, "failed", str(e))
+        finally:
+            if saving is not None and not saving.done():
+                # 被取消时等正在写出的一页完成提交，再关闭输出文件
+                await asyncio.wait([saving])
+            await asyncio.to_thread(writer.close)
+
+
+harvest_store = HarvestStore(str(Path(HARVEST_DIR) / "harvests.sqlite3"))
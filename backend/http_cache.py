@@ -0,0 +1,144 @@
+"""响应压缩、ETag与条件请求
+
+HTTPCacheMiddleware 对带Content-Length的响应（即非流式响应）：
+- GET 200 响应按响应体计算强ETag，If-None-Match匹配时返回304；
+- 超过 COMPRESSION_MIN_SIZE 的文本/JSON按客户端 Accept-Encoding 用brotli（已安装时）或gzip压缩，
+  压缩后的ETag带编码后缀（"...-gzip"），比较时忽略后缀；304与200携带同一个带后缀的ETag。
+流式响应（如 /export）不缓冲、不处理。能直接从缓存判断内容的接口（如 /summarize）
+用 content_etag 根据缓存内容计算ETag，条件请求命中时无需请求上游即可返回304。
+"""
+from typing import Any, Optional
+import gzip
+import hashlib
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from starlette.datastructures import MutableHeaders
+from .config import COMPRESSION_MIN_SIZE, COMPRESSION_LEVEL
+
+try:
+    import brotli
+except ImportError:  # brotli为可选依赖，未安装时只使用gzip
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml")
+ENCODING_SUFFIXES = ("-br", "-gzip")
+
+
+def body_etag(body: bytes) -> str:
+    return f'"{hashlib.sha1(body).hexdigest()}"'
+
+
+def content_etag(content: Any) -> str:
+    """与 JSONResponse 渲染结果一致的ETag，可直接由缓存内容计算"""
+    return body_etag(JSONResponse(content=content).body)
+
+
+def _opaque_tag(etag: str) -> str:
+    tag = etag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]  # If-None-Match使用弱比较
+    tag = tag.strip('"')
+    for suffix in ENCODING_SUFFIXES:
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)]
+    return tag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return _opaque_tag(etag) in {_opaque_tag(tag) for tag in if_none_match.split(",")}
+
+
+def _matching_tag(if_none_match: Optional[str], etag: str) -> Optional[str]:
+    """If-None-Match 中与etag匹配的那个标签，即客户端缓存的表示对应的ETag"""
+    for tag in (if_none_match or "").split(","):
+        if tag.strip() != "*" and _opaque_tag(tag) == _opaque_tag(etag):
+            return tag.strip()
+    return None
+
+
+def encoded_etag(etag: str, encoding: Optional[str]) -> str:
+    """压缩表示的ETag：在不含编码后缀的ETag后加上编码后缀"""
+    return f'"{_opaque_tag(etag)}-{encoding}"' if encoding else etag
+
+
+def not_modified(etag: str, cache_control: Optional[str] = None, vary: Optional[str] = None) -> Response:
+    headers = {"ETag": etag}
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+    if vary:
+        headers["Vary"] = vary
+    return Response(status_code=304, headers=headers)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """按客户端的q值选择编码，brotli优先"""
+    accepted = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESSION_LEVEL)
+    return gzip.compress(body, compresslevel=COMPRESSION_LEVEL)
+
+
+class HTTPCacheMiddleware:
+    def __init__(self, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.minimum_size = minimum_size
+
+    async def __call__(self, request: Request, call_next):
+        response = await call_next(request)
+        if_none_match = request.headers.get("if-none-match")
+        if response.status_code == 304 and "etag" in response.headers:
+            # 处理函数按缓存内容直接返回的304（如 /summarize）：ETag与客户端缓存的（可能是压缩的）表示一致
+            tag = _matching_tag(if_none_match, response.headers["etag"])
+            if tag:
+                response.headers["ETag"] = tag
+            return response
+
+        headers = MutableHeaders(raw=list(response.raw_headers))
+        if "content-length" not in headers or "content-encoding" in headers:
+            return response  # 流式或已编码的响应原样返回
+
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        del headers["content-length"]
+
+        # 先确定编码：304与200必须携带同一个（带编码后缀的）ETag
+        encoding = None
+        content_type = headers.get("content-type", "")
+        if len(body) >= self.minimum_size and content_type.startswith(COMPRESSIBLE_TYPES):
+            headers["Vary"] = "Accept-Encoding"
+            encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+
+        is_cacheable = request.method == "GET" and response.status_code == 200
+        if is_cacheable and "etag" not in headers:
+            headers["ETag"] = body_etag(body)
+        if "etag" in headers:
+            headers["ETag"] = encoded_etag(headers["etag"], encoding)
+        if is_cacheable and etag_matches(if_none_match, headers["etag"]):
+            return not_modified(headers["etag"], headers.get("cache-control"), headers.get("vary"))
+
+        if encoding:
+            body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+
+        compressed = Response(content=body, status_code=response.status_code, background=response.background)
+        compressed.raw_headers = headers.raw + [(b"content-length", str(len(body)).encode())]
+        return compressed
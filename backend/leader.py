@@ -0,0 +1,108 @@
+"""多worker部署下的后台任务选主
+
+所有worker竞争同一个Redis锁（SET NX PX + 随机token），持有者运行后台维护任务
+（Cookie池监控、IP模式清理、订阅调度、恢复中断的采集），并定期续期；续期失败
+（如与Redis断连超过锁的有效期）时立即取消这些任务，由其他worker接管。
+关闭时主动释放锁，其他worker在下一次竞选时即可接管，无需等待锁过期。
+"""
+from typing import Awaitable, Callable, List, Optional
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from .config import LEADER_LOCK_TTL, LEADER_RENEW_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# 只有token一致（仍是自己持有的锁）时才续期/释放
+RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class LeaderLock:
+    def __init__(self, redis_client, key: str, ttl: float = LEADER_LOCK_TTL):
+        self.redis_client = redis_client
+        self.key = key
+        self.ttl_ms = int(ttl * 1000)
+        self.token = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def acquire(self) -> bool:
+        return bool(self.redis_client.set(self.key, self.token, nx=True, px=self.ttl_ms))
+
+    def renew(self) -> bool:
+        return bool(self.redis_client.eval(RENEW_SCRIPT, 1, self.key, self.token, self.ttl_ms))
+
+    def release(self) -> bool:
+        return bool(self.redis_client.eval(RELEASE_SCRIPT, 1, self.key, self.token))
+
+    def holder(self) -> Optional[str]:
+        value = self.redis_client.get(self.key)
+        return value.decode() if isinstance(value, bytes) else value
+
+
+class LeaderElection:
+    """竞选成功后启动任务，失去领导权或关闭时取消任务"""
+
+    def __init__(
+        self,
+        lock: LeaderLock,
+        task_factories: List[Callable[[], Awaitable]],
+        renew_interval: float = LEADER_RENEW_INTERVAL
+    ):
+        self.lock = lock
+        self.task_factories = task_factories
+        self.renew_interval = renew_interval
+        self.is_leader = False
+        self._tasks: List[asyncio.Task] = []
+
+    async def _try_acquire(self) -> bool:
+        try:
+            return await asyncio.to_thread(self.lock.acquire)
+        except Exception as e:
+            logger.error("竞选后台任务主节点失败: %s", e)
+            return False
+
+    async def _renew(self) -> bool:
+        try:
+            return await asyncio.to_thread(self.lock.renew)
+        except Exception as e:
+            logger.error("续期后台任务主节点锁失败: %s", e)
+            return False
+
+    async def _stop_tasks(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def run(self) -> None:
+        try:
+            while True:
+                if not self.is_leader and await self._try_acquire():
+                    self.is_leader = True
+                    logger.info("成为后台任务主节点: %s", self.lock.token)
+                    self._tasks = [asyncio.create_task(factory()) for factory in self.task_factories]
+                elif self.is_leader and not await self._renew():
+                    logger.warning("失去后台任务主节点身份: %s", self.lock.token)
+                    self.is_leader = False
+                    await self._stop_tasks()
+                await asyncio.sleep(self.renew_interval)
+        finally:
+            await self._stop_tasks()
+            if self.is_leader:
+                self.is_leader = False
+                try:
+                    self.lock.release()
+                except Exception as e:
+                    logger.error("释放后台任务主节点锁失败: %s", e)
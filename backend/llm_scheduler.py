@@ -0,0 +1,106 @@
+"""大模型调用调度
+
+限制同时进行的DeepSeek调用数，排队的请求按优先级分为交互（interactive，
+用户正在等待的 /summarize）与批量（batch，订阅等后台任务）两类：交互请求
+总是先于批量请求调度；同一类内按用户做加权公平排队（WFQ），每个请求的虚拟
+完成时间 = max(当前虚拟时间, 该用户上一请求的完成时间) + 1/权重，因此单个用户
+一次提交大量请求只会排在自己的队尾，不会挤占其他用户。
+"""
+from typing import Callable, Dict, List, Optional, Tuple
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from .config import LLM_MAX_CONCURRENCY, LLM_USER_WEIGHTS
+from .monitoring import LLM_QUEUE_DEPTH, LLM_QUEUE_WAIT
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, BATCH)
+ANONYMOUS_USER = "anonymous"
+
+
+class _Waiter:
+    __slots__ = ("user", "priority", "future", "enqueued_at")
+
+    def __init__(self, user: str, priority: str, future: asyncio.Future, enqueued_at: float):
+        self.user = user
+        self.priority = priority
+        self.future = future
+        self.enqueued_at = enqueued_at
+
+
+class LLMScheduler:
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        weights: Optional[Dict[str, float]] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_concurrency = max_concurrency
+        self.weights = dict(weights or {})
+        self.clock = clock
+        self.running = 0
+        self._seq = itertools.count()
+        self._queues: Dict[str, List[Tuple[float, int, _Waiter]]] = {p: [] for p in PRIORITIES}
+        self._virtual_time: Dict[str, float] = {p: 0.0 for p in PRIORITIES}
+        self._last_finish: Dict[Tuple[str, str], float] = {}
+
+    def weight(self, user: str) -> float:
+        return self.weights.get(user, 1.0)
+
+    def queue_depth(self, priority: Optional[str] = None) -> int:
+        priorities = PRIORITIES if priority is None else (priority,)
+        return sum(1 for p in priorities for _, _, w in self._queues[p] if not w.future.done())
+
+    def _enqueue(self, user: str, priority: str) -> _Waiter:
+        key = (priority, user)
+        finish = max(self._virtual_time[priority], self._last_finish.get(key, 0.0)) + 1.0 / self.weight(user)
+        self._last_finish[key] = finish
+        waiter = _Waiter(user, priority, asyncio.get_running_loop().create_future(), self.clock())
+        heapq.heappush(self._queues[priority], (finish, next(self._seq), waiter))
+        LLM_QUEUE_DEPTH.labels(priority=priority).inc()
+        return waiter
+
+    def _dispatch(self) -> None:
+        """在有空闲名额时按优先级、虚拟完成时间唤醒等待者"""
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            while queue and self.running < self.max_concurrency:
+                finish, _, waiter = heapq.heappop(queue)
+                if waiter.future.done():  # 排队期间已取消
+                    continue
+                LLM_QUEUE_DEPTH.labels(priority=priority).dec()
+                self._virtual_time[priority] = finish
+                self.running += 1
+                waiter.future.set_result(None)
+                LLM_QUEUE_WAIT.labels(priority=priority).observe(self.clock() - waiter.enqueued_at)
+            if not queue:
+                # 队列清空后重置，避免长期空闲的用户积累的完成时间影响后续排队
+                self._last_finish = {k: v for k, v in self._last_finish.items() if k[0] != priority}
+
+    async def acquire(self, user: str, priority: str = INTERACTIVE) -> None:
+        if priority not in PRIORITIES:
+            raise ValueError(f"未知的优先级: {priority}")
+        waiter = self._enqueue(user or ANONYMOUS_USER, priority)
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # 已分配到名额但调用方被取消，归还名额
+                self.release()
+            else:
+                waiter.future.cancel()
+                LLM_QUEUE_DEPTH.labels(priority=waiter.priority).dec()
+            raise
+
+    def release(self) -> None:
+        self.running -= 1
+        self._dispatch()
+
+
+llm_scheduler = LLMScheduler(max_concurrency=LLM_MAX_CONCURRENCY, weights=LLM_USER_WEIGHTS)
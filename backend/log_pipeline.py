@@ -0,0 +1,166 @@
+"""非阻塞的结构化日志
+
+业务代码（事件循环线程）只把日志记录放入有界队列，格式化和写出由后台线程的
+QueueListener完成，错误风暴时stderr写入变慢不会拖慢请求；队列满时丢弃新记录
+并计入 log_records_dropped_total。
+
+记录在入队前补充trace_id/span_id、请求ID与路由模板，默认输出为每行一个JSON，
+调用方通过 extra 传入的字段（如上游耗时）原样输出。同一代码位置的重复警告
+（如逐行解析失败）每个采样窗口只输出前 LOG_SAMPLE_BURST 条，被省略的条数记在
+下一条输出记录的 suppressed 字段中。
+"""
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+import atexit
+import copy
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from .config import LOG_FORMAT, LOG_LEVEL, LOG_QUEUE_SIZE, LOG_SAMPLE_BURST, LOG_SAMPLE_WINDOW
+from .monitoring import LOG_RECORDS_DROPPED
+from .tracing import TraceContextFilter
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [trace=%(trace_id)s] %(message)s'
+
+# 由链路追踪中间件按请求设置：request_id、route，以及累计的上游请求次数与耗时
+request_log_context: ContextVar[Optional[Dict]] = ContextVar("request_log_context", default=None)
+
+# LogRecord自带的属性，其余属性视为extra字段
+_CONTEXT_FIELDS = ("trace_id", "span_id", "request_id", "route")
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", *_CONTEXT_FIELDS}
+
+
+def record_upstream(duration: float) -> None:
+    """累计当前请求的上游请求次数与耗时，随请求日志输出"""
+    context = request_log_context.get()
+    if context is not None:
+        context["upstream_calls"] = context.get("upstream_calls", 0) + 1
+        context["upstream_ms"] = round(context.get("upstream_ms", 0.0) + duration * 1000, 1)
+
+
+class RequestContextFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = request_log_context.get() or {}
+        record.request_id = context.get("request_id", "-")
+        record.route = context.get("route", "-")
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """对WARNING级别的重复记录按代码位置采样"""
+
+    def __init__(self, window: float = LOG_SAMPLE_WINDOW, burst: int = LOG_SAMPLE_BURST):
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        self._windows: Dict[tuple, list] = {}  # 位置 -> [窗口开始时间, 已输出数, 已省略数]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno != logging.WARNING or self.burst <= 0:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            state = self._windows.get(key)
+            if state is None or now - state[0] >= self.window:
+                suppressed = state[2] if state else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if state[1] < self.burst:
+                state[1] += 1
+                return True
+            state[2] += 1
+        LOG_RECORDS_DROPPED.labels(reason="sampled").inc()
+        return False
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for field in _CONTEXT_FIELDS:
+            value = getattr(record, field, "-")
+            if value != "-":
+                entry[field] = value
+        for key, value in vars(record).items():
+            if key not in _RESERVED and key not in entry:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.labels(reason="queue_full").inc()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 只固化消息与异常文本，格式化留给后台线程
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def create_queue_handler(output: logging.Handler, queue_size: int = LOG_QUEUE_SIZE) -> Tuple[QueueHandler, QueueListener]:
+    """创建入队的handler及把记录交给output写出的listener（未启动）"""
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    handler.addFilter(SamplingFilter())
+    handler.addFilter(TraceContextFilter())
+    handler.addFilter(RequestContextFilter())
+    return handler, QueueListener(handler.queue, output, respect_handler_level=True)
+
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging(
+    level: str = LOG_LEVEL,
+    fmt: str = LOG_FORMAT,
+    queue_size: int = LOG_QUEUE_SIZE,
+    stream=None
+) -> QueueListener:
+    """把根日志器的输出改为经队列由后台线程写出，重复调用时返回已有的listener"""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JSONFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+    handler, _listener = create_queue_handler(output, queue_size)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(handler)
+
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def shutdown_logging() -> None:
+    """写出队列中剩余的记录并停止后台线程"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
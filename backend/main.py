@@ -1,46 +1,99 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST
 from pydantic import BaseModel
 import httpx
 from .cnki_crawler import CNKICrawler
-from .article_summarizer import ArticleSummarizer
+from .components import components
 from .cookie_pool import CookiePool
-from .anti_crawler_handler import AntiCrawlerHandler
+from .anti_crawler_handler import AntiCrawlerHandler, ban_cache
+from .config import (
+    REDIS_URL, RATE_LIMIT_PER_MINUTE, CNKI_KNS_URL, HARVEST_MAX_ARTICLES, WATCHLIST_MIN_INTERVAL,
+    SUMMARY_MAX_AGE, SEARCH_CACHE_TTL, DETAIL_CACHE_TTL, SUMMARY_CACHE_TTL
+)
+from .circuit_breaker import CircuitOpenError, get_breaker
+from .cache import get_cached, make_cache_key
+from .monitoring import MetricsMiddleware, create_redis_client, mark_worker_dead, metrics_payload, route_label
+from .tracing import span, shutdown as shutdown_tracing
+from .log_pipeline import request_log_context, setup_logging
+from .profiling import sampling_profiler, request_profiles, ProfilerBusyError
+from .auth import get_admin_user, get_current_user, get_optional_user, is_admin_token
+from .harvester import Harvester, harvest_store, OUTPUT_FORMATS
+from .leader import LeaderElection, LeaderLock
+from .watchlist import WatchlistScheduler, watchlist
+from .analytics import ArticleColumns, analyze
+from .citation_graph import citation_graph
+from .exporter import EXPORT_FORMATS, export_stream, iter_harvest
+from .http_cache import HTTPCacheMiddleware, content_etag, etag_matches, not_modified
+from .warming import (
+    CacheWarmer, cache_detail, cache_search, cache_summary, popularity, search_cache_key as make_search_key,
+    search_content, summary_content
+)
 import logging
 from typing import Optional
 import asyncio
 from datetime import datetime
-import redis
 from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+import importlib.util
+import json
+import math
+import time
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# 配置日志：经队列由后台线程写出
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Redis配置
-REDIS_URL = "redis://localhost:6379/0"
-redis_client = redis.from_url(REDIS_URL)
+redis_client = create_redis_client(REDIS_URL)
+
+upstream_breaker = get_breaker(urlparse(CNKI_KNS_URL).netloc)
+
+async def create_background_crawler(min_citations: int = 0, max_papers: int = 100) -> CNKICrawler:
+    """后台任务（批量采集、订阅刷新、缓存预热）使用的爬虫实例"""
+    return components.crawler(max_papers=max_papers, min_citations=min_citations, cookie=await CookiePool.get_cookie())
+
+harvester = Harvester(harvest_store, create_background_crawler)
+watchlist_scheduler = WatchlistScheduler(watchlist, create_background_crawler, components.summarizer)
+cache_warmer = CacheWarmer(popularity, create_background_crawler, components.summarizer)
 
 # 创建全局资源管理器
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 启动时初始化资源
+    await components.start()
     cookie_pool = CookiePool()
     anti_crawler = AntiCrawlerHandler()
     
-    # 启动Cookie池和代理池监控
-    asyncio.create_task(cookie_pool.start_monitoring())
-    asyncio.create_task(anti_crawler.monitor_ip_status())
+    # 后台维护任务（Cookie池和IP模式监控、订阅调度、恢复中断的采集、缓存预热）只在持有主节点锁的worker中运行
+    election = LeaderElection(LeaderLock(redis_client, "leader:background"), [
+        cookie_pool.start_monitoring,
+        anti_crawler.monitor_ip_status,
+        watchlist_scheduler.start,
+        harvester.watch_interrupted,
+        cache_warmer.start
+    ])
+    # 每个worker都需要：采集心跳、订阅IP封禁变更以保持本地封禁缓存一致
+    tasks = [
+        asyncio.create_task(election.run()),
+        asyncio.create_task(harvester.heartbeat()),
+        asyncio.create_task(ban_cache.listen())
+    ]
     
     yield
     
-    # 关闭时清理资源
+    # 关闭时清理资源：此时服务器已停止接收新请求并等待进行中的请求完成
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await harvester.stop()
+    await citation_graph.flush()
     await cookie_pool.close()
     await anti_crawler.close()
+    await components.aclose()
+    shutdown_tracing()
+    mark_worker_dead()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -53,6 +106,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class HarvestRequest(BaseModel):
+    query: str
+    max_articles: int = 1000
+    min_citations: int = 0
+    format: str = "jsonl"
+
+class WatchRequest(BaseModel):
+    query: str
+    interval_hours: float = 168
+
 class SearchRequest(BaseModel):
     query: str
     page: int = 1
@@ -63,6 +126,29 @@ class SearchRequest(BaseModel):
         "sort_by": "relevance"
     }
 
+# 单请求性能分析中间件：管理员携带 X-Profile: 1 时对该请求的处理过程执行cProfile
+# 注册在最前面，使其位于最内层，只包裹路由处理函数
+@app.middleware("http")
+async def request_profiling_middleware(request: Request, call_next):
+    if request.headers.get("X-Profile") != "1" or not is_admin_token(request.headers.get("Authorization")):
+        return await call_next(request)
+    
+    profile = request_profiles.start()
+    if profile is None:
+        # 同一时间只分析一个请求，重叠时两份结果会互相混入对方的调用
+        return JSONResponse(status_code=409, content={"detail": "已有请求正在进行性能分析，请稍后重试"})
+    
+    try:
+        response = await call_next(request)
+    finally:
+        profile_id = request_profiles.finish(profile, f"{request.method} {request.url.path}")
+    response.headers["X-Profile-Id"] = profile_id
+    response.headers["X-Profile-Scope"] = "event-loop-thread"  # 结果包含同时段其他协程的开销
+    return response
+
+# 压缩与条件请求中间件：位于限流之内，被限流的小响应不做处理
+app.middleware("http")(HTTPCacheMiddleware())
+
 # 请求频率限制中间件
 @app.middleware("http")
 async def rate_limit_middleware(request: Request, call_next):
@@ -80,7 +166,7 @@ async def rate_limit_middleware(request: Request, call_next):
     current_tokens = redis_client.get(bucket_key)
     
     if current_tokens is None:
-        redis_client.setex(bucket_key, 60, 10)  # 每分钟10个请求的限制
+        redis_client.setex(bucket_key, 60, RATE_LIMIT_PER_MINUTE)  # 每分钟请求数限制
     elif int(current_tokens) <= 0:
         return JSONResponse(
             status_code=429,
@@ -95,47 +181,126 @@ async def rate_limit_middleware(request: Request, call_next):
     response = await call_next(request)
     return response
 
+# 指标中间件需在限流之后注册，使其位于最外层，被限流的请求同样计入指标
+app.middleware("http")(MetricsMiddleware())
+
+# 链路追踪中间件最后注册，作为根span包裹限流与指标中间件
+@app.middleware("http")
+async def tracing_middleware(request: Request, call_next):
+    route = route_label(request)
+    start_time = time.perf_counter()
+    with span(
+        f"{request.method} {route}",
+        traceparent=request.headers.get("traceparent"),
+        method=request.method,
+        path=request.url.path
+    ) as root:
+        # 请求日志上下文：本请求内的日志都带有请求ID与路由，上游耗时累计到这里
+        context = {"request_id": request.headers.get("x-request-id") or root.trace_id, "route": route}
+        token = request_log_context.set(context)
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            root.set_attribute("http.status_code", response.status_code)
+            response.headers["X-Trace-Id"] = root.trace_id
+            response.headers["X-Request-Id"] = context["request_id"]
+            response.headers["traceparent"] = root.traceparent
+            return response
+        finally:
+            logger.info("%s %s %s", request.method, request.url.path, status, extra={
+                "method": request.method,
+                "status": status,
+                "duration_ms": round((time.perf_counter() - start_time) * 1000, 1),
+                "upstream_calls": context.get("upstream_calls", 0),
+                "upstream_ms": context.get("upstream_ms", 0.0)
+            })
+            request_log_context.reset(token)
+
+def stale_response(cache_key: str, cache: str, error: CircuitOpenError) -> JSONResponse:
+    """上游熔断时返回历史结果，没有可用结果则快速返回503"""
+    retry_after = str(math.ceil(error.retry_after))
+    cached = get_cached(cache_key, cache)
+    if cached is None:
+        raise HTTPException(
+            status_code=503,
+            detail=str(error),
+            headers={"Retry-After": retry_after}
+        )
+    
+    cached["stale"] = True
+    return JSONResponse(
+        content=cached,
+        status_code=200,
+        headers={"Retry-After": retry_after, "Warning": '110 - "Response is Stale"'}
+    )
+
+def search_params(request: SearchRequest) -> dict:
+    return {
+        "query": request.query,
+        "page": request.page,
+        "max_papers": request.settings.get("max_papers", 100),
+        "min_citations": request.settings.get("min_citations", 0)
+    }
+
+def search_cache_key(request: SearchRequest, prefix: str = "search_stale") -> str:
+    """检索结果缓存键（/search 写入，熔断降级与 /analytics 读取历史结果）"""
+    return make_search_key(prefix, **search_params(request))
+
 @app.post("/search")
 async def search_articles(request: SearchRequest, client_ip: str = None):
+    stale_key = search_cache_key(request)
+    popularity.record_query(**search_params(request))
     try:
-        logger.info(f"收到搜索请求: {request.query}, 设置: {request.settings}")
+        logger.info("收到搜索请求: %s, 设置: %s", request.query, request.settings)
         
-        crawler = CNKICrawler(
-            max_papers=request.settings.get("max_papers", 100),
-            min_citations=request.settings.get("min_citations", 0)
-        )
+        # 近期相同检索（含后台预热的热门检索）直接返回缓存
+        if SEARCH_CACHE_TTL > 0:
+            cached = get_cached(search_cache_key(request, "search"), "search")
+            if cached is not None:
+                return JSONResponse(content=cached, status_code=200)
+        
+        # 上游熔断时跳过智能延迟，直接走缓存
+        upstream_breaker.raise_if_open()
         
         # 获取当前可用的Cookie
         cookie = await CookiePool.get_cookie()
         if not cookie:
             raise HTTPException(status_code=503, detail="服务暂时不可用，请稍后重试")
         
-        # 创建爬虫实例并设置Cookie
-        crawler = CNKICrawler(cookie=cookie)
+        # 创建爬虫视图并设置Cookie（共享UserAgent与代理池）
+        crawler = components.crawler(
+            max_papers=request.settings.get("max_papers", 100),
+            min_citations=request.settings.get("min_citations", 0),
+            cookie=cookie
+        )
         
         # 智能延迟
         delay = await AntiCrawlerHandler.calculate_delay(client_ip)
-        await asyncio.sleep(delay)
+        with span("anti_crawler.delay", delay=delay):
+            await asyncio.sleep(delay)
         
         # 执行搜索
         articles = await crawler.search(request.query, request.page)
+        citation_graph.write_in_background(citation_graph.add_articles, articles.get("articles", []))
         
         # 更新Cookie状态
         await CookiePool.update_cookie_status(cookie, True)
         
+        content = search_content(articles, request.page)
+        cache_search(search_params(request), content)
+        
         return JSONResponse(
-            content={
-                "status": "success",
-                "data": articles,
-                "page_info": {
-                    "current_page": request.page,
-                    "total_pages": articles.get("total_pages", 1)
-                }
-            },
+            content=content,
             status_code=200
         )
+    except CircuitOpenError as e:
+        logger.warning("上游熔断，尝试返回缓存结果: %s", e)
+        return stale_response(stale_key, "search_stale", e)
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"搜索失败: {str(e)}")
+        logger.error("搜索失败: %s", e)
         
         # 如果是Cookie失效，标记该Cookie
         if "登录已过期" in str(e):
@@ -151,40 +316,83 @@ async def search_articles(request: SearchRequest, client_ip: str = None):
         )
 
 @app.get("/summarize/{article_id}")
-async def summarize_article(article_id: str, client_ip: str = None):
+async def summarize_article(
+    article_id: str,
+    client_ip: str = None,
+    mode: str = "full",
+    user: Optional[str] = Depends(get_optional_user),
+    if_none_match: Optional[str] = Header(None)
+):
+    if mode not in ("full", "fast"):
+        raise HTTPException(status_code=400, detail="mode可选 full 或 fast")
+    
+    stale_key = make_cache_key("summary_stale", article_id)
+    cache_control = f"public, max-age={SUMMARY_MAX_AGE}"
+    popularity.record_article(article_id)
+    # 客户端持有的完整分析与缓存一致时直接返回304，不请求上游和大模型
+    if mode == "full" and if_none_match:
+        cached = get_cached(stale_key, "summary_stale")
+        if cached is not None and etag_matches(if_none_match, content_etag(cached)):
+            return not_modified(content_etag(cached), cache_control)
+    # 已有完整分析（含后台预热生成的）时直接返回
+    if mode == "full" and SUMMARY_CACHE_TTL > 0:
+        cached = get_cached(make_cache_key("summary", article_id), "summary")
+        if cached is not None:
+            return JSONResponse(
+                content=cached,
+                status_code=200,
+                headers={"Cache-Control": cache_control, "ETag": content_etag(cached)}
+            )
+    
     try:
-        logger.info(f"收到文章总结请求: {article_id}")
-        
-        # 获取可用Cookie
-        cookie = await CookiePool.get_cookie()
-        crawler = CNKICrawler(cookie=cookie)
-        summarizer = ArticleSummarizer()
+        logger.info("收到文章总结请求: %s (%s)", article_id, mode)
         
-        # 智能延迟
-        delay = await AntiCrawlerHandler.calculate_delay(client_ip)
-        await asyncio.sleep(delay)
-        
-        # 获取文章内容
-        article_content = await crawler.get_article_content(article_id)
+        # 获取文章内容，优先使用缓存的详情
+        article_content = None
+        if DETAIL_CACHE_TTL > 0:
+            article_content = get_cached(make_cache_key("article", article_id), "article")
+        if article_content is None:
+            upstream_breaker.raise_if_open()
+            
+            # 获取可用Cookie
+            cookie = await CookiePool.get_cookie()
+            crawler = components.crawler(cookie=cookie)
+            
+            # 智能延迟
+            delay = await AntiCrawlerHandler.calculate_delay(client_ip)
+            with span("anti_crawler.delay", delay=delay):
+                await asyncio.sleep(delay)
+            
+            article_content = await crawler.get_article_content(article_id)
+            citation_graph.write_in_background(citation_graph.add_article, article_id, article_content)
+            cache_detail(article_id, article_content)
+            
+            # 更新Cookie状态
+            await CookiePool.update_cookie_status(cookie, True)
         
-        # 生成总结
-        summary = await summarizer.summarize(article_content)
+        # 生成总结：fast模式使用本地抽取式摘要，不调用大模型
+        if mode == "fast":
+            summary = components.extractive_summarizer().summarize(article_content)
+        else:
+            summary = await components.summarizer(user=user).summarize(article_content)
         
-        # 更新Cookie状态
-        await CookiePool.update_cookie_status(cookie, True)
+        content = summary_content(summary, article_content)
+        # 只缓存大模型生成的完整分析，供再次请求与上游熔断时返回
+        headers = {"Cache-Control": "no-cache"}
+        if "error" not in summary and summary.get("mode") != "fast":
+            cache_summary(article_id, content)
+            headers = {"Cache-Control": cache_control, "ETag": content_etag(content)}
         
         return JSONResponse(
-            content={
-                "status": "success",
-                "data": {
-                    "summary": summary,
-                    "article_info": article_content
-                }
-            },
-            status_code=200
+            content=content,
+            status_code=200,
+            headers=headers
         )
+    except CircuitOpenError as e:
+        logger.warning("上游熔断，尝试返回缓存结果: %s", e)
+        return stale_response(stale_key, "summary_stale", e)
     except Exception as e:
-        logger.error(f"生成总结失败: {str(e)}")
+        logger.error("生成总结失败: %s", e)
         
         if "访问受限" in str(e):
             await AntiCrawlerHandler.handle_access_denied(client_ip)
@@ -194,6 +402,227 @@ async def summarize_article(article_id: str, client_ip: str = None):
             detail=f"生成总结时发生错误: {str(e)}"
         )
 
+# 批量采集：创建后台任务，逐页落盘，可断点续传
+@app.post("/harvests")
+async def create_harvest(request: HarvestRequest):
+    if request.format not in OUTPUT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"不支持的输出格式，可选: {', '.join(OUTPUT_FORMATS)}")
+    if request.format == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        raise HTTPException(status_code=400, detail="Parquet输出需要安装pyarrow")
+    if not 0 < request.max_articles <= HARVEST_MAX_ARTICLES:
+        raise HTTPException(status_code=400, detail=f"max_articles需在(0, {HARVEST_MAX_ARTICLES}]内")
+    
+    harvest = harvest_store.create(request.query, request.format, request.max_articles, request.min_citations)
+    harvester.start(harvest["id"])
+    logger.info("创建采集任务 %s: %s", harvest['id'], request.query)
+    return harvest_store.get(harvest["id"])
+
+@app.get("/harvests")
+async def list_harvests():
+    return harvest_store.list()
+
+@app.get("/harvests/{harvest_id}")
+async def get_harvest(harvest_id: str):
+    harvest = harvest_store.get(harvest_id)
+    if harvest is None:
+        raise HTTPException(status_code=404, detail="采集任务不存在")
+    harvest["running"] = harvester.is_active(harvest)
+    return harvest
+
+# 从断点恢复失败的采集任务
+@app.post("/harvests/{harvest_id}/resume")
+async def resume_harvest(harvest_id: str):
+    harvest = harvest_store.get(harvest_id)
+    if harvest is None:
+        raise HTTPException(status_code=404, detail="采集任务不存在")
+    if harvest["status"] == "completed":
+        raise HTTPException(status_code=409, detail="采集任务已完成")
+    if harvester.is_active(harvest) or not harvester.start(harvest_id):
+        raise HTTPException(status_code=409, detail="采集任务正在运行")
+    return harvest_store.get(harvest_id)
+
+# 订阅检索：保存检索式，后台按间隔增量刷新
+@app.post("/watchlist")
+async def create_watch(request: WatchRequest, user: str = Depends(get_current_user)):
+    interval = int(request.interval_hours * 3600)
+    if interval < WATCHLIST_MIN_INTERVAL:
+        raise HTTPException(status_code=400, detail=f"刷新间隔不能小于{WATCHLIST_MIN_INTERVAL // 3600}小时")
+    return watchlist.add(user, request.query, interval)
+
+@app.get("/watchlist")
+async def list_watches(user: str = Depends(get_current_user)):
+    return watchlist.list(user)
+
+def get_user_watch(watch_id: str, user: str) -> dict:
+    watch = watchlist.get(watch_id)
+    if watch is None or watch["user"] != user:
+        raise HTTPException(status_code=404, detail="订阅不存在")
+    return watch
+
+@app.delete("/watchlist/{watch_id}")
+async def delete_watch(watch_id: str, user: str = Depends(get_current_user)):
+    watchlist.remove(get_user_watch(watch_id, user))
+    return {"status": "success"}
+
+@app.get("/watchlist/{watch_id}/hits")
+async def get_watch_hits(watch_id: str, limit: int = 50, user: str = Depends(get_current_user)):
+    get_user_watch(watch_id, user)
+    return watchlist.hits(watch_id, min(max(limit, 1), 500))
+
+# 立即刷新一个订阅
+@app.post("/watchlist/{watch_id}/refresh")
+async def refresh_watch(watch_id: str, user: str = Depends(get_current_user)):
+    get_user_watch(watch_id, user)
+    try:
+        new_articles = await watchlist_scheduler.refresh(watch_id)
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"刷新订阅失败: {str(e)}")
+    if new_articles is None:
+        raise HTTPException(status_code=409, detail="订阅正在刷新")
+    return {"status": "success", "new_articles": new_articles, "watch": watchlist.get(watch_id)}
+
+def run_analytics(columns: ArticleColumns, top_n: int) -> dict:
+    """补全缓存中的关键词并计算统计（CPU密集，在线程中执行）"""
+    columns.fill_cached_keywords()
+    return analyze(columns, top_n)
+
+# 文献计量统计：对采集结果做聚合
+@app.get("/analytics")
+async def harvest_analytics(harvest_id: str, top_n: int = 20):
+    harvest = harvest_store.get(harvest_id)
+    if harvest is None:
+        raise HTTPException(status_code=404, detail="采集任务不存在")
+    
+    def load_and_analyze():
+        return run_analytics(ArticleColumns.from_harvest(harvest), min(max(top_n, 1), 100))
+    
+    with span("analytics.harvest", harvest_id=harvest_id):
+        return await asyncio.to_thread(load_and_analyze)
+
+async def load_search_content(request: SearchRequest, client_ip: str = None) -> dict:
+    """优先使用最近一次的检索结果，没有则执行检索"""
+    content = get_cached(search_cache_key(request), "search_stale")
+    if content is None:
+        response = await search_articles(request, client_ip)
+        content = json.loads(response.body)
+    return content
+
+# 文献计量统计：对一次检索的结果做聚合，优先使用最近一次的检索结果
+@app.post("/analytics")
+async def search_analytics(request: SearchRequest, top_n: int = 20, client_ip: str = None):
+    content = await load_search_content(request, client_ip)
+    
+    columns = ArticleColumns.from_articles(content["data"]["articles"])
+    with span("analytics.search", articles=len(columns)):
+        return await asyncio.to_thread(run_analytics, columns, min(max(top_n, 1), 100))
+
+def export_response(articles, output_format: str, filename: str, http_request: Request) -> StreamingResponse:
+    """流式导出；客户端支持gzip时边生成边压缩（Parquet本身已压缩，不再gzip）"""
+    if output_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"不支持的导出格式，可选: {', '.join(EXPORT_FORMATS)}")
+    if output_format == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        raise HTTPException(status_code=400, detail="Parquet导出需要安装pyarrow")
+    
+    media_type, extension = EXPORT_FORMATS[output_format]
+    compress = output_format != "parquet" and "gzip" in http_request.headers.get("accept-encoding", "")
+    headers = {"Content-Disposition": f'attachment; filename="{filename}.{extension}"'}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    return StreamingResponse(
+        export_stream(articles, output_format, compress=compress),
+        media_type=media_type,
+        headers=headers
+    )
+
+# 导出采集结果（已提交的部分），逐批读取输出文件
+@app.get("/export")
+async def export_harvest(http_request: Request, harvest_id: str, output_format: str = Query("csv", alias="format")):
+    harvest = harvest_store.get(harvest_id)
+    if harvest is None:
+        raise HTTPException(status_code=404, detail="采集任务不存在")
+    return export_response(iter_harvest(harvest), output_format, f"harvest-{harvest_id}", http_request)
+
+# 导出检索结果，优先使用最近一次的检索结果
+@app.post("/export")
+async def export_search(
+    request: SearchRequest,
+    http_request: Request,
+    output_format: str = Query("csv", alias="format"),
+    client_ip: str = None
+):
+    content = await load_search_content(request, client_ip)
+    return export_response(content["data"]["articles"], output_format, "search", http_request)
+
+# 引文网络：参考文献、施引文献、同被引文献与PageRank
+@app.get("/citations/{article_id}")
+async def get_citations(article_id: str, limit: int = 20):
+    with span("citations.neighbors", article_id=article_id):
+        result = await asyncio.to_thread(citation_graph.neighbors, article_id, min(max(limit, 1), 100))
+    if result is None:
+        raise HTTPException(status_code=404, detail="引文网络中没有该文献")
+    return result
+
+# 引文网络中PageRank最高的文献
+@app.get("/citations")
+async def top_citations(limit: int = 20, known_only: bool = True):
+    return await asyncio.to_thread(citation_graph.top_ranked, min(max(limit, 1), 100), known_only)
+
+# Prometheus指标接口
+@app.get("/metrics")
+async def metrics():
+    return Response(metrics_payload(), media_type=CONTENT_TYPE_LATEST)
+
+# 采样分析：对当前worker采样N秒，返回折叠栈文件
+@app.get("/admin/profile")
+async def profile_worker(
+    seconds: float = 10.0,
+    interval: float = 0.005,
+    admin: str = Depends(get_admin_user)
+):
+    if not 0 < seconds <= 60 or not 0.001 <= interval <= 1:
+        raise HTTPException(status_code=400, detail="seconds需在(0, 60]内，interval需在[0.001, 1]内")
+    
+    logger.info("管理员 %s 开始采样分析 %ss", admin, seconds)
+    try:
+        collapsed = await asyncio.to_thread(sampling_profiler.run, seconds, interval)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    filename = f"profile-{datetime.now().strftime('%Y%m%d%H%M%S')}.collapsed"
+    return PlainTextResponse(
+        collapsed,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+# 获取单请求cProfile结果，format=text 返回排序后的统计文本，format=pstats 返回原始数据
+@app.get("/admin/profile/requests/{profile_id}")
+async def get_request_profile(
+    profile_id: str,
+    format: str = "text",
+    sort_by: str = "cumulative",
+    admin: str = Depends(get_admin_user)
+):
+    if sort_by not in ("cumulative", "tottime", "calls", "ncalls"):
+        raise HTTPException(status_code=400, detail="不支持的排序字段")
+    
+    if format == "pstats":
+        data = request_profiles.render_pstats(profile_id)
+        if data is None:
+            raise HTTPException(status_code=404, detail="分析结果不存在或已过期")
+        return Response(
+            data,
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.prof"'}
+        )
+    
+    text = request_profiles.render_text(profile_id, sort_by=sort_by)
+    if text is None:
+        raise HTTPException(status_code=404, detail="分析结果不存在或已过期")
+    return PlainTextResponse(text)
+
 # 健康检查接口
 @app.get("/health")
 async def health_check():
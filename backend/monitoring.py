@@ -1,22 +1,158 @@
-from prometheus_client import Counter, Histogram
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from starlette.routing import Match
+from contextlib import contextmanager
+import os
+import redis
 import time
+from .tracing import current_span, span
 
 # 定义指标
-REQUEST_COUNT = Counter('http_requests_total', 'Total HTTP requests')
-REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'HTTP request latency')
+REQUEST_COUNT = Counter('http_requests_total', 'Total HTTP requests', ['method', 'route', 'status'])
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'HTTP request latency', ['method', 'route'])
 CRAWLER_ERROR_COUNT = Counter('crawler_errors_total', 'Total crawler errors')
 API_ERROR_COUNT = Counter('api_errors_total', 'Total API errors')
 
+# 上游抓取
+UPSTREAM_FETCH_LATENCY = Histogram(
+    'upstream_fetch_duration_seconds',
+    'Latency of a single upstream fetch attempt',
+    ['endpoint', 'outcome'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30)
+)
+PARSE_LATENCY = Histogram(
+    'parse_duration_seconds',
+    'HTML parse and extraction time',
+    ['page'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+)
+ANTI_CRAWLER_DELAY = Histogram(
+    'anti_crawler_delay_seconds',
+    'Deliberate delay applied before upstream requests',
+    buckets=(0.5, 1, 2, 3, 5, 7.5, 10)
+)
+
+SESSION_BOOTSTRAPS = Counter('upstream_session_bootstraps_total', 'Upstream search session initialisations', ['reason'])
+UPSTREAM_RETRIES = Counter('upstream_retries_total', 'Upstream retry decisions', ['outcome'])
+CIRCUIT_STATE = Gauge(
+    'circuit_breaker_state', 'Circuit breaker state (0=closed, 1=half-open, 2=open)', ['host'],
+    multiprocess_mode='livemax'
+)
+
+# Redis
+REDIS_LATENCY = Histogram(
+    'redis_command_duration_seconds',
+    'Redis command latency',
+    ['command'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+)
+
+# 大模型
+LLM_LATENCY = Histogram(
+    'llm_request_duration_seconds',
+    'LLM API call latency per analysis section',
+    ['section', 'outcome'],
+    buckets=(0.5, 1, 2.5, 5, 10, 15, 20, 30, 45, 60)
+)
+LLM_TOKENS = Histogram(
+    'llm_tokens',
+    'LLM token usage per call',
+    ['section', 'kind'],
+    buckets=(50, 100, 250, 500, 1000, 2000, 4000, 8000)
+)
+# 用户数不受控，只按优先级统计，避免标签基数随用户增长
+LLM_QUEUE_DEPTH = Gauge(
+    'llm_queue_depth', 'LLM calls waiting for a scheduler slot', ['priority'], multiprocess_mode='livesum'
+)
+LLM_QUEUE_WAIT = Histogram(
+    'llm_queue_wait_seconds',
+    'Time an LLM call waited for a scheduler slot',
+    ['priority'],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+)
+
+# 缓存与队列
+CACHE_REQUESTS = Counter('cache_requests_total', 'Cache lookups', ['cache', 'result'])
+CACHE_WARM_REFRESHES = Counter('cache_warm_refreshes_total', 'Background cache warming refreshes', ['kind', 'outcome'])
+QUEUE_DEPTH = Gauge(
+    'work_queue_depth', 'Requests waiting or in progress per stage', ['queue'], multiprocess_mode='livesum'
+)
+
+# 日志
+LOG_RECORDS_DROPPED = Counter('log_records_dropped_total', 'Log records not written', ['reason'])
+
+
+@contextmanager
+def track_latency(histogram: Histogram, **labels):
+    """记录代码块耗时"""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.labels(**labels).observe(time.perf_counter() - start_time)
+
+
+class InstrumentedRedis(redis.Redis):
+    """记录每条命令耗时的Redis客户端"""
+
+    def execute_command(self, *args, **options):
+        command = str(args[0]).lower()
+        start_time = time.perf_counter()
+        try:
+            # 只在请求链路内记录span，避免后台任务的每条命令都产生独立trace
+            if current_span() is None:
+                return super().execute_command(*args, **options)
+            with span(f"redis.{command}", **{"db.system": "redis"}):
+                return super().execute_command(*args, **options)
+        finally:
+            REDIS_LATENCY.labels(command=command).observe(time.perf_counter() - start_time)
+
+
+
+def metrics_payload() -> bytes:
+    """多worker时（server设置了 PROMETHEUS_MULTIPROC_DIR）汇总所有worker写入的指标，否则输出本进程指标"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
+
+
+def mark_worker_dead() -> None:
+    """worker退出时清理其live*类型仪表的指标文件"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def create_redis_client(url: str) -> redis.Redis:
+    return InstrumentedRedis.from_url(url)
+
+
+def route_label(request) -> str:
+    """使用路由模板作为标签，避免路径参数导致标签基数爆炸"""
+    for route in request.app.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "unmatched")
+    return "unmatched"
+
+
 class MetricsMiddleware:
     async def __call__(self, request, call_next):
-        REQUEST_COUNT.inc()
+        route = route_label(request)
+        method = request.method
+        status = "500"
         start_time = time.time()
-        
+
         try:
-            response = await call_next(request)
+            with QUEUE_DEPTH.labels(queue="http").track_inprogress():
+                response = await call_next(request)
+            status = str(response.status_code)
+            if response.status_code >= 500:
+                API_ERROR_COUNT.inc()
             return response
         except Exception as e:
             API_ERROR_COUNT.inc()
             raise
         finally:
-            REQUEST_LATENCY.observe(time.time() - start_time) 
\ No newline at end of file
+            REQUEST_COUNT.labels(method=method, route=route, status=status).inc()
+            REQUEST_LATENCY.labels(method=method, route=route).observe(time.time() - start_time)
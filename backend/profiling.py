@@ -0,0 +1,130 @@
+from collections import Counter, OrderedDict
+from typing import Dict, Optional
+import cProfile
+import io
+import logging
+import marshal
+import pstats
+import sys
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class ProfilerBusyError(Exception):
+    pass
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = "/".join(code.co_filename.replace("\\", "/").split("/")[-2:])
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """基于 sys._current_frames 的采样分析器，输出折叠栈（collapsed stack）格式"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def _sample(self, duration: float, interval: float) -> Counter:
+        stacks: Counter = Counter()
+        own_id = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        deadline = time.monotonic() + duration
+
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                frames = []
+                while frame is not None:
+                    frames.append(_frame_label(frame))
+                    frame = frame.f_back
+                frames.append(f"thread:{names.get(thread_id, thread_id)}")
+                stacks[";".join(reversed(frames))] += 1
+            time.sleep(interval)
+
+        return stacks
+
+    def run(self, duration: float, interval: float = 0.005) -> str:
+        """阻塞采样duration秒，返回折叠栈文本（可直接用于flamegraph.pl或speedscope）"""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusyError("已有采样任务在运行")
+        try:
+            stacks = self._sample(duration, interval)
+        finally:
+            self._lock.release()
+
+        logger.info("采样完成: %s 个样本, %s 条调用栈", sum(stacks.values()), len(stacks))
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+# cProfile作用于整个线程：被分析请求等待IO期间，同一事件循环上其他协程的调用也会计入
+PROFILE_SCOPE_NOTE = "cProfile作用于整个事件循环线程，结果包含分析期间同一worker上其他协程的开销"
+
+
+class RequestProfileStore:
+    """保存最近的单请求cProfile结果；同一时间只分析一个请求"""
+
+    def __init__(self, max_entries: int = 50):
+        self.max_entries = max_entries
+        self._profiles: "OrderedDict[str, Dict]" = OrderedDict()
+        self._active = threading.Lock()
+
+    def start(self) -> Optional[cProfile.Profile]:
+        """开始分析；已有请求在分析时返回None，由调用方拒绝该请求"""
+        if not self._active.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def finish(self, profile: cProfile.Profile, path: str) -> str:
+        profile.disable()
+        self._active.release()
+        profile.create_stats()
+
+        profile_id = uuid.uuid4().hex
+        self._profiles[profile_id] = {
+            "path": path,
+            "created_at": time.time(),
+            "stats": profile.stats
+        }
+        while len(self._profiles) > self.max_entries:
+            self._profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id: str) -> Optional[Dict]:
+        return self._profiles.get(profile_id)
+
+    def render_text(self, profile_id: str, sort_by: str = "cumulative", limit: int = 50) -> Optional[str]:
+        entry = self.get(profile_id)
+        if entry is None:
+            return None
+        stream = io.StringIO()
+        stats = pstats.Stats(_StatsHolder(entry["stats"]), stream=stream)
+        stats.sort_stats(sort_by).print_stats(limit)
+        return f"{entry['path']}\n注意: {PROFILE_SCOPE_NOTE}\n{stream.getvalue()}"
+
+    def render_pstats(self, profile_id: str) -> Optional[bytes]:
+        """返回可被 pstats/snakeviz 加载的原始统计数据"""
+        entry = self.get(profile_id)
+        if entry is None:
+            return None
+        return marshal.dumps(entry["stats"])
+
+
+class _StatsHolder:
+    # pstats.Stats 接受任何带有 create_stats()/stats 的对象
+    def __init__(self, stats: Dict):
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+
+sampling_profiler = SamplingProfiler()
+request_profiles = RequestProfileStore()
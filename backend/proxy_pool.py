@@ -3,27 +3,31 @@ import asyncio
 from typing import Dict, List, Optional
 import random
 import logging
+from .config import PROXY_API_URL
 
 logger = logging.getLogger(__name__)
 
 class ProxyPool:
     def __init__(self):
         self.proxies: List[Dict] = []
-        self.proxy_api_url = "http://your-proxy-api.com/get"  # 替换为实际的代理API
+        self.proxy_api_url = PROXY_API_URL
         self.min_proxies = 10
         self.check_interval = 300  # 5分钟检查一次代理可用性
         
     async def _fetch_proxies(self) -> None:
         """从代理API获取新的代理"""
+        if not self.proxy_api_url:
+            return
+            
         try:
             async with aiohttp.ClientSession() as session:
                 async with session.get(self.proxy_api_url) as response:
                     if response.status == 200:
                         proxies = await response.json()
                         self.proxies.extend(proxies)
-                        logger.info(f"成功获取 {len(proxies)} 个新代理")
+                        logger.info("成功获取 %s 个新代理", len(proxies))
         except Exception as e:
-            logger.error(f"获取代理失败: {str(e)}")
+            logger.error("获取代理失败: %s", e)
     
     async def _check_proxy(self, proxy: Dict) -> bool:
         """检查代理是否可用"""
@@ -49,7 +53,7 @@ class ProxyPool:
                 valid_proxies.append(proxy)
         
         self.proxies = valid_proxies
-        logger.info(f"当前可用代理数量: {len(self.proxies)}")
+        logger.info("当前可用代理数量: %s", len(self.proxies))
     
     async def get_proxy(self) -> Optional[Dict]:
         """获取一个可用的代理"""
@@ -0,0 +1,53 @@
+"""生产环境启动入口
+
+    python -m backend.server            # worker数取 WEB_CONCURRENCY
+    python -m backend.server --workers 4
+
+多个worker共享监听端口；后台维护任务通过Redis主节点锁只在一个worker中运行，
+缓存为每个worker的进程内L1加共享的Redis（L2）。收到SIGTERM/SIGINT后停止接收
+新连接，最多等待 SHUTDOWN_GRACE_PERIOD 秒让进行中的请求完成，再执行lifespan
+中的清理（取消后台任务、释放主节点锁）。
+
+多个worker时启用prometheus-client的多进程模式：各worker把指标写入
+PROMETHEUS_MULTIPROC_DIR 下的文件，/metrics 汇总所有worker的指标。
+"""
+import argparse
+import os
+import tempfile
+import uvicorn
+from .config import SHUTDOWN_GRACE_PERIOD, WEB_CONCURRENCY
+
+
+def prepare_metrics_dir(workers: int) -> None:
+    """必须在worker导入prometheus_client之前设置；启动时清空上次运行遗留的指标文件"""
+    if workers <= 1:
+        return
+    path = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="prometheus-"))
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if name.endswith(".db"):
+            os.remove(os.path.join(path, name))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="启动后端服务")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    prepare_metrics_dir(args.workers)
+
+    uvicorn.run(
+        "backend.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level=args.log_level,
+        timeout_graceful_shutdown=SHUTDOWN_GRACE_PERIOD,
+        proxy_headers=True
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+from bs4 import BeautifulSoup
+from typing import Dict, Optional
+from urllib.parse import urlparse
+import asyncio
+import logging
+import time
+import httpx
+from .config import CNKI_KNS_URL, SESSION_TTL
+from .circuit_breaker import get_breaker
+from .monitoring import PARSE_LATENCY, SESSION_BOOTSTRAPS, track_latency
+from .tracing import span
+
+logger = logging.getLogger(__name__)
+
+# 检索接口返回这些内容时说明token/会话已失效
+SESSION_INVALID_MARKERS = ("会话已过期", "token失效", "请重新检索")
+
+
+class SessionManager:
+    """进程内共享的CNKI检索会话（Cookie + token），懒加载、过期或失效时才刷新"""
+
+    def __init__(self, base_url: str, ttl: float = 1800):
+        self.base_url = base_url
+        self.ttl = ttl
+        self._session: Optional[Dict] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _is_valid(self, session: Optional[Dict]) -> bool:
+        return session is not None and time.time() - session["created_at"] < self.ttl
+
+    @staticmethod
+    def is_invalid_response(html: str) -> bool:
+        return any(marker in html for marker in SESSION_INVALID_MARKERS)
+
+    async def get_session(self, headers: Dict) -> Dict:
+        """返回当前会话，必要时初始化；并发请求只会触发一次初始化"""
+        session = self._session
+        if self._is_valid(session):
+            return session
+
+        if self._lock is None:
+            # 在事件循环内创建，避免绑定到导入时的循环
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._is_valid(self._session):
+                return self._session
+            reason = "initial" if self._session is None else "expired"
+            self._session = await self._bootstrap(headers, reason)
+            return self._session
+
+    async def invalidate(self, session: Optional[Dict]) -> None:
+        """标记会话失效；只有仍是当前会话时才清除，避免并发请求重复刷新"""
+        if session is not None and self._session is session:
+            logger.info("检索会话已失效，下次请求时重新初始化")
+            self._session = None
+            SESSION_BOOTSTRAPS.labels(reason="invalidated").inc()
+
+    async def _bootstrap(self, headers: Dict, reason: str) -> Dict:
+        """访问首页获取Cookie与token，并初始化检索参数"""
+        # 只判断是否熔断，不占用半开探测名额：初始化请求不记录结果
+        get_breaker(urlparse(self.base_url).netloc).raise_if_open()
+        SESSION_BOOTSTRAPS.labels(reason=reason).inc()
+        try:
+            with span("upstream.init_session", reason=reason):
+                async with httpx.AsyncClient(headers=headers) as client:
+                    # 访问首页获取初始Cookie
+                    response = await client.get(f"{self.base_url}/kns8/defaultresult/index")
+                    cookies = dict(response.cookies)
+
+                    # 获取必要的token和参数
+                    with track_latency(PARSE_LATENCY, page="session"):
+                        soup = BeautifulSoup(response.text, 'html.parser')
+                        token = soup.select_one('input[name="token"]')['value']
+
+                    # 初始化搜索参数
+                    init_params = {
+                        "action": "init",
+                        "NaviCode": "*",
+                        "ua": "1.21",
+                        "PageName": "ASP.brief_default_result_aspx",
+                        "DbPrefix": "SCDB",
+                        "DbCatalog": "中国学术文献网络出版总库"
+                    }
+
+                    await client.post(
+                        f"{self.base_url}/kns8/Brief/GetGridTableHtml",
+                        data=init_params,
+                        cookies=cookies
+                    )
+
+            logger.info("检索会话已初始化 (%s)", reason)
+            return {"cookies": cookies, "token": token, "created_at": time.time()}
+
+        except Exception as e:
+            logger.error("初始化会话失败: %s", e)
+            raise
+
+
+session_manager = SessionManager(CNKI_KNS_URL, ttl=SESSION_TTL)
@@ -0,0 +1,214 @@
+"""轻量级链路追踪
+
+提供OpenTelemetry风格的span（W3C traceparent传播、OTLP/JSON导出格式），
+导出到本地文件（每行一个ExportTraceServiceRequest，可被OTel Collector的
+otlpjsonfile receiver读取）或通过OTLP/HTTP发送到本地Collector。
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+import json
+import logging
+import queue
+import secrets
+import threading
+import time
+import httpx
+from .config import TRACE_EXPORTER, TRACE_FILE, OTLP_ENDPOINT, SERVICE_NAME
+
+logger = logging.getLogger(__name__)
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None, attributes: Optional[Dict] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.error = f"{type(exc).__name__}: {exc}"
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_otlp(self) -> Dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items() if v is not None],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1}
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_attribute(key: str, value) -> Dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class FileSpanExporter:
+    """以OTLP/JSON行格式追加写入文件"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, payload: Dict) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(payload, ensure_ascii=False) + "\n")
+
+
+class OTLPHttpExporter:
+    """通过OTLP/HTTP(JSON)发送到Collector"""
+
+    def __init__(self, endpoint: str):
+        self.url = f"{endpoint.rstrip('/')}/v1/traces"
+        self.client = httpx.Client(timeout=5.0)
+
+    def export(self, payload: Dict) -> None:
+        self.client.post(self.url, json=payload).raise_for_status()
+
+
+class BatchSpanProcessor:
+    """在后台线程中批量导出已结束的span，避免阻塞事件循环"""
+
+    def __init__(self, exporter, max_batch: int = 256, interval: float = 2.0, max_queue: int = 10000):
+        self.exporter = exporter
+        self.max_batch = max_batch
+        self.interval = interval
+        self.queue: "queue.Queue[Span]" = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def on_end(self, span: Span) -> None:
+        try:
+            self.queue.put_nowait(span)
+        except queue.Full:
+            pass  # 导出跟不上时直接丢弃，不影响业务请求
+
+    def _drain(self) -> List[Span]:
+        spans = []
+        while len(spans) < self.max_batch:
+            try:
+                spans.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return spans
+
+    def _export(self, spans: List[Span]) -> None:
+        payload = {"resourceSpans": [{
+            "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]},
+            "scopeSpans": [{
+                "scope": {"name": "backend.tracing"},
+                "spans": [span.to_otlp() for span in spans]
+            }]
+        }]}
+        try:
+            self.exporter.export(payload)
+        except Exception as e:
+            logger.warning("导出追踪数据失败: %s", e)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def flush(self) -> None:
+        spans = self._drain()
+        while spans:
+            self._export(spans)
+            spans = self._drain()
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=5)
+        self.flush()
+
+
+def _create_processor() -> Optional[BatchSpanProcessor]:
+    if TRACE_EXPORTER == "file":
+        return BatchSpanProcessor(FileSpanExporter(TRACE_FILE))
+    if TRACE_EXPORTER == "otlp":
+        return BatchSpanProcessor(OTLPHttpExporter(OTLP_ENDPOINT))
+    return None
+
+
+processor = _create_processor()
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[tuple]:
+    """解析W3C traceparent头，返回(trace_id, parent_span_id)"""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or parts[1] == "0" * 32:
+        return None
+    return parts[1], parts[2]
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    span = _current_span.get()
+    return span.trace_id if span else None
+
+
+@contextmanager
+def span(name: str, traceparent: Optional[str] = None, **attributes):
+    """创建子span；没有父span时开启新的trace（可通过traceparent继承上游trace）"""
+    parent = _current_span.get()
+    if parent is not None:
+        trace_id, parent_id = parent.trace_id, parent.span_id
+    else:
+        trace_id, parent_id = parse_traceparent(traceparent) or (secrets.token_hex(16), None)
+
+    current = Span(name, trace_id, parent_id, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.record_exception(e)
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+        if processor is not None:
+            processor.on_end(current)
+
+
+class TraceContextFilter(logging.Filter):
+    """为日志记录注入trace_id/span_id"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        span = _current_span.get()
+        record.trace_id = span.trace_id if span else "-"
+        record.span_id = span.span_id if span else "-"
+        return True
+
+
+def shutdown() -> None:
+    if processor is not None:
+        processor.shutdown()
@@ -0,0 +1,251 @@
+"""热点统计与缓存预热
+
+/search 与 /summarize 的访问按检索参数、文献ID计入Redis有序集合，由主节点每轮
+按 POPULARITY_HALF_LIFE 指数衰减（ZUNIONSTORE乘以衰减系数）并裁剪，得分即近期
+热度；关闭预热时每 POPULARITY_DECAY_INTERVAL 秒只做衰减与裁剪。预热任务只在主节点运行：取热度最高的检索与文献，对剩余有效期不足
+WARM_REFRESH_AHEAD 的检索结果、文章详情和完整分析提前刷新，每轮的上游请求与
+大模型分析数量分别受 WARM_UPSTREAM_BUDGET、WARM_LLM_BUDGET 限制，大模型调用
+使用批量优先级，不挤占交互请求。完整分析只续期已有缓存，不为从未分析过的文献
+生成新的分析。
+"""
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+import asyncio
+import json
+import logging
+import random
+import time
+from .cache import get_cached, make_cache_key, redis_client, set_cached
+from .circuit_breaker import CircuitOpenError
+from .config import (
+    DETAIL_CACHE_TTL, POPULARITY_DECAY_INTERVAL, POPULARITY_HALF_LIFE, POPULARITY_MAX_ENTRIES, SEARCH_CACHE_TTL, STALE_CACHE_TTL,
+    SUMMARY_CACHE_TTL, WARM_FETCH_DELAY, WARM_HOT_ARTICLES, WARM_HOT_QUERIES, WARM_INTERVAL, WARM_LLM_BUDGET,
+    WARM_REFRESH_AHEAD, WARM_UPSTREAM_BUDGET
+)
+from .llm_scheduler import BATCH
+from .monitoring import CACHE_WARM_REFRESHES
+from .tracing import span
+
+logger = logging.getLogger(__name__)
+
+MIN_POPULARITY = 0.01  # 衰减到该得分以下的条目被移除
+WARMER_USER = "cache-warmer"  # 大模型调度中预热任务的用户名
+
+
+def search_cache_key(prefix: str, query: str, page: int, max_papers: int, min_citations: int) -> str:
+    return make_cache_key(prefix, query, page, max_papers, min_citations)
+
+
+def search_content(articles: Dict, page: int) -> Dict:
+    return {
+        "status": "success",
+        "data": articles,
+        "page_info": {
+            "current_page": page,
+            "total_pages": articles.get("total_pages", 1)
+        }
+    }
+
+
+def summary_content(summary: Dict, article_content: Dict) -> Dict:
+    return {
+        "status": "success",
+        "data": {
+            "summary": summary,
+            "article_info": article_content
+        }
+    }
+
+
+def cache_search(params: Dict, content: Dict) -> None:
+    """写入检索结果：直接返回用的短期缓存与熔断降级用的历史结果"""
+    if SEARCH_CACHE_TTL > 0:
+        set_cached(search_cache_key("search", **params), content, SEARCH_CACHE_TTL)
+    set_cached(search_cache_key("search_stale", **params), content, STALE_CACHE_TTL)
+
+
+def cache_detail(article_id: str, article_content: Dict) -> None:
+    if DETAIL_CACHE_TTL > 0:
+        set_cached(make_cache_key("article", article_id), article_content, DETAIL_CACHE_TTL)
+
+
+def cache_summary(article_id: str, content: Dict) -> None:
+    """写入完整分析：直接返回用的缓存与熔断降级用的历史结果"""
+    if SUMMARY_CACHE_TTL > 0:
+        set_cached(make_cache_key("summary", article_id), content, SUMMARY_CACHE_TTL)
+    set_cached(make_cache_key("summary_stale", article_id), content, STALE_CACHE_TTL)
+
+
+class PopularityTracker:
+    def __init__(self, redis_client, half_life: float = POPULARITY_HALF_LIFE, max_entries: int = POPULARITY_MAX_ENTRIES):
+        self.redis_client = redis_client
+        self.half_life = half_life
+        self.max_entries = max_entries
+        self.queries_key = "popularity:queries"
+        self.articles_key = "popularity:articles"
+        self.decayed_at_key = "popularity:decayed_at"
+
+    def _record(self, key: str, member: str) -> None:
+        # 热度统计失败不影响请求本身
+        try:
+            self.redis_client.zincrby(key, 1, member)
+        except Exception as e:
+            logger.warning("记录热度失败: %s", e)
+
+    def record_query(self, query: str, page: int, max_papers: int, min_citations: int) -> None:
+        self._record(self.queries_key, json.dumps([query, page, max_papers, min_citations], ensure_ascii=False))
+
+    def record_article(self, article_id: str) -> None:
+        self._record(self.articles_key, article_id)
+
+    def decay(self, now: Optional[float] = None) -> None:
+        """按距上次衰减经过的时间整体衰减得分，移除过冷条目并限制条目数"""
+        now = time.time() if now is None else now
+        last = self.redis_client.get(self.decayed_at_key)
+        pipe = self.redis_client.pipeline()
+        if last is not None:
+            factor = 0.5 ** (max(now - float(last), 0) / self.half_life)
+            for key in (self.queries_key, self.articles_key):
+                pipe.zunionstore(key, {key: factor})
+                pipe.zremrangebyscore(key, "-inf", MIN_POPULARITY)
+                pipe.zremrangebyrank(key, 0, -self.max_entries - 1)
+        pipe.set(self.decayed_at_key, now)
+        pipe.execute()
+
+    def hot_queries(self, limit: int) -> List[Dict]:
+        return [
+            dict(zip(("query", "page", "max_papers", "min_citations"), json.loads(member)))
+            for member in self.redis_client.zrevrange(self.queries_key, 0, limit - 1)
+        ]
+
+    def hot_articles(self, limit: int) -> List[str]:
+        return [
+            member.decode() if isinstance(member, bytes) else member
+            for member in self.redis_client.zrevrange(self.articles_key, 0, limit - 1)
+        ]
+
+
+class CacheWarmer:
+    """后台循环：提前刷新热门检索、详情与完整分析的缓存"""
+
+    def __init__(
+        self,
+        tracker: PopularityTracker,
+        crawler_factory: Callable,
+        summarizer_factory: Callable,
+        interval: float = WARM_INTERVAL,
+        refresh_ahead: float = WARM_REFRESH_AHEAD,
+        upstream_budget: int = WARM_UPSTREAM_BUDGET,
+        llm_budget: int = WARM_LLM_BUDGET,
+        fetch_delay: float = WARM_FETCH_DELAY
+    ):
+        self.tracker = tracker
+        self.crawler_factory = crawler_factory  # async (max_papers, min_citations) -> CNKICrawler
+        self.summarizer_factory = summarizer_factory  # (user, priority, fallback) -> ArticleSummarizer
+        self.interval = interval
+        self.refresh_ahead = refresh_ahead
+        self.upstream_budget = upstream_budget
+        self.llm_budget = llm_budget
+        self.fetch_delay = fetch_delay
+
+    def _due(self, keys: List[str], refresh_missing: bool = True) -> List[bool]:
+        """剩余有效期不足 refresh_ahead 时需要刷新；refresh_missing 时缓存不存在也刷新"""
+        pipe = self.tracker.redis_client.pipeline(transaction=False)
+        for key in keys:
+            pipe.pttl(key)
+        return [(refresh_missing and ttl == -2) or 0 <= ttl < self.refresh_ahead * 1000 for ttl in pipe.execute()]
+
+    async def _pace(self, stats: Counter) -> None:
+        if stats["upstream"] and self.fetch_delay:
+            await asyncio.sleep(random.uniform(self.fetch_delay, self.fetch_delay * 2.5))
+        stats["upstream"] += 1
+
+    async def _warm_queries(self, stats: Counter) -> None:
+        queries = self.tracker.hot_queries(WARM_HOT_QUERIES)
+        due = self._due([search_cache_key("search", **params) for params in queries])
+        for params in (params for params, is_due in zip(queries, due) if is_due):
+            if stats["upstream"] >= self.upstream_budget:
+                return
+            await self._pace(stats)
+            try:
+                crawler = await self.crawler_factory(max_papers=params["max_papers"], min_citations=params["min_citations"])
+                articles = await crawler.search(params["query"], params["page"])
+                cache_search(params, search_content(articles, params["page"]))
+                CACHE_WARM_REFRESHES.labels(kind="search", outcome="ok").inc()
+                stats["search"] += 1
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                CACHE_WARM_REFRESHES.labels(kind="search", outcome="error").inc()
+                logger.warning("预热检索 %s 失败: %s", params['query'], e)
+
+    async def _warm_articles(self, stats: Counter) -> None:
+        article_ids = self.tracker.hot_articles(WARM_HOT_ARTICLES)
+        detail_due = self._due([make_cache_key("article", article_id) for article_id in article_ids])
+        # 完整分析只续期即将过期的已有缓存：热门但从未分析过的文献不消耗大模型调用
+        summary_due = self._due(
+            [make_cache_key("summary", article_id) for article_id in article_ids], refresh_missing=False
+        )
+        for article_id, refresh_detail, refresh_summary in zip(article_ids, detail_due, summary_due):
+            refresh_summary = refresh_summary and SUMMARY_CACHE_TTL > 0 and stats["llm"] < self.llm_budget
+            refresh_detail = refresh_detail and DETAIL_CACHE_TTL > 0
+            if not (refresh_detail or refresh_summary):
+                continue
+            try:
+                article_content = None if refresh_detail else get_cached(make_cache_key("article", article_id), "article")
+                if article_content is None:
+                    if stats["upstream"] >= self.upstream_budget:
+                        continue
+                    await self._pace(stats)
+                    crawler = await self.crawler_factory()
+                    article_content = await crawler.get_article_content(article_id)
+                    cache_detail(article_id, article_content)
+                    CACHE_WARM_REFRESHES.labels(kind="detail", outcome="ok").inc()
+                    stats["detail"] += 1
+                if refresh_summary:
+                    stats["llm"] += 1
+                    summarizer = self.summarizer_factory(user=WARMER_USER, priority=BATCH, fallback=False)
+                    summary = await summarizer.summarize(article_content)
+                    if "error" in summary:
+                        raise Exception(summary["error"])
+                    cache_summary(article_id, summary_content(summary, article_content))
+                    CACHE_WARM_REFRESHES.labels(kind="summary", outcome="ok").inc()
+                    stats["summary"] += 1
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                CACHE_WARM_REFRESHES.labels(kind="article", outcome="error").inc()
+                logger.warning("预热文献 %s 失败: %s", article_id, e)
+
+    async def warm_once(self) -> Dict[str, int]:
+        """执行一轮预热，返回本轮刷新的检索、详情、分析数量及上游/大模型用量"""
+        stats = Counter()
+        self.tracker.decay()
+        with span("cache.warm") as warm_span:
+            try:
+                if SEARCH_CACHE_TTL > 0:
+                    await self._warm_queries(stats)
+                await self._warm_articles(stats)
+            except CircuitOpenError as e:
+                # 上游或大模型熔断时结束本轮，等下一轮再刷新
+                logger.info("熔断中，暂停缓存预热: %s", e)
+            for name, value in stats.items():
+                warm_span.set_attribute(f"warm.{name}", value)
+        return dict(stats)
+
+    async def start(self) -> None:
+        """主节点运行；关闭预热时仍定期衰减、裁剪热度计数，避免有序集合无限增长"""
+        while True:
+            try:
+                if self.interval > 0:
+                    stats = await self.warm_once()
+                    if stats:
+                        logger.info("缓存预热完成: %s", stats)
+                else:
+                    self.tracker.decay()
+            except Exception as e:
+                logger.error("缓存预热出错: %s", e)
+            await asyncio.sleep(self.interval if self.interval > 0 else POPULARITY_DECAY_INTERVAL)
+
+
+popularity = PopularityTracker(redis_client)
@@ -0,0 +1,273 @@
+"""订阅检索（watchlist）
+
+保存用户的检索式，按间隔自动刷新。刷新时按发表时间倒序检索，遇到已知文献ID
+即停止翻页，通常只需请求一两页；新增文献加入详情/总结队列，由后台逐篇处理，
+结果写入与 /summarize 相同的缓存。
+
+调度状态全部保存在Redis中：到期时间用有序集合，领取任务用ZREM保证多个worker
+不会重复刷新同一订阅。
+"""
+from typing import Callable, Dict, List, Optional
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+from .config import (
+    REDIS_URL, WATCHLIST_DETAIL_BATCH, WATCHLIST_FETCH_DELAY, WATCHLIST_MAX_HITS,
+    WATCHLIST_MAX_PAGES, WATCHLIST_MIN_INTERVAL, WATCHLIST_POLL_INTERVAL
+)
+from .cache import get_cached, make_cache_key
+from .citation_graph import citation_graph
+from .circuit_breaker import CircuitOpenError
+from .llm_scheduler import BATCH
+from .monitoring import create_redis_client
+from .tracing import span
+from .warming import cache_detail, cache_summary, summary_content
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 20
+MAX_DETAIL_ATTEMPTS = 3
+
+
+class Watchlist:
+    """订阅的存储与刷新"""
+
+    def __init__(self, redis_client, fetch_delay: float = WATCHLIST_FETCH_DELAY, max_pages: int = WATCHLIST_MAX_PAGES):
+        self.redis_client = redis_client
+        self.fetch_delay = fetch_delay
+        self.max_pages = max_pages
+        self.watch_key = "watchlist:queries"
+        self.user_key = "watchlist:user:{}"
+        self.due_key = "watchlist:due"
+        self.known_key = "watchlist:known:{}"
+        self.hits_key = "watchlist:hits:{}"
+        self.detail_queue_key = "watchlist:detail_queue"
+
+    def add(self, user: str, query: str, interval: int) -> Dict:
+        now = time.time()
+        watch = {
+            "id": uuid.uuid4().hex[:12],
+            "user": user,
+            "query": query,
+            "interval": interval,
+            "created_at": now,
+            "last_run_at": None,
+            "next_run_at": now,
+            "last_new_count": 0,
+            "last_pages": 0,
+            "last_error": None
+        }
+        pipe = self.redis_client.pipeline()
+        pipe.hset(self.watch_key, watch["id"], json.dumps(watch, ensure_ascii=False))
+        pipe.sadd(self.user_key.format(user), watch["id"])
+        pipe.zadd(self.due_key, {watch["id"]: now})
+        pipe.execute()
+        return watch
+
+    def get(self, watch_id: str) -> Optional[Dict]:
+        data = self.redis_client.hget(self.watch_key, watch_id)
+        return json.loads(data) if data else None
+
+    def list(self, user: str) -> List[Dict]:
+        watch_ids = sorted(self.redis_client.smembers(self.user_key.format(user)))
+        if not watch_ids:
+            return []
+        return [json.loads(data) for data in self.redis_client.hmget(self.watch_key, watch_ids) if data]
+
+    def remove(self, watch: Dict) -> None:
+        pipe = self.redis_client.pipeline()
+        pipe.hdel(self.watch_key, watch["id"])
+        pipe.srem(self.user_key.format(watch["user"]), watch["id"])
+        pipe.zrem(self.due_key, watch["id"])
+        pipe.delete(self.known_key.format(watch["id"]), self.hits_key.format(watch["id"]))
+        pipe.execute()
+
+    def hits(self, watch_id: str, limit: int = 50) -> List[Dict]:
+        """最近新增的文献（新的在前），附带已生成的总结"""
+        hits = [json.loads(item) for item in self.redis_client.lrange(self.hits_key.format(watch_id), 0, limit - 1)]
+        for hit in hits:
+            cached = get_cached(make_cache_key("summary_stale", hit["article"]["id"]), "summary_stale")
+            hit["summary"] = cached["data"]["summary"] if cached else None
+        return hits
+
+    def ensure_scheduled(self) -> None:
+        """为不在调度队列中的订阅补上到期时间（进程在刷新过程中退出时会丢失）"""
+        for watch_id, data in self.redis_client.hgetall(self.watch_key).items():
+            watch = json.loads(data)
+            self.redis_client.zadd(self.due_key, {watch_id: watch["next_run_at"]}, nx=True)
+
+    def claim(self, watch_id: str) -> bool:
+        """从调度队列中领取订阅，多个worker中只有一个能成功"""
+        return bool(self.redis_client.zrem(self.due_key, watch_id))
+
+    def due(self, now: Optional[float] = None) -> List[str]:
+        ids = self.redis_client.zrangebyscore(self.due_key, 0, now or time.time())
+        return [i.decode() if isinstance(i, bytes) else i for i in ids]
+
+    def _known_flags(self, watch_id: str, article_ids: List[str]) -> List[bool]:
+        pipe = self.redis_client.pipeline()
+        for article_id in article_ids:
+            pipe.sismember(self.known_key.format(watch_id), article_id)
+        return [bool(flag) for flag in pipe.execute()]
+
+    async def refresh(self, watch: Dict, crawler) -> List[Dict]:
+        """按发表时间倒序检索，遇到已知文献即停止；返回新增文献
+
+        首次刷新只记录第一页作为基线，不加入详情队列。
+        """
+        watch_id = watch["id"]
+        first_run = not self.redis_client.exists(self.known_key.format(watch_id))
+        new_articles: List[Dict] = []
+        pages = 0
+        error = None
+
+        try:
+            with span("watchlist.refresh", watch_id=watch_id, first_run=first_run) as refresh_span:
+                for page in range(1, self.max_pages + 1):
+                    if page > 1 and self.fetch_delay:
+                        await asyncio.sleep(random.uniform(self.fetch_delay, self.fetch_delay * 2.5))
+                    articles, total_count = await crawler.search_page(watch["query"], page, sort_by="date")
+                    pages = page
+
+                    reached_known = False
+                    for article, known in zip(articles, self._known_flags(watch_id, [a["id"] for a in articles])):
+                        if known:
+                            reached_known = True
+                            break
+                        new_articles.append(article)
+
+                    if reached_known or first_run or page * PAGE_SIZE >= total_count:
+                        break
+                else:
+                    logger.warning("订阅 %s 翻页 %s 页仍未遇到已知文献，可能有遗漏", watch_id, self.max_pages)
+                refresh_span.set_attribute("watchlist.pages", pages)
+                refresh_span.set_attribute("watchlist.new", len(new_articles))
+        except Exception as e:
+            error = str(e)
+            logger.error("刷新订阅 %s 失败: %s", watch_id, error)
+            raise
+        finally:
+            # 失败时不记录本次结果：只记下前几页会让下次刷新在已知文献处提前停止，漏掉后面的新文献
+            self._finish_refresh(watch, [] if error else new_articles, pages, first_run, error)
+
+        logger.info("订阅 %s 刷新完成: %s 页, 新增 %s 篇", watch_id, pages, len(new_articles))
+        return [] if first_run else new_articles
+
+    def _finish_refresh(self, watch: Dict, new_articles: List[Dict], pages: int, first_run: bool, error) -> None:
+        now = time.time()
+        watch.update({
+            "last_run_at": now,
+            "next_run_at": now + (min(watch["interval"], WATCHLIST_MIN_INTERVAL) if error else watch["interval"]),
+            "last_new_count": 0 if first_run else len(new_articles),
+            "last_pages": pages,
+            "last_error": error
+        })
+
+        pipe = self.redis_client.pipeline()
+        if new_articles:
+            pipe.sadd(self.known_key.format(watch["id"]), *[a["id"] for a in new_articles])
+        if new_articles and not first_run:
+            # 按从旧到新的顺序入队，hits列表保持新的在前
+            for article in reversed(new_articles):
+                pipe.lpush(self.hits_key.format(watch["id"]), json.dumps(
+                    {"article": article, "found_at": now}, ensure_ascii=False
+                ))
+                pipe.rpush(self.detail_queue_key, json.dumps(
+                    {"article_id": article["id"], "user": watch["user"], "attempts": 0}
+                ))
+            pipe.ltrim(self.hits_key.format(watch["id"]), 0, WATCHLIST_MAX_HITS - 1)
+        # 订阅在刷新期间被删除时不再写回
+        if self.redis_client.hexists(self.watch_key, watch["id"]):
+            pipe.hset(self.watch_key, watch["id"], json.dumps(watch, ensure_ascii=False))
+            pipe.zadd(self.due_key, {watch["id"]: watch["next_run_at"]})
+        pipe.execute()
+
+    async def process_detail_queue(
+        self, crawler, summarizer_factory: Callable, max_items: int = WATCHLIST_DETAIL_BATCH
+    ) -> int:
+        """获取新增文献详情并生成总结，结果写入 /summarize 使用的缓存；返回处理数量"""
+        processed = 0
+        while processed < max_items:
+            item = self.redis_client.lpop(self.detail_queue_key)
+            if item is None:
+                break
+            task = json.loads(item)
+            article_id = task["article_id"]
+            cache_key = make_cache_key("summary_stale", article_id)
+            if get_cached(cache_key, "summary_stale") is not None:
+                continue
+
+            if processed and self.fetch_delay:
+                await asyncio.sleep(random.uniform(self.fetch_delay, self.fetch_delay * 2.5))
+            processed += 1
+            try:
+                with span("watchlist.summarize", article_id=article_id):
+                    article_content = await crawler.get_article_content(article_id)
+                    await asyncio.to_thread(citation_graph.add_article, article_id, article_content)
+                    # 以订阅所属用户的批量优先级排队，不挤占交互请求；大模型不可用时等待恢复而不是降级
+                    summarizer = summarizer_factory(user=task.get("user"), priority=BATCH, fallback=False)
+                    summary = await summarizer.summarize(article_content)
+                if "error" in summary:
+                    raise Exception(summary["error"])
+                cache_detail(article_id, article_content)
+                cache_summary(article_id, summary_content(summary, article_content))
+            except CircuitOpenError:
+                # 上游熔断时放回队首，等下一轮再处理
+                self.redis_client.lpush(self.detail_queue_key, item)
+                break
+            except Exception as e:
+                task["attempts"] += 1
+                logger.warning("处理订阅新增文献 %s 失败 (%s/%s): %s", article_id, task['attempts'], MAX_DETAIL_ATTEMPTS, e)
+                if task["attempts"] < MAX_DETAIL_ATTEMPTS:
+                    self.redis_client.rpush(self.detail_queue_key, json.dumps(task))
+        return processed
+
+
+class WatchlistScheduler:
+    """后台循环：刷新到期订阅，并处理详情/总结队列"""
+
+    def __init__(
+        self,
+        watchlist: Watchlist,
+        crawler_factory: Callable,
+        summarizer_factory: Callable,
+        poll_interval: float = WATCHLIST_POLL_INTERVAL
+    ):
+        self.watchlist = watchlist
+        self.crawler_factory = crawler_factory  # async () -> CNKICrawler
+        self.summarizer_factory = summarizer_factory  # (user, priority) -> ArticleSummarizer
+        self.poll_interval = poll_interval
+
+    async def refresh(self, watch_id: str) -> Optional[List[Dict]]:
+        """领取并刷新一个订阅，已被其他worker领取时返回None"""
+        watch = self.watchlist.get(watch_id)
+        if watch is None or not self.watchlist.claim(watch_id):
+            return None
+        return await self.watchlist.refresh(watch, await self.crawler_factory())
+
+    async def run_once(self) -> None:
+        for watch_id in self.watchlist.due():
+            try:
+                await self.refresh(watch_id)
+            except CircuitOpenError:
+                break
+            except Exception:
+                continue  # 已在refresh中记录，下个周期重试
+
+        if self.watchlist.redis_client.llen(self.watchlist.detail_queue_key):
+            await self.watchlist.process_detail_queue(await self.crawler_factory(), self.summarizer_factory)
+
+    async def start(self) -> None:
+        self.watchlist.ensure_scheduled()
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error("订阅调度出错: %s", e)
+            await asyncio.sleep(self.poll_interval)
+
+
+watchlist = Watchlist(create_redis_client(REDIS_URL))
@@ -0,0 +1,123 @@
+"""热点路径基准的回归检查
+
+基准用例位于 tests/benchmarks（pytest-benchmark），基线保存在 baseline.json，
+只记录各用例的统计值与机器信息，可以提交到仓库。check 重新运行基准（或读取
+已有的 --benchmark-json 结果），任一用例的统计值比基线慢超过阈值时退出码为1。
+基线与机器相关，更换运行环境（如CI机器）后应先在该环境中重新 save。
+
+示例:
+    python -m tests.benchmarks.compare save
+    python -m tests.benchmarks.compare check --max-slowdown 0.25
+    python -m tests.benchmarks.compare check --input results.json --stat min
+    python -m tests.benchmarks.compare check -k parse      # 其余参数传给pytest
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+BENCH_DIR = Path(__file__).resolve().parent
+BASELINE_PATH = BENCH_DIR / "baseline.json"
+STATS = ("min", "median", "mean", "stddev")
+DEFAULT_MAX_SLOWDOWN = float(os.getenv("BENCH_MAX_SLOWDOWN", "0.2"))
+
+
+def run_benchmarks(pytest_args: Optional[List[str]] = None) -> Dict:
+    """运行全部基准，返回pytest-benchmark的JSON结果"""
+    with tempfile.TemporaryDirectory() as tmp:
+        output = Path(tmp) / "benchmarks.json"
+        subprocess.run(
+            [sys.executable, "-m", "pytest", str(BENCH_DIR), "-q", "-p", "no:cacheprovider",
+             "--benchmark-only", f"--benchmark-json={output}", *(pytest_args or [])],
+            cwd=BENCH_DIR.parent.parent,
+            check=True
+        )
+        return json.loads(output.read_text(encoding="utf-8"))
+
+
+def summarize(report: Dict) -> Dict:
+    """从pytest-benchmark结果中提取基线需要的字段（秒）"""
+    machine = report.get("machine_info", {})
+    return {
+        "machine": {
+            "python": machine.get("python_version", platform.python_version()),
+            "cpu": machine.get("cpu", {}).get("brand_raw", platform.processor()),
+            "cpu_count": machine.get("cpu", {}).get("count", os.cpu_count())
+        },
+        "benchmarks": {
+            bench["fullname"]: {
+                **{stat: bench["stats"][stat] for stat in STATS},
+                "rounds": bench["stats"]["rounds"]
+            }
+            for bench in report["benchmarks"]
+        }
+    }
+
+
+def compare(baseline: Dict, current: Dict, max_slowdown: float, stat: str = "median") -> Tuple[List[Dict], List[str]]:
+    """逐个用例比较，返回(对比结果, 超出阈值的用例名)"""
+    rows, regressions = [], []
+    for name in sorted(set(baseline["benchmarks"]) | set(current["benchmarks"])):
+        before = baseline["benchmarks"].get(name)
+        after = current["benchmarks"].get(name)
+        row = {"name": name, "baseline": before and before[stat], "current": after and after[stat], "change": None}
+        if before and after and before[stat] > 0:
+            row["change"] = after[stat] / before[stat] - 1
+            if row["change"] > max_slowdown:
+                regressions.append(name)
+        rows.append(row)
+    return rows, regressions
+
+
+def format_rows(rows: List[Dict], max_slowdown: float) -> str:
+    def fmt_time(value: Optional[float]) -> str:
+        return f"{'-':>14s}" if value is None else f"{value * 1e6:12.1f}us"
+
+    names = [row["name"].split("/")[-1] for row in rows]
+    width = max(map(len, names), default=0)
+    lines = []
+    for name, row in zip(names, rows):
+        if row["change"] is None:
+            change = "新增" if row["baseline"] is None else "缺失"
+        else:
+            change = f"{row['change']:+.1%}" + (" !" if row["change"] > max_slowdown else "")
+        lines.append(f"{name:{width}s} {fmt_time(row['baseline'])} -> {fmt_time(row['current'])}  {change}")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="热点路径基准：保存基线或与基线比较")
+    parser.add_argument("command", choices=["save", "check"])
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--input", type=Path, help="使用已有的 --benchmark-json 结果，不重新运行")
+    parser.add_argument("--max-slowdown", type=float, default=DEFAULT_MAX_SLOWDOWN, help="允许的最大变慢比例，默认0.2即20%%")
+    parser.add_argument("--stat", choices=STATS[:3], default="median")
+    # 其余参数原样传给pytest，如 -k parse
+    args, pytest_args = parser.parse_known_args()
+
+    report = json.loads(args.input.read_text(encoding="utf-8")) if args.input else run_benchmarks(pytest_args)
+    current = summarize(report)
+
+    if args.command == "save":
+        args.baseline.write_text(json.dumps(current, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"已保存 {len(current['benchmarks'])} 个用例的基线到 {args.baseline}")
+        return
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    rows, regressions = compare(baseline, current, args.max_slowdown, args.stat)
+    print(format_rows(rows, args.max_slowdown))
+    if baseline["machine"] != current["machine"]:
+        print(f"注意：基线来自不同的运行环境 {baseline['machine']}")
+    if regressions:
+        print(f"{len(regressions)} 个用例比基线慢超过 {args.max_slowdown:.0%}（{args.stat}）")
+        sys.exit(1)
+    print(f"全部用例在阈值 {args.max_slowdown:.0%} 以内")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+import asyncio
+
+import pytest
+import redis
+from tests.loadtest import LOADTEST_REDIS_URL
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture
+def redis_client():
+    client = redis.from_url(LOADTEST_REDIS_URL)
+    try:
+        client.ping()
+    except redis.ConnectionError:
+        pytest.skip("需要本地Redis")
+    client.flushdb()
+    yield client
+    client.flushdb()
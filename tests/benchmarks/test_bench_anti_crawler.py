@@ -0,0 +1,49 @@
+import pytest
+from fastapi.responses import Response
+from starlette.requests import Request
+import backend.anti_crawler_handler as anti_crawler_module
+import backend.main as main_module
+from backend.anti_crawler_handler import AntiCrawlerHandler, BanCache
+
+
+def make_request(ip: str) -> Request:
+    return Request({
+        "type": "http",
+        "method": "POST",
+        "path": "/search",
+        "query_string": b"",
+        "headers": [(b"user-agent", b"Mozilla/5.0"), (b"content-type", b"application/json")],
+        "client": (ip, 50000),
+        "server": ("testserver", 80),
+        "scheme": "http",
+        "app": main_module.app
+    })
+
+
+@pytest.fixture
+def patched_redis(redis_client, monkeypatch):
+    monkeypatch.setattr(anti_crawler_module, "redis_client", redis_client)
+    monkeypatch.setattr(anti_crawler_module, "ban_cache", BanCache())
+    monkeypatch.setattr(main_module, "redis_client", redis_client)
+    monkeypatch.setattr(main_module, "RATE_LIMIT_PER_MINUTE", 10 ** 9)
+    return redis_client
+
+
+@pytest.mark.benchmark(group="anti_crawler")
+def test_pattern_score(benchmark, patched_redis, loop):
+    request = make_request("10.0.0.1")
+    for _ in range(100):  # 模式记录最多保留100条，即评分的最坏情况
+        loop.run_until_complete(AntiCrawlerHandler.record_request_pattern("10.0.0.1", request))
+    score = benchmark(lambda: loop.run_until_complete(AntiCrawlerHandler._get_pattern_score("10.0.0.1")))
+    assert 0 <= score <= 1
+
+
+@pytest.mark.benchmark(group="middleware")
+def test_rate_limit_middleware(benchmark, patched_redis, loop):
+    request = make_request("10.0.0.2")
+
+    async def call_next(request):
+        return Response(status_code=200)
+
+    response = benchmark(lambda: loop.run_until_complete(main_module.rate_limit_middleware(request, call_next)))
+    assert response.status_code == 200
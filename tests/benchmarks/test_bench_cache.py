@@ -0,0 +1,45 @@
+import pytest
+import backend.cache as cache_module
+from backend.cache import LocalCache, get_cached, make_cache_key, set_cached
+from backend.warming import search_content
+from tests.simulator import load_fixture
+
+
+class MemoryRedis:
+    """只保存值的内存替身，用于单独测量序列化开销"""
+
+    def __init__(self):
+        self.values = {}
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value
+
+
+@pytest.fixture(scope="module")
+def content():
+    from backend.components import components
+    articles, total = components.crawler()._parse_search_page(load_fixture("search_grid.html"))
+    return search_content({"articles": articles, "total": total, "total_pages": 5}, 1)
+
+
+@pytest.fixture
+def memory_cache(monkeypatch):
+    monkeypatch.setattr(cache_module, "redis_client", MemoryRedis())
+    monkeypatch.setattr(cache_module, "local_cache", LocalCache(max_size=1024, ttl=3600))
+
+
+@pytest.mark.benchmark(group="cache")
+def test_cache_encode(benchmark, content, memory_cache):
+    benchmark(set_cached, make_cache_key("search", "人工智能", 1, 20, 0), content, 600)
+
+
+@pytest.mark.benchmark(group="cache")
+def test_cache_decode(benchmark, content, memory_cache):
+    key = make_cache_key("search", "人工智能", 1, 20, 0)
+    set_cached(key, content, 600)
+    assert benchmark(get_cached, key, "search") == content
+
+
+@pytest.mark.benchmark(group="cache")
+def test_cache_key(benchmark):
+    benchmark(make_cache_key, "search_stale", "基于深度学习的中文文本分类", 1, 20, 0)
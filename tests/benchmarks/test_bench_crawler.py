@@ -0,0 +1,31 @@
+import pytest
+from backend.components import components
+from tests.simulator import load_fixture
+
+SEARCH_GRID = load_fixture("search_grid.html")
+DETAIL = load_fixture("detail.html")
+
+
+@pytest.fixture(scope="module")
+def crawler():
+    crawler = components.crawler(max_papers=20)
+    crawler.session_params = {"token": "bench-token", "cookies": {}}
+    return crawler
+
+
+@pytest.mark.benchmark(group="parse")
+def test_parse_search_grid(benchmark, crawler):
+    articles, total = benchmark(crawler._parse_search_page, SEARCH_GRID)
+    assert len(articles) == 20 and total > 0
+
+
+@pytest.mark.benchmark(group="parse")
+def test_parse_detail(benchmark, crawler):
+    content = benchmark(crawler._parse_detail_page, DETAIL)
+    assert content["title"] and content["references"]
+
+
+@pytest.mark.benchmark(group="crawler")
+def test_build_search_params(benchmark, crawler):
+    params = benchmark(crawler._build_search_params, "基于深度学习的中文文本分类", 3, "citations")
+    assert params["CurPage"] == "3" and params["token"] == "bench-token"
@@ -0,0 +1,39 @@
+import httpx
+import pytest
+from backend.article_summarizer import ArticleSummarizer
+from backend.components import components
+from tests.simulator import FakeLLM, load_fixture
+
+
+@pytest.fixture(scope="module")
+def article():
+    return components.crawler()._parse_detail_page(load_fixture("detail.html"))
+
+
+@pytest.fixture
+def summarizer(monkeypatch, loop):
+    monkeypatch.setenv("DEEPSEEK_API_KEY", "sk-bench")
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=FakeLLM().app))
+    summarizer = ArticleSummarizer(user="bench", client=client)
+    summarizer.api_base = "http://fake-llm"
+    yield summarizer
+    loop.run_until_complete(client.aclose())
+
+
+@pytest.mark.benchmark(group="summarizer")
+def test_build_prompts(benchmark, summarizer, article):
+    def build():
+        return (
+            summarizer._build_summary_prompt(article),
+            summarizer._build_methodology_prompt(article),
+            summarizer._build_innovation_prompt(article)
+        )
+
+    prompts = benchmark(build)
+    assert all(article["title"] in prompt for prompt in prompts)
+
+
+@pytest.mark.benchmark(group="summarizer")
+def test_summarize_with_fake_llm(benchmark, summarizer, article, loop):
+    result = benchmark(lambda: loop.run_until_complete(summarizer.summarize(article)))
+    assert "error" not in result and result["summary"].startswith("## 模拟分析")
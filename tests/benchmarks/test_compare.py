@@ -0,0 +1,18 @@
+import pytest
+from tests.benchmarks.compare import compare, format_rows
+
+
+def make(**medians):
+    return {"machine": {}, "benchmarks": {name: {"median": value} for name, value in medians.items()}}
+
+
+def test_compare_flags_slowdowns_over_threshold():
+    baseline = make(parse=1.0, cache=2.0, removed=1.0)
+    current = make(parse=1.15, cache=2.6, added=1.0)
+    rows, regressions = compare(baseline, current, max_slowdown=0.2)
+    assert regressions == ["cache"]
+    assert {row["name"]: row["change"] for row in rows} == {
+        "added": None, "cache": pytest.approx(0.3), "parse": pytest.approx(0.15), "removed": None
+    }
+    table = format_rows(rows, 0.2)
+    assert "+30.0% !" in table and "新增" in table and "缺失" in table
@@ -0,0 +1,76 @@
+"""组件构造开销基准
+
+对比每个请求各自构造爬虫/总结器（旧方式）与使用组件注册表视图的开销，
+并给出注册表启动时预先构造各组件的耗时。
+
+示例:
+    python -m tests.construction_bench --iterations 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from backend.article_summarizer import ArticleSummarizer
+from backend.cnki_crawler import CNKICrawler
+from backend.components import WARM_COMPONENTS, create_registry
+
+
+def measure(factory: Callable, iterations: int) -> Dict[str, float]:
+    samples: List[float] = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        factory()
+        samples.append(time.perf_counter() - start)
+    return {
+        "mean_ms": statistics.mean(samples) * 1000,
+        "p50_ms": statistics.median(samples) * 1000,
+        "max_ms": max(samples) * 1000
+    }
+
+
+def run(iterations: int = 100) -> Dict[str, Dict]:
+    registry = create_registry()
+    start = time.perf_counter()
+    registry.warm(*WARM_COMPONENTS, "llm_client")
+    startup = {
+        "total_ms": (time.perf_counter() - start) * 1000,
+        **{f"{name}_ms": seconds * 1000 for name, seconds in registry.construction_seconds.items()}
+    }
+    report = {
+        "startup": startup,
+        "per_request_old": {
+            "crawler": measure(lambda: CNKICrawler(max_papers=50, min_citations=5), iterations),
+            "summarizer": measure(ArticleSummarizer, iterations)
+        },
+        "per_request_view": {
+            "crawler": measure(lambda: registry.crawler(max_papers=50, min_citations=5), iterations),
+            "summarizer": measure(registry.summarizer, iterations)
+        }
+    }
+    asyncio.run(registry.aclose())
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="组件构造开销基准")
+    parser.add_argument("--iterations", type=int, default=100)
+    args = parser.parse_args()
+    os.environ.setdefault("DEEPSEEK_API_KEY", "bench")  # 只构造总结器，不调用接口
+
+    report = run(args.iterations)
+    print("启动预热: " + ", ".join(f"{k}={v:.1f}" for k, v in report["startup"].items()))
+    for kind in ("crawler", "summarizer"):
+        old = report["per_request_old"][kind]
+        view = report["per_request_view"][kind]
+        print(
+            f"{kind:10s} 每请求构造 mean={old['mean_ms']:.3f}ms p50={old['p50_ms']:.3f}ms | "
+            f"视图 mean={view['mean_ms']:.3f}ms p50={view['p50_ms']:.3f}ms | "
+            f"加速 {old['mean_ms'] / max(view['mean_ms'], 1e-9):.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""端到端压测工具
+
+在本地启动上游模拟器、chat-completions替身和后端服务（独立uvicorn进程），
+按指定并发驱动 /search 与 /summarize，输出吞吐量、p50/p95/p99延迟、
+状态码分布以及每个场景产生的上游请求次数。
+
+需要可用的Redis（默认使用 redis://localhost:6379/15，启动时会清空该库）。
+
+示例:
+    python -m tests.loadtest --scenario search --concurrency 20 --requests 200
+    python -m tests.loadtest --scenario summarize --error-rate 0.05 --slow-rate 0.1
+    python -m tests.loadtest --scenario search --target http://localhost:8000
+    python -m tests.loadtest --scenario analytics --workers 1,2,4 --requests 400   # 多worker扩展性
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import httpx
+import redis
+
+from tests.simulator import FakeLLM, FaultConfig, ServerThread, UpstreamSimulator, free_port
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+LOADTEST_REDIS_URL = os.getenv("LOADTEST_REDIS_URL", "redis://localhost:6379/15")
+
+QUERIES = ["人工智能", "深度学习", "知识图谱", "大语言模型", "联邦学习", "推荐系统"]
+ARTICLE_IDS = ["CJFD.JSJX20150201001", "CJFD.JSJX20210302001", "CJFD.JSJX20160903001"]
+
+
+def percentile(values: List[float], p: float) -> float:
+    """最近秩法计算百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(round(p / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+@dataclass
+class LoadReport:
+    scenario: str
+    concurrency: int
+    duration: float
+    latencies: List[float] = field(default_factory=list)
+    statuses: Counter = field(default_factory=Counter)
+    upstream: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def total(self) -> int:
+        return len(self.latencies)
+
+    @property
+    def throughput(self) -> float:
+        return self.total / self.duration if self.duration else 0.0
+
+    def percentile(self, p: float) -> float:
+        return percentile(self.latencies, p)
+
+    def to_dict(self) -> Dict:
+        return {
+            "scenario": self.scenario,
+            "concurrency": self.concurrency,
+            "requests": self.total,
+            "duration": round(self.duration, 3),
+            "throughput": round(self.throughput, 3),
+            "p50": round(self.percentile(50), 4),
+            "p95": round(self.percentile(95), 4),
+            "p99": round(self.percentile(99), 4),
+            "statuses": dict(self.statuses),
+            "upstream": self.upstream
+        }
+
+    def format(self) -> str:
+        statuses = ", ".join(f"{code}×{count}" for code, count in sorted(self.statuses.items()))
+        upstream = ", ".join(f"{name}={count}" for name, count in sorted(self.upstream.items())) or "-"
+        return (
+            f"场景: {self.scenario}  并发: {self.concurrency}  请求数: {self.total}\n"
+            f"吞吐量: {self.throughput:.2f} req/s  耗时: {self.duration:.2f}s\n"
+            f"延迟 p50/p95/p99: {self.percentile(50):.3f}s / {self.percentile(95):.3f}s / {self.percentile(99):.3f}s\n"
+            f"状态码: {statuses}\n"
+            f"上游请求: {upstream}"
+        )
+
+
+def search_request(client: httpx.AsyncClient, index: int):
+    return client.post("/search", json={
+        "query": QUERIES[index % len(QUERIES)],
+        "page": 1,
+        "settings": {"max_papers": 20, "min_citations": 0, "sort_by": "relevance"}
+    })
+
+
+def summarize_request(client: httpx.AsyncClient, index: int):
+    return client.get(f"/summarize/{ARTICLE_IDS[index % len(ARTICLE_IDS)]}")
+
+
+def analytics_request(client: httpx.AsyncClient, index: int):
+    # 检索结果缓存后为纯CPU计算，用于衡量多worker下的扩展性
+    return client.post("/analytics", json={
+        "query": QUERIES[index % 2],
+        "page": 1,
+        "settings": {"max_papers": 20, "min_citations": 0, "sort_by": "relevance"}
+    })
+
+
+def mixed_request(client: httpx.AsyncClient, index: int):
+    # 约4:1的检索/分析比例
+    if index % 5 == 4:
+        return summarize_request(client, index)
+    return search_request(client, index)
+
+
+SCENARIOS: Dict[str, Callable] = {
+    "search": search_request,
+    "summarize": summarize_request,
+    "mixed": mixed_request,
+    "analytics": analytics_request,
+}
+
+
+async def run_load(
+    base_url: str,
+    scenario: str,
+    total: int,
+    concurrency: int,
+    timeout: float = 120.0
+) -> LoadReport:
+    """以固定并发发送total个请求"""
+    make_request = SCENARIOS[scenario]
+    report = LoadReport(scenario=scenario, concurrency=concurrency, duration=0.0)
+    counter = iter(range(total))
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        for index in counter:
+            start = time.perf_counter()
+            try:
+                response = await make_request(client, index)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            report.latencies.append(time.perf_counter() - start)
+            report.statuses[status] += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        report.duration = time.perf_counter() - start
+    return report
+
+
+class LoadTestStack:
+    """模拟器 + 后端服务的完整压测环境"""
+
+    def __init__(
+        self,
+        faults: Optional[FaultConfig] = None,
+        llm_latency: float = 0.0,
+        redis_url: str = LOADTEST_REDIS_URL,
+        seed: Optional[int] = None,
+        extra_env: Optional[Dict[str, str]] = None,
+        workers: int = 1
+    ):
+        self.upstream = UpstreamSimulator(faults, seed=seed)
+        self.llm = FakeLLM(latency=llm_latency, seed=seed)
+        self.redis_url = redis_url
+        self.extra_env = extra_env or {}
+        self.workers = workers
+        self.port = free_port()
+        self._servers: List[ServerThread] = []
+        self._process: Optional[subprocess.Popen] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def upstream_counts(self) -> Dict[str, int]:
+        counts = self.upstream.snapshot()
+        counts.update({f"llm_{k}": v for k, v in self.llm.snapshot().items()})
+        return counts
+
+    def _seed_redis(self) -> None:
+        client = redis.from_url(self.redis_url)
+        client.flushdb()
+        now = datetime.now().isoformat()
+        client.hset("cnki_cookies", "SIMSESSION", json.dumps({
+            "cookies": {"JSESSIONID": "SIMSESSION"},
+            "created_at": now,
+            "last_used": now,
+            "success_count": 0,
+            "fail_count": 0
+        }))
+        client.close()
+
+    def start(self, timeout: float = 30.0) -> "LoadTestStack":
+        self._seed_redis()
+        cnki = ServerThread(self.upstream.app).start()
+        llm = ServerThread(self.llm.app).start()
+        self._servers = [cnki, llm]
+
+        env = dict(os.environ)
+        env.update({
+            "REDIS_URL": self.redis_url,
+            "CNKI_KNS_URL": cnki.url,
+            "CNKI_BASE_URL": cnki.url,
+            "CNKI_LOGIN_URL": f"{cnki.url}/login/",
+            "DEEPSEEK_API_BASE": llm.url,
+            "DEEPSEEK_API_KEY": "sk-loadtest",
+            "RATE_LIMIT_PER_MINUTE": "1000000",
+            # 压测默认每次都走上游与大模型；需要时通过extra_env开启结果缓存与预热
+            "SEARCH_CACHE_TTL": "0",
+            "DETAIL_CACHE_TTL": "0",
+            "SUMMARY_CACHE_TTL": "0",
+            "WARM_INTERVAL": "0",
+        })
+        env.update(self.extra_env)
+        self._process = subprocess.Popen(
+            [sys.executable, "-m", "backend.server", "--host", "127.0.0.1", "--port", str(self.port),
+             "--workers", str(self.workers), "--log-level", "warning"],
+            cwd=ROOT_DIR,
+            env=env
+        )
+
+        deadline = time.monotonic() + timeout
+        while True:
+            if self._process.poll() is not None:
+                raise RuntimeError("后端服务启动失败")
+            try:
+                httpx.get(f"{self.url}/openapi.json", timeout=1.0)
+                break
+            except httpx.HTTPError:
+                if time.monotonic() > deadline:
+                    self.stop()
+                    raise RuntimeError("后端服务启动超时")
+                time.sleep(0.2)
+        return self
+
+    def stop(self) -> None:
+        if self._process and self._process.poll() is None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+        for server in self._servers:
+            server.stop()
+
+    def __enter__(self) -> "LoadTestStack":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+async def run_scenario(stack: LoadTestStack, scenario: str, total: int, concurrency: int) -> LoadReport:
+    """运行一个场景并统计期间的上游请求次数"""
+    before = stack.upstream_counts()
+    report = await run_load(stack.url, scenario, total, concurrency)
+    after = stack.upstream_counts()
+    report.upstream = {k: v - before.get(k, 0) for k, v in after.items() if v - before.get(k, 0)}
+    return report
+
+
+def run_scaling(args, faults: FaultConfig) -> List[Dict]:
+    """同一场景依次在1..N个worker下运行，返回各自的吞吐量与相对1个worker的加速比"""
+    results = []
+    for workers in [int(w) for w in args.workers.split(",")]:
+        with LoadTestStack(faults, llm_latency=args.llm_latency, seed=args.seed, workers=workers) as stack:
+            asyncio.run(run_load(stack.url, args.scenario, len(QUERIES), 1))  # 预热缓存
+            report = asyncio.run(run_scenario(stack, args.scenario, args.requests, args.concurrency))
+        results.append({"workers": workers, **report.to_dict()})
+    for result in results:
+        result["speedup"] = round(result["throughput"] / results[0]["throughput"], 2) if results[0]["throughput"] else 0.0
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="/search 与 /summarize 端到端压测")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="search")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--target", help="压测已运行的服务，不启动模拟环境")
+    parser.add_argument("--latency", type=float, default=0.0, help="上游基础延迟（秒）")
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-delay", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--denied-rate", type=float, default=0.0)
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--workers", help="逗号分隔的worker数（如 1,2,4），依次运行并输出扩展性对比")
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出报告")
+    args = parser.parse_args()
+
+    faults = FaultConfig(
+        latency=args.latency,
+        slow_rate=args.slow_rate,
+        slow_delay=args.slow_delay,
+        error_rate=args.error_rate,
+        denied_rate=args.denied_rate
+    )
+    if args.workers:
+        results = run_scaling(args, faults)
+        if args.json:
+            print(json.dumps(results, ensure_ascii=False, indent=2))
+        else:
+            for result in results:
+                print(
+                    f"workers={result['workers']}: {result['throughput']:.1f} req/s, "
+                    f"p50 {result['p50']:.3f}s, p99 {result['p99']:.3f}s, 加速比 {result['speedup']}"
+                )
+        return
+
+    if args.target:
+        report = asyncio.run(run_load(args.target, args.scenario, args.requests, args.concurrency))
+    else:
+        with LoadTestStack(faults, llm_latency=args.llm_latency, seed=args.seed) as stack:
+            report = asyncio.run(run_scenario(stack, args.scenario, args.requests, args.concurrency))
+
+    print(json.dumps(report.to_dict(), ensure_ascii=False, indent=2) if args.json else report.format())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""日志开销基准
+
+在事件循环中模拟错误风暴：并发任务持续写警告日志，对比同步写出（原 basicConfig
+的StreamHandler）与队列+后台线程写出时，单次日志调用在事件循环线程上的耗时以及
+事件循环的最大延迟。输出目标可注入写入延迟，模拟慢磁盘、阻塞的管道或日志收集器。
+
+示例:
+    python -m tests.logging_bench --records 5000 --sink-latency-ms 0.2
+"""
+import argparse
+import asyncio
+import io
+import logging
+import statistics
+import time
+from typing import Dict, List
+
+from backend.log_pipeline import TEXT_FORMAT, JSONFormatter, SamplingFilter, create_queue_handler
+from backend.tracing import TraceContextFilter
+
+
+class SlowSink(io.TextIOBase):
+    """每次写入固定阻塞一段时间的输出流"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.writes = 0
+
+    def write(self, text: str) -> int:
+        if self.latency:
+            time.sleep(self.latency)
+        self.writes += 1
+        return len(text)
+
+
+async def _storm(logger: logging.Logger, records: int, concurrency: int) -> Dict[str, float]:
+    samples: List[float] = []
+    max_lag = 0.0
+    done = False
+
+    async def ticker() -> None:
+        nonlocal max_lag
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            max_lag = max(max_lag, time.perf_counter() - start - 0.001)
+
+    async def worker(index: int) -> None:
+        for i in range(index, records, concurrency):
+            error = ValueError(f"第{i}行缺少 .quote 节点")
+            start = time.perf_counter()
+            logger.warning("解析文章数据失败: %s", error, extra={"upstream": "/kns8/Brief/GetGridTableHtml"})
+            samples.append(time.perf_counter() - start)
+            await asyncio.sleep(0)
+
+    tick = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    done = True
+    await tick
+
+    samples.sort()
+    return {
+        "records_per_s": records / elapsed,
+        "call_p50_us": statistics.median(samples) * 1e6,
+        "call_p99_us": samples[int(len(samples) * 0.99) - 1] * 1e6,
+        "max_loop_lag_ms": max_lag * 1000
+    }
+
+
+def run(records: int = 2000, concurrency: int = 50, sink_latency: float = 0.0, sample: bool = False) -> Dict[str, Dict]:
+    report = {}
+    for mode in ("sync", "queue"):
+        sink = SlowSink(sink_latency)
+        output = logging.StreamHandler(sink)
+        logger = logging.getLogger(f"bench.{mode}")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        listener = None
+        if mode == "sync":
+            output.setFormatter(logging.Formatter(TEXT_FORMAT))
+            output.addFilter(TraceContextFilter())
+            logger.addHandler(output)
+        else:
+            output.setFormatter(JSONFormatter())
+            handler, listener = create_queue_handler(output, queue_size=records + 1)
+            if not sample:
+                handler.filters = [f for f in handler.filters if not isinstance(f, SamplingFilter)]
+            logger.addHandler(handler)
+            listener.start()
+        try:
+            result = asyncio.run(_storm(logger, records, concurrency))
+        finally:
+            if listener is not None:
+                listener.stop()
+            logger.handlers.clear()
+        result["written"] = sink.writes
+        report[mode] = result
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="日志开销基准")
+    parser.add_argument("--records", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--sink-latency-ms", type=float, default=0.0, help="每次写出的阻塞时间，模拟慢输出")
+    parser.add_argument("--sample", action="store_true", help="队列模式启用重复警告采样")
+    args = parser.parse_args()
+
+    report = run(args.records, args.concurrency, args.sink_latency_ms / 1000, args.sample)
+    for mode, result in report.items():
+        print(
+            f"{mode:6s} {result['records_per_s']:10.0f} 条/s  "
+            f"调用p50={result['call_p50_us']:.1f}us p99={result['call_p99_us']:.1f}us  "
+            f"事件循环最大延迟={result['max_loop_lag_ms']:.1f}ms  写出={result['written']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""离线上游模拟器
+
+提供CNKI检索/详情页面与DeepSeek chat-completions接口的本地替身，
+页面内容来自 tests/fixtures 下录制的HTML，支持注入慢响应、5xx以及
+"访问受限"页面，并按接口统计上游请求次数，供压测与离线测试使用。
+
+独立运行:
+    python -m tests.simulator --port 9000 --llm-port 9001 --error-rate 0.05
+"""
+import argparse
+import asyncio
+import random
+import re
+import socket
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+@dataclass
+class FaultConfig:
+    """故障注入配置，比例均为0~1之间的概率"""
+    latency: float = 0.0      # 每个请求的基础延迟（秒）
+    slow_rate: float = 0.0    # 慢响应比例
+    slow_delay: float = 5.0   # 慢响应额外延迟（秒）
+    error_rate: float = 0.0   # 返回5xx的比例
+    denied_rate: float = 0.0  # 返回"访问受限"页面的比例
+
+
+def load_fixture(name: str) -> str:
+    """读取录制的HTML页面"""
+    return (FIXTURES_DIR / name).read_text(encoding="utf-8")
+
+
+class UpstreamSimulator:
+    """CNKI上游替身"""
+
+    def __init__(self, faults: Optional[FaultConfig] = None, seed: Optional[int] = None):
+        self.faults = faults or FaultConfig()
+        self.counts: Counter = Counter()
+        self._random = random.Random(seed)
+        self._pages = {
+            name: load_fixture(name)
+            for name in ("index.html", "search_grid.html", "detail.html", "access_denied.html", "session_expired.html")
+        }
+        self._token = re.search(r'name="token" value="([^"]+)"', self._pages["index.html"]).group(1)
+        self._session_version = 0
+        self.app = self._build_app()
+
+    def snapshot(self) -> Dict[str, int]:
+        """返回当前请求计数的副本"""
+        return dict(self.counts)
+
+    def reset(self) -> None:
+        self.counts.clear()
+
+    def expire_sessions(self) -> None:
+        """使已发放的检索token全部失效，模拟上游会话过期"""
+        self._session_version += 1
+
+    @property
+    def current_token(self) -> str:
+        return f"{self._token}-{self._session_version}"
+
+    async def _inject_faults(self) -> Optional[Response]:
+        """按配置注入延迟与错误，返回None表示正常响应"""
+        faults = self.faults
+        delay = faults.latency
+        if faults.slow_rate and self._random.random() < faults.slow_rate:
+            self.counts["slow"] += 1
+            delay += faults.slow_delay
+        if delay:
+            await asyncio.sleep(delay)
+
+        roll = self._random.random()
+        if roll < faults.error_rate:
+            self.counts["5xx"] += 1
+            return HTMLResponse("Service Unavailable", status_code=503)
+        if roll < faults.error_rate + faults.denied_rate:
+            self.counts["denied"] += 1
+            return HTMLResponse(self._pages["access_denied.html"])
+        return None
+
+    def render_grid(self, page: int) -> str:
+        """渲染检索结果页，每页的文献ID带上页码后缀以保证唯一"""
+        return re.sub(
+            r'(data-filename="|filename=)([A-Z]+\d+)',
+            lambda m: f"{m.group(1)}{m.group(2)}{page:03d}",
+            self._pages["search_grid.html"]
+        )
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.get("/")
+        async def home():
+            self.counts["home"] += 1
+            return HTMLResponse("<html><body>CNKI</body></html>")
+
+        @app.api_route("/login/", methods=["GET", "POST"])
+        async def login():
+            self.counts["login"] += 1
+            response = HTMLResponse("<html><body>ok</body></html>")
+            response.set_cookie("JSESSIONID", f"SIM{self._random.getrandbits(32):08X}")
+            return response
+
+        @app.get("/kns8/defaultresult/index")
+        async def index():
+            self.counts["index"] += 1
+            response = HTMLResponse(self._pages["index.html"].replace(self._token, self.current_token))
+            response.set_cookie("Ecp_ClientId", "SIM0000000001")
+            return response
+
+        @app.post("/kns8/Brief/GetGridTableHtml")
+        async def grid(request: Request):
+            form = await request.form()
+            if form.get("action") == "init":
+                self.counts["init"] += 1
+                return HTMLResponse("")
+
+            self.counts["search"] += 1
+            if form.get("token") != self.current_token:
+                self.counts["invalid_token"] += 1
+                return HTMLResponse(self._pages["session_expired.html"])
+            fault = await self._inject_faults()
+            if fault is not None:
+                return fault
+            return HTMLResponse(self.render_grid(int(form.get("CurPage", 1))))
+
+        @app.get("/KCMS/detail/detail.aspx")
+        async def detail():
+            self.counts["detail"] += 1
+            fault = await self._inject_faults()
+            if fault is not None:
+                return fault
+            return HTMLResponse(self._pages["detail.html"])
+
+        return app
+
+
+class FakeLLM:
+    """DeepSeek chat-completions接口替身"""
+
+    def __init__(
+        self, latency: float = 0.0, error_rate: float = 0.0, error_status: int = 503, seed: Optional[int] = None
+    ):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status  # 429/402 模拟额度耗尽
+        self.counts: Counter = Counter()
+        self._random = random.Random(seed)
+        self.app = self._build_app()
+
+    def snapshot(self) -> Dict[str, int]:
+        return dict(self.counts)
+
+    def reset(self) -> None:
+        self.counts.clear()
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.post("/chat/completions")
+        async def chat_completions(request: Request):
+            self.counts["chat"] += 1
+            payload = await request.json()
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.counts["5xx" if self.error_status >= 500 else str(self.error_status)] += 1
+                return JSONResponse({"error": {"message": "overloaded"}}, status_code=self.error_status)
+
+            prompt = "".join(m.get("content", "") for m in payload.get("messages", []))
+            content = f"## 模拟分析\n\n{prompt.splitlines()[0] if prompt else ''}\n\n这是离线模拟器生成的分析结果。"
+            prompt_tokens = len(prompt)
+            completion_tokens = len(content)
+            return {
+                "id": f"chatcmpl-sim-{self.counts['chat']}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": payload.get("model", ""),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop"
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens
+                }
+            }
+
+        return app
+
+
+def free_port() -> int:
+    """获取一个空闲端口"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class _ThreadedServer(uvicorn.Server):
+    def install_signal_handlers(self) -> None:
+        # 在子线程中运行时不能注册信号处理
+        pass
+
+
+class ServerThread:
+    """在后台线程中运行uvicorn服务"""
+
+    def __init__(self, app: FastAPI, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port or free_port()
+        self.server = _ThreadedServer(uvicorn.Config(
+            app, host=self.host, port=self.port, log_level="warning", lifespan="off"
+        ))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self, timeout: float = 10.0) -> "ServerThread":
+        self.thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"模拟服务启动超时: {self.url}")
+            time.sleep(0.05)
+        return self
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="CNKI/DeepSeek离线模拟器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000, help="CNKI模拟端口")
+    parser.add_argument("--llm-port", type=int, default=9001, help="chat-completions模拟端口")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-delay", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--denied-rate", type=float, default=0.0)
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    upstream = UpstreamSimulator(FaultConfig(
+        latency=args.latency,
+        slow_rate=args.slow_rate,
+        slow_delay=args.slow_delay,
+        error_rate=args.error_rate,
+        denied_rate=args.denied_rate
+    ))
+    llm = FakeLLM(latency=args.llm_latency)
+    servers = [
+        ServerThread(upstream.app, args.host, args.port).start(),
+        ServerThread(llm.app, args.host, args.llm_port).start(),
+    ]
+    print(f"CNKI_KNS_URL={servers[0].url} CNKI_BASE_URL={servers[0].url} "
+          f"CNKI_LOGIN_URL={servers[0].url}/login/ DEEPSEEK_API_BASE={servers[1].url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for server in servers:
+            server.stop()
+        print(f"上游请求统计: {upstream.snapshot()} {llm.snapshot()}")
+
+
+if __name__ == "__main__":
+    main()
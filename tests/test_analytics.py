@@ -0,0 +1,85 @@
+import json
+import random
+import time
+
+import backend.analytics as analytics
+from backend.analytics import ArticleColumns, analyze, citation_stats, keyword_cooccurrence, top_counts, year_distribution
+from backend.cache import make_cache_key
+
+
+ARTICLES = [
+    {"id": "A1", "journal": "软件学报", "date": "2015-02-14", "citations": 10, "keywords": ["深度学习;", "文本分类;"]},
+    {"id": "A2", "journal": "计算机学报", "date": "2021-03-18", "citations": 3, "keywords": ["深度学习", "注意力机制"]},
+    {"id": "A3", "journal": "软件学报", "date": "2021-07-01", "citations": 0, "keywords": ["深度学习", "文本分类", "注意力机制"]},
+    {"id": "A4", "journal": "", "date": "", "citations": 5},
+]
+
+
+def test_aggregations():
+    columns = ArticleColumns.from_articles(ARTICLES)
+    assert year_distribution(columns.dates) == {"2015": 1, "2021": 2}
+    assert top_counts(columns.journals, 1) == [{"name": "软件学报", "count": 2}]
+
+    stats = citation_stats(columns.citations)
+    assert stats["total"] == 18
+    assert stats["uncited"] == 1
+    assert stats["h_index"] == 3
+    assert stats["percentiles"]["p50"] == 4.0
+
+    cooccurrence = keyword_cooccurrence(columns.keywords, 10)
+    assert cooccurrence["keywords"][0] == {"name": "深度学习", "count": 3}
+    pairs = {(p["source"], p["target"]): p["count"] for p in cooccurrence["pairs"]}
+    assert pairs[("深度学习", "文本分类")] == 2
+    assert pairs[("深度学习", "注意力机制")] == 2
+    assert pairs[("文本分类", "注意力机制")] == 1
+
+
+def test_empty_input():
+    result = analyze(ArticleColumns())
+    assert result["article_count"] == 0
+    assert result["citations"] == {"count": 0}
+    assert result["keyword_cooccurrence"] == {"keywords": [], "pairs": []}
+
+
+def test_from_harvest_reads_committed_output(tmp_path):
+    path = tmp_path / "harvest.jsonl"
+    committed = "".join(json.dumps(a, ensure_ascii=False) + "\n" for a in ARTICLES).encode("utf-8")
+    path.write_bytes(committed + b'{"id": "A5", "jour')  # 写了一半、尚未提交的页
+    harvest = {"format": "jsonl", "output_path": str(path), "output_offset": len(committed)}
+    columns = ArticleColumns.from_harvest(harvest)
+    assert len(columns) == len(ARTICLES)
+    assert analyze(columns)["top_journals"][0]["name"] == "软件学报"
+
+    harvest["output_path"] = str(tmp_path / "pending.jsonl")  # 还没有写出第一页
+    assert len(ArticleColumns.from_harvest(harvest)) == 0
+    assert len(ArticleColumns.from_harvest({"format": "parquet", "output_path": str(tmp_path / "pending")})) == 0
+
+
+def test_large_corpus_aggregates_quickly():
+    rng = random.Random(0)
+    keywords = [f"关键词{i}" for i in range(2000)]
+    columns = ArticleColumns.from_articles({
+        "id": f"A{i}",
+        "journal": f"期刊{rng.randrange(800)}",
+        "date": f"{rng.randint(1995, 2024)}-01-01",
+        "citations": rng.randrange(500),
+        "keywords": rng.sample(keywords, 5)
+    } for i in range(100000))
+
+    start = time.perf_counter()
+    result = analyze(columns)
+    assert time.perf_counter() - start < 1.0
+    assert sum(result["year_distribution"].values()) == 100000
+
+
+def test_fill_cached_keywords_uses_summary_or_detail_cache(monkeypatch):
+    cached = {
+        make_cache_key("summary_stale", "A1"): json.dumps({"data": {"article_info": {"keywords": ["摘要缓存;"]}}}),
+        make_cache_key("article", "A2"): json.dumps({"keywords": ["详情缓存;"]}),
+    }
+    monkeypatch.setattr(analytics, "redis_client", type("FakeRedis", (), {
+        "mget": staticmethod(lambda keys: [cached.get(key) for key in keys])
+    }))
+    columns = ArticleColumns.from_articles([{"id": "A1"}, {"id": "A2"}, {"id": "A3"}])
+    assert columns.fill_cached_keywords() == 2
+    assert columns.keywords == [["摘要缓存"], ["详情缓存"], []]
@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+import pytest
+import redis
+import redis.asyncio
+import backend.anti_crawler_handler as anti_crawler_module
+from backend.anti_crawler_handler import AntiCrawlerHandler, BanCache
+from tests.loadtest import LOADTEST_REDIS_URL
+
+
+class CountingRedis(redis.Redis):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.commands = []
+
+    def execute_command(self, *args, **options):
+        self.commands.append(args[0])
+        return super().execute_command(*args, **options)
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    client = CountingRedis.from_url(LOADTEST_REDIS_URL)
+    try:
+        client.ping()
+    except redis.ConnectionError:
+        pytest.skip("需要本地Redis")
+    client.flushdb()
+    monkeypatch.setattr(anti_crawler_module, "redis_client", client)
+    monkeypatch.setattr(anti_crawler_module, "ban_cache", BanCache())
+    client.commands.clear()
+    yield client
+    client.flushdb()
+
+
+def test_ban_cache_expiry_and_size():
+    cache = BanCache(max_size=2, allow_ttl=0.05)
+    cache.set("1.1.1.1", False)
+    cache.set("2.2.2.2", True, ttl=10)
+    cache.set("3.3.3.3", False)
+    assert cache.get("1.1.1.1") is None  # 超出容量，淘汰最久未使用的
+    assert cache.get("2.2.2.2") is True
+    time.sleep(0.06)
+    assert cache.get("3.3.3.3") is None
+    assert cache.get("2.2.2.2") is True
+
+    cache.apply({"ip": "2.2.2.2", "ttl": 0})
+    assert cache.get("2.2.2.2") is False
+
+
+@pytest.mark.asyncio
+async def test_not_banned_path_skips_redis(redis_client):
+    assert not await AntiCrawlerHandler.is_ip_banned("10.0.0.1")
+    assert redis_client.commands == ["PTTL"]
+    for _ in range(10):
+        assert not await AntiCrawlerHandler.is_ip_banned("10.0.0.1")
+    assert redis_client.commands == ["PTTL"]
+
+
+@pytest.mark.asyncio
+async def test_ban_is_cached_until_it_expires(redis_client):
+    redis_client.setex("ip_bans:10.0.0.2", 600, "1")
+    assert await AntiCrawlerHandler.is_ip_banned("10.0.0.2")
+    expires_at, banned = anti_crawler_module.ban_cache._entries["10.0.0.2"]
+    assert banned
+    assert 590 < expires_at - time.monotonic() <= 600
+
+    AntiCrawlerHandler.ban_ip("10.0.0.2", 0)
+    assert not await AntiCrawlerHandler.is_ip_banned("10.0.0.2")
+    assert not redis_client.exists("ip_bans:10.0.0.2")
+
+
+@pytest.mark.asyncio
+async def test_bans_propagate_to_other_workers(redis_client):
+    other_worker = BanCache()
+    other_worker.set("10.0.0.3", False)  # 另一个worker已缓存"未封禁"
+    subscriber = redis.asyncio.from_url(LOADTEST_REDIS_URL)
+    listener = asyncio.create_task(other_worker.listen(subscriber))
+    try:
+        for _ in range(50):
+            if redis_client.pubsub_numsub(anti_crawler_module.BAN_CHANNEL)[0][1]:
+                break
+            await asyncio.sleep(0.02)
+
+        AntiCrawlerHandler.ban_ip("10.0.0.3", 3600)
+        for _ in range(50):
+            if other_worker.get("10.0.0.3"):
+                break
+            await asyncio.sleep(0.02)
+        assert other_worker.get("10.0.0.3") is True
+    finally:
+        listener.cancel()
+        await asyncio.gather(listener, return_exceptions=True)
+        await subscriber.aclose()
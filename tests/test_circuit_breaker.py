@@ -0,0 +1,137 @@
+import asyncio
+import httpx
+import pytest
+import backend.cnki_crawler as crawler_module
+from backend.article_summarizer import ArticleSummarizer
+from backend.circuit_breaker import CircuitBreaker, CircuitOpenError, RetryBudget
+from backend.cnki_crawler import AccessDeniedError, CNKICrawler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_opens_after_threshold_and_recovers():
+    clock = FakeClock()
+    breaker = CircuitBreaker("cnki", failure_threshold=3, recovery_timeout=30, clock=clock)
+    for _ in range(3):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    clock.now = 31
+    assert breaker.allow_request()          # 半开探测
+    assert not breaker.allow_request()      # 只放行一个探测请求
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_failure_reopens():
+    clock = FakeClock()
+    breaker = CircuitBreaker("cnki", failure_threshold=1, recovery_timeout=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 11
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.is_open()
+    assert breaker.retry_after == 10
+
+
+def test_retry_budget_limits_retries_to_ratio():
+    clock = FakeClock()
+    budget = RetryBudget(ratio=0.5, min_per_second=0, window=10, clock=clock)
+    for _ in range(4):
+        budget.record_request()
+    assert [budget.try_acquire() for _ in range(3)] == [True, True, False]
+
+    clock.now = 11  # 窗口过期后预算清零
+    assert not budget.try_acquire()
+
+
+def test_error_classification():
+    request = httpx.Request("GET", "https://kns.cnki.net/")
+
+    def status_error(code):
+        return httpx.HTTPStatusError("", request=request, response=httpx.Response(code, request=request))
+
+    assert CNKICrawler._is_retryable(status_error(503))
+    assert CNKICrawler._is_retryable(status_error(429))
+    assert CNKICrawler._is_retryable(httpx.ConnectTimeout("timeout"))
+    assert not CNKICrawler._is_retryable(status_error(404))
+    assert not CNKICrawler._is_retryable(AccessDeniedError("访问受限"))
+    assert not CNKICrawler._is_retryable(AttributeError("parse"))
+
+
+def test_released_probe_allows_next_probe():
+    clock = FakeClock()
+    breaker = CircuitBreaker("cnki", failure_threshold=1, recovery_timeout=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 11
+    breaker.raise_if_open()                 # 只判断，不占用探测名额
+    assert breaker.allow_request()
+    breaker.release()                       # 探测被取消，没有结果
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.check()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_releases_slot(monkeypatch):
+    clock = FakeClock()
+    breaker = CircuitBreaker("cnki", failure_threshold=1, recovery_timeout=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 11
+    monkeypatch.setattr(crawler_module, "get_breaker", lambda host: breaker)
+
+    async def hang(self, url, **kwargs):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(httpx.AsyncClient, "get", hang)
+    crawler = CNKICrawler(ua=type("UA", (), {"random": "test"})())
+    task = asyncio.create_task(crawler._make_request("get", "https://kns.cnki.net/kns8"))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert breaker.allow_request()
+
+
+def _half_open_summarizer(monkeypatch, handler):
+    monkeypatch.setenv("DEEPSEEK_API_KEY", "test")
+    clock = FakeClock()
+    breaker = CircuitBreaker("llm", failure_threshold=1, recovery_timeout=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 11
+    summarizer = ArticleSummarizer(client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    summarizer.api_base = "http://fake-llm"
+    summarizer.breaker = breaker
+    return summarizer, breaker
+
+
+@pytest.mark.asyncio
+async def test_malformed_llm_response_reopens_breaker(monkeypatch):
+    summarizer, breaker = _half_open_summarizer(monkeypatch, lambda request: httpx.Response(200, text="<html>"))
+    with pytest.raises(ValueError):
+        await summarizer._call_api([{"role": "user", "content": "hi"}])
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+@pytest.mark.asyncio
+async def test_cancelled_llm_probe_releases_slot(monkeypatch):
+    async def hang(request):
+        await asyncio.sleep(10)
+
+    summarizer, breaker = _half_open_summarizer(monkeypatch, hang)
+    task = asyncio.create_task(summarizer._call_api([{"role": "user", "content": "hi"}]))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert breaker.allow_request()
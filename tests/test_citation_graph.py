@@ -0,0 +1,123 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from backend.citation_graph import CitationGraph, parse_reference, title_key
+from backend.cnki_crawler import CNKICrawler
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def test_parse_reference_styles():
+    journal = parse_reference("[4]李敏勇,林芳超,李勇芳,高静杰.图神经网络在知识图谱补全中的应用[J].计算机研究与发展,2021,58(3):512-525.")
+    assert journal == {
+        "title": "图神经网络在知识图谱补全中的应用",
+        "authors": ["李敏勇", "林芳超", "李勇芳", "高静杰"],
+        "year": 2021,
+        "venue": "计算机研究与发展",
+        "type": "J"
+    }
+
+    conference = parse_reference(
+        "[2]Vaswani A, Shazeer N, Parmar N, et al. Attention is all you need[C]//Advances in Neural "
+        "Information Processing Systems. 2017: 5998-6008."
+    )
+    assert conference["title"] == "Attention is all you need"
+    assert conference["authors"] == ["Vaswani A", "Shazeer N", "Parmar N"]
+    assert conference["venue"] == "Advances in Neural Information Processing Systems"
+    assert conference["year"] == 2017
+
+    thesis = parse_reference("[6]刘洋.基于深度学习的文本分类关键技术研究[D].北京:清华大学,2018.")
+    assert (thesis["type"], thesis["venue"], thesis["year"]) == ("D", "北京:清华大学", 2018)
+
+    assert parse_reference("[7]无法识别的参考文献 2020")["title"] == "无法识别的参考文献 2020"
+    assert title_key("Attention Is All You Need.") == title_key("attention is all you need")
+
+
+def test_references_link_to_known_articles(tmp_path):
+    crawler = CNKICrawler()
+    articles, _ = crawler._parse_search_page((FIXTURES / "search_grid.html").read_text(encoding="utf-8"))
+    content = crawler._parse_detail_page((FIXTURES / "detail.html").read_text(encoding="utf-8"))
+
+    graph = CitationGraph(str(tmp_path / "citations.sqlite3"))
+    graph.add_articles(articles)
+    assert graph.add_article("CJFD.DETAIL", content) == len(content["references"])
+    assert graph.add_article("CJFD.DETAIL", content) == 0
+
+    result = graph.neighbors("CJFD.DETAIL")
+    linked = [ref for ref in result["references"] if ref["known"]]
+    assert [ref["id"] for ref in linked] == ["CJFD.JSJX20210302"]
+    assert graph.neighbors("CJFD.JSJX20210302")["cited_by"][0]["id"] == "CJFD.DETAIL"
+
+
+def test_reference_node_becomes_known_article(tmp_path):
+    graph = CitationGraph(str(tmp_path / "citations.sqlite3"))
+    graph.add_article("A", {"title": "论文A", "references": ["[1]张三.论文B[J].期刊,2020,1(1):1-2."]})
+    graph.add_articles([{"id": "B", "title": "论文B", "journal": "期刊"}])
+
+    b = graph.neighbors("B")
+    assert b["known"] and b["journal"] == "期刊"
+    assert [node["id"] for node in b["cited_by"]] == ["A"]
+
+
+def test_co_citation_and_pagerank(tmp_path):
+    graph = CitationGraph(str(tmp_path / "citations.sqlite3"))
+    refs = lambda *titles: {"references": [f"[1]作者.{t}[J].期刊,2020." for t in titles]}
+    graph.add_articles([{"id": t, "title": t} for t in ("甲", "乙", "丙", "丁")])
+    graph.add_article("P1", {"title": "P1", **refs("甲", "乙")})
+    graph.add_article("P2", {"title": "P2", **refs("甲", "乙", "丙")})
+    graph.add_article("P3", {"title": "P3", **refs("甲", "丁")})
+
+    result = graph.neighbors("甲")
+    assert result["cited_by_count"] == 3
+    assert result["pagerank_rank"] == 1
+    co_cited = {node["id"]: node["co_citations"] for node in result["co_cited"]}
+    assert co_cited == {"乙": 2, "丙": 1, "丁": 1}
+    assert result["co_cited"][0]["id"] == "乙"
+    assert graph.top_ranked(1)[0]["id"] == "甲"
+
+
+def test_warm_started_pagerank_matches_full_computation(tmp_path):
+    rng = np.random.default_rng(0)
+    graph = CitationGraph(str(tmp_path / "citations.sqlite3"))
+    titles = [f"论文{i}" for i in range(200)]
+    for i in range(150):
+        cited = rng.choice(200, size=5, replace=False)
+        graph.add_article(f"P{i}", {"title": titles[i], "references": [f"[1]作者.{titles[j]}[J].期刊,2020." for j in cited]})
+        if i % 50 == 49:
+            graph.top_ranked(1)  # 触发重建，之后以本次结果为初值
+
+    warm = graph._ranks.copy()
+    edges = np.array(graph.conn.execute("SELECT src, dst FROM edges").fetchall())
+    full = graph._pagerank(edges[:, 0], edges[:, 1], warm.size, np.zeros(0), tol=1e-12, max_iter=500)
+    assert warm.sum() == pytest.approx(1.0)
+    assert np.abs(warm - full).sum() < 1e-6
+
+
+def test_articles_with_same_title_stay_separate(tmp_path):
+    graph = CitationGraph(str(tmp_path / "citations.sqlite3"))
+    graph.add_articles([{"id": "A.1", "title": "综述"}])
+    graph.add_articles([{"id": "B.2", "title": "综述"}])
+    assert graph.neighbors("A.1")["id"] == "A.1"
+    assert graph.neighbors("B.2")["id"] == "B.2"
+
+
+def test_workers_share_database_file(tmp_path):
+    path = str(tmp_path / "citations.sqlite3")
+    first, second = CitationGraph(path), CitationGraph(path)
+    first.add_articles([{"id": "A", "title": "论文A"}])
+    second.add_articles([{"id": "B", "title": "论文B"}])
+    first.add_articles([{"id": "C", "title": "论文C"}])
+    assert first.neighbors("B")["cited_by"] == []
+
+    second.add_article("D", {"title": "论文D", "references": ["[1]张三.论文B[J].期刊,2020,1(1):1-2."]})
+    assert [node["id"] for node in first.neighbors("B")["cited_by"]] == ["D"]
+
+
+@pytest.mark.asyncio
+async def test_background_writes_do_not_block_requests(tmp_path):
+    graph = CitationGraph(str(tmp_path / "citations.sqlite3"))
+    graph.write_in_background(graph.add_articles, [{"id": "A", "title": "论文A"}])
+    graph.write_in_background(graph.add_articles, [{"bad": "缺少id"}])  # 失败只记录日志
+    await graph.flush()
+    assert graph.neighbors("A")["id"] == "A"
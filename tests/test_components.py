@@ -0,0 +1,56 @@
+import asyncio
+import threading
+import time
+
+from backend.components import ComponentRegistry, create_registry
+from tests import construction_bench
+
+
+def test_component_constructed_once_under_concurrency():
+    calls = []
+
+    def factory():
+        calls.append(threading.get_ident())
+        time.sleep(0.05)
+        return object()
+
+    registry = ComponentRegistry()
+    registry.register("heavy", factory)
+    assert not registry.is_initialized("heavy")
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("heavy"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len({id(result) for result in results}) == 1
+    assert registry.construction_seconds["heavy"] >= 0.05
+
+
+def test_views_share_heavy_components(monkeypatch):
+    monkeypatch.setenv("DEEPSEEK_API_KEY", "test")
+    registry = create_registry()
+
+    first = registry.crawler(max_papers=20, min_citations=3, cookie={"a": "b"})
+    second = registry.crawler()
+    assert (first.max_papers, first.min_citations, first.cookie) == (20, 3, {"a": "b"})
+    assert (second.max_papers, second.min_citations) == (100, 0)
+    assert first.ua is second.ua and first.proxy_pool is second.proxy_pool
+
+    summarizer = registry.summarizer(user="alice", fallback=False)
+    assert summarizer.user == "alice" and not summarizer.fallback
+    assert summarizer.client is registry.summarizer().client
+
+    client = summarizer.client
+    asyncio.run(registry.aclose())
+    assert client.is_closed
+    assert not registry.is_initialized("llm_client")
+
+
+def test_view_construction_is_cheaper_than_full_construction(monkeypatch):
+    monkeypatch.setenv("DEEPSEEK_API_KEY", "test")
+    report = construction_bench.run(iterations=5)
+    assert report["per_request_view"]["crawler"]["mean_ms"] < report["per_request_old"]["crawler"]["mean_ms"]
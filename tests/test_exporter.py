@@ -0,0 +1,110 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+import redis
+import backend.exporter as exporter
+from backend.cache import make_cache_key
+from backend.exporter import export_stream, iter_jsonl
+from tests.loadtest import LOADTEST_REDIS_URL
+
+ARTICLES = [
+    {"id": "CJFD.A1", "title": "深度学习综述", "authors": "张伟; 王芳", "journal": "软件学报",
+     "date": "2021-03-18", "citations": 12, "downloads": 300},
+    {"id": "CJFD.A2", "title": "图神经网络{GNN}", "authors": "李敏勇", "journal": "计算机学报",
+     "date": "", "citations": 0, "downloads": 0},
+]
+
+
+def collect(chunks) -> bytes:
+    return b"".join(chunks)
+
+
+def test_csv_export():
+    data = collect(export_stream(ARTICLES, "csv", details=False)).decode("utf-8-sig")
+    rows = list(csv.DictReader(io.StringIO(data)))
+    assert [row["id"] for row in rows] == ["CJFD.A1", "CJFD.A2"]
+    assert rows[0]["authors"] == "张伟; 王芳"
+    assert rows[0]["citations"] == "12"
+
+
+def test_bibtex_and_ris_export():
+    bibtex = collect(export_stream(ARTICLES, "bibtex", details=False)).decode("utf-8")
+    assert bibtex.count("@article{") == 2
+    assert "author = {张伟 and 王芳}" in bibtex
+    assert "year = {2021}" in bibtex
+    assert "title = {图神经网络GNN}" in bibtex
+
+    ris = collect(export_stream(ARTICLES, "ris", details=False)).decode("utf-8")
+    assert ris.count("TY  - JOUR") == ris.count("ER  - ") == 2
+    assert "AU  - 王芳" in ris
+    assert "PY  - 2021" in ris
+
+
+def test_gzip_export_round_trip():
+    compressed = collect(export_stream(ARTICLES, "ris", details=False, compress=True))
+    plain = collect(export_stream(ARTICLES, "ris", details=False))
+    assert gzip.decompress(compressed) == plain
+
+
+def test_parquet_export_round_trip():
+    pq = pytest.importorskip("pyarrow.parquet")
+    articles = [{**ARTICLES[0], "id": f"CJFD.{i}"} for i in range(1200)]
+    table = pq.read_table(io.BytesIO(collect(export_stream(articles, "parquet", details=False))))
+    assert table.num_rows == 1200
+    assert table.column("authors")[0].as_py() == ["张伟", "王芳"]
+
+
+def test_export_is_streamed_in_batches():
+    consumed = []
+
+    def articles():
+        for i in range(50000):
+            consumed.append(i)
+            yield {**ARTICLES[0], "id": f"CJFD.{i}"}
+
+    chunks = export_stream(articles(), "csv", details=False)
+    next(chunks)
+    assert len(consumed) == exporter.EXPORT_BATCH_SIZE
+    assert sum(1 for _ in chunks) == 50000 // exporter.EXPORT_BATCH_SIZE - 1
+
+
+def test_export_includes_cached_details(monkeypatch):
+    client = redis.from_url(LOADTEST_REDIS_URL)
+    try:
+        client.ping()
+    except redis.ConnectionError:
+        pytest.skip("需要本地Redis")
+    client.flushdb()
+    monkeypatch.setattr(exporter, "redis_client", client)
+    client.set(make_cache_key("summary_stale", "CJFD.A1"), json.dumps({
+        "status": "success",
+        "data": {
+            "summary": {"summary": "- 总结"},
+            "article_info": {"abstract": "摘要", "keywords": ["深度学习;"], "doi": "10.1/abc"}
+        }
+    }, ensure_ascii=False))
+
+    # 只有文章详情缓存（fast模式、预热写入）时也补全摘要、关键词与DOI
+    client.set(make_cache_key("article", "CJFD.A2"), json.dumps(
+        {"abstract": "图摘要", "keywords": ["图神经网络;"], "doi": "10.1/gnn"}, ensure_ascii=False
+    ))
+
+    ris = collect(export_stream(ARTICLES, "ris")).decode("utf-8")
+    client.flushdb()
+    assert "AB  - 摘要" in ris
+    assert "KW  - 深度学习\n" in ris
+    assert "N1  - - 总结" in ris
+    assert "DO  - 10.1/abc" in ris
+    assert "AB  - 图摘要" in ris
+    assert "KW  - 图神经网络\n" in ris
+    assert "DO  - 10.1/gnn" in ris
+
+
+def test_jsonl_reads_only_committed_offset(tmp_path):
+    path = tmp_path / "harvest.jsonl"
+    committed = "".join(json.dumps(a, ensure_ascii=False) + "\n" for a in ARTICLES).encode("utf-8")
+    path.write_bytes(committed + b'{"id": "partial')
+    assert [a["id"] for a in iter_jsonl(str(path), len(committed))] == ["CJFD.A1", "CJFD.A2"]
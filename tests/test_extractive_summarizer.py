@@ -0,0 +1,46 @@
+import time
+
+from backend.cnki_crawler import CNKICrawler
+from backend.extractive_summarizer import ExtractiveSummarizer, split_sentences, textrank
+from tests.simulator import load_fixture
+
+
+def test_split_sentences_handles_chinese_and_english():
+    text = "第一句话在这里。第二句话！Third sentence here. 短。最后一句；"
+    assert split_sentences(text) == ["第一句话在这里。", "第二句话！", "Third sentence here.", "最后一句；"]
+
+
+def test_textrank_prefers_central_sentence():
+    sentences = [
+        "注意力机制用于文本分类",
+        "文本分类模型引入注意力机制",
+        "注意力机制提升文本分类效果",
+        "今天天气很好适合出门散步",
+    ]
+    scores = textrank(sentences)
+    assert scores.index(min(scores)) == 3
+
+
+def test_keywords_boost_sentences():
+    sentences = ["模型在数据集上取得较好效果。", "本文研究知识图谱补全问题。"]
+    summarizer = ExtractiveSummarizer()
+    plain = summarizer.rank(sentences, [])
+    boosted = summarizer.rank(sentences, ["知识图谱;"])
+    assert boosted[1] > plain[1]
+    assert boosted[0] == plain[0]
+
+
+def test_summarize_detail_fixture_is_fast():
+    content = CNKICrawler()._parse_detail_page(load_fixture("detail.html"))
+    start = time.perf_counter()
+    result = ExtractiveSummarizer().summarize(content)
+    assert time.perf_counter() - start < 0.05
+    assert result["mode"] == "fast"
+    assert 1 <= len(result["key_sentences"]) <= 3
+    assert all(sentence in content["abstract"] for sentence in result["key_sentences"])
+    assert result["methodology_analysis"] and result["innovation_analysis"]
+
+
+def test_empty_abstract():
+    result = ExtractiveSummarizer().summarize({"abstract": "", "keywords": []})
+    assert result["key_sentences"] == []
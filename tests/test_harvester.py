@@ -0,0 +1,134 @@
+import json
+import threading
+
+import pytest
+from backend.cnki_crawler import CNKICrawler
+from backend.harvester import Harvester, HarvestStore, JsonlWriter
+from tests.simulator import UpstreamSimulator
+
+
+class FlakyCrawler(CNKICrawler):
+    """用录制页面代替上游，在指定页抛出一次异常"""
+
+    def __init__(self, fail_pages=(), repeat_pages=(), **kwargs):
+        super().__init__(**kwargs)
+        self.upstream = UpstreamSimulator()
+        self.fail_pages = set(fail_pages)
+        self.repeat_pages = set(repeat_pages)
+        self.fetched = []
+
+    async def _ensure_session(self, refresh: bool = False) -> None:
+        pass
+
+    async def _fetch_search_page(self, query: str, page: int, sort_by: str = "relevance") -> str:
+        self.fetched.append(page)
+        if page in self.fail_pages:
+            self.fail_pages.discard(page)
+            raise Exception("模拟崩溃")
+        # repeat_pages 返回第1页的内容，用于验证去重
+        return self.upstream.render_grid(1 if page in self.repeat_pages else page)
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.mark.asyncio
+async def test_harvest_resumes_from_checkpoint(tmp_path):
+    store = HarvestStore(str(tmp_path / "harvests.sqlite3"))
+    crawler = FlakyCrawler(fail_pages={3})
+
+    async def factory(min_citations):
+        return crawler
+
+    harvester = Harvester(store, factory, page_delay=0)
+    harvest = store.create("深度学习", "jsonl", max_articles=90, min_citations=0)
+
+    await harvester.run(harvest["id"])
+    failed = store.get(harvest["id"])
+    assert failed["status"] == "failed"
+    assert failed["next_page"] == 3
+    assert len(read_jsonl(failed["output_path"])) == 40
+
+    # 模拟崩溃时写了一半、未提交的数据
+    with open(failed["output_path"], "ab") as f:
+        f.write(b'{"id": "half-writ')
+
+    await harvester.run(harvest["id"])
+    done = store.get(harvest["id"])
+    rows = read_jsonl(done["output_path"])
+    assert done["status"] == "completed"
+    assert done["articles"] == 90
+    assert len(rows) == 90
+    assert len({row["id"] for row in rows}) == 90
+    assert crawler.fetched == [1, 2, 3, 3, 4, 5]
+
+
+@pytest.mark.asyncio
+async def test_harvest_deduplicates_repeated_articles(tmp_path):
+    store = HarvestStore(str(tmp_path / "harvests.sqlite3"))
+    crawler = FlakyCrawler(repeat_pages={2})
+
+    async def factory(min_citations):
+        return crawler
+
+    harvest = store.create("深度学习", "jsonl", max_articles=40, min_citations=0)
+    await Harvester(store, factory, page_delay=0).run(harvest["id"])
+
+    rows = read_jsonl(store.get(harvest["id"])["output_path"])
+    assert len(rows) == 40
+    assert len({row["id"] for row in rows}) == 40
+    assert crawler.fetched == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_harvest_writes_parquet_parts(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    store = HarvestStore(str(tmp_path / "harvests.sqlite3"))
+
+    async def factory(min_citations):
+        return FlakyCrawler(min_citations=min_citations)
+
+    harvest = store.create("深度学习", "parquet", max_articles=50, min_citations=0)
+    await Harvester(store, factory, page_delay=0).run(harvest["id"])
+
+    table = pq.read_table(store.get(harvest["id"])["output_path"])
+    assert table.num_rows == 50
+
+
+
+@pytest.mark.asyncio
+async def test_harvest_writes_pages_off_event_loop(tmp_path, monkeypatch):
+    store = HarvestStore(str(tmp_path / "harvests.sqlite3"))
+    threads = []
+    write_page = JsonlWriter.write_page
+
+    def recording_write_page(self, page, rows):
+        threads.append(threading.current_thread())
+        return write_page(self, page, rows)
+
+    monkeypatch.setattr(JsonlWriter, "write_page", recording_write_page)
+
+    async def factory(min_citations):
+        return FlakyCrawler()
+
+    harvest = store.create("深度学习", "jsonl", max_articles=40, min_citations=0)
+    await Harvester(store, factory, page_delay=0).run(harvest["id"])
+    assert store.get(harvest["id"])["status"] == "completed"
+    assert len(threads) == 2 and threading.main_thread() not in threads
+
+def test_only_stale_running_harvests_are_resumed(tmp_path, monkeypatch):
+    store = HarvestStore(str(tmp_path / "harvests.sqlite3"))
+    harvester = Harvester(store, None, page_delay=0, stale_after=60)
+    active = store.create("深度学习", "jsonl", 100, 0)
+    orphaned = store.create("知识图谱", "jsonl", 100, 0)
+    for harvest in (active, orphaned):
+        store.set_status(harvest["id"], "running")
+    store.conn.execute("UPDATE harvests SET updated_at = updated_at - 120 WHERE id = ?", (orphaned["id"],))
+
+    started = []
+    monkeypatch.setattr(harvester, "start", started.append)
+    assert harvester.resume_interrupted() == 1
+    assert started == [orphaned["id"]]  # 另一个任务仍有worker在发送心跳
+    assert harvester.is_active(store.get(active["id"]))
@@ -0,0 +1,102 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+import backend.http_cache as http_cache
+from backend.http_cache import HTTPCacheMiddleware, choose_encoding, content_etag, etag_matches
+
+LARGE = {"abstract": "基于深度学习的中文文本分类方法研究。" * 200}
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.middleware("http")(HTTPCacheMiddleware(minimum_size=1024))
+
+    @app.get("/large")
+    async def large():
+        return LARGE
+
+    @app.get("/small")
+    async def small():
+        return {"status": "ok"}
+
+    @app.post("/large")
+    async def post_large():
+        return LARGE
+
+    @app.get("/stream")
+    async def stream():
+        return StreamingResponse(iter([b"a" * 4096]), media_type="text/plain")
+
+    return TestClient(app)
+
+
+def test_large_responses_are_compressed(client, monkeypatch):
+    monkeypatch.setattr(http_cache, "brotli", None)
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(response.content) / 10
+    assert response.json() == LARGE
+    assert response.headers["etag"].endswith('-gzip"')
+
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/large", headers={"Accept-Encoding": "identity"}).headers
+    assert "content-encoding" not in client.get("/stream", headers={"Accept-Encoding": "gzip"}).headers
+
+
+def test_brotli_preferred_when_available(client):
+    pytest.importorskip("brotli")
+    response = client.get("/large", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "br"
+    assert response.json() == LARGE
+
+
+def test_etag_and_conditional_get(client):
+    first = client.get("/large", headers={"Accept-Encoding": "identity"})
+    etag = first.headers["etag"]
+    assert etag == content_etag(LARGE)
+
+    cached = client.get("/large", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    # 压缩表示的ETag同样可以用于条件请求
+    gzip_etag = client.get("/large", headers={"Accept-Encoding": "gzip"}).headers["etag"]
+    assert client.get("/large", headers={"If-None-Match": gzip_etag}).status_code == 304
+    assert client.get("/large", headers={"If-None-Match": '"other"'}).status_code == 200
+    assert "etag" not in client.post("/large").headers
+
+
+def test_not_modified_carries_encoded_etag(client, monkeypatch):
+    monkeypatch.setattr(http_cache, "brotli", None)
+    headers = {"Accept-Encoding": "gzip"}
+    gzip_etag = client.get("/large", headers=headers).headers["etag"]
+    cached = client.get("/large", headers={**headers, "If-None-Match": gzip_etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == gzip_etag
+    assert cached.headers["vary"] == "Accept-Encoding"
+
+    # 处理函数自行返回的304同样沿用客户端缓存的表示对应的ETag
+    app = FastAPI()
+    app.middleware("http")(HTTPCacheMiddleware(minimum_size=1024))
+
+    @app.get("/cached")
+    async def cached_endpoint():
+        return http_cache.not_modified(content_etag(LARGE))
+
+    response = TestClient(app).get("/cached", headers={**headers, "If-None-Match": gzip_etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == gzip_etag
+
+
+def test_header_parsing():
+    assert etag_matches('W/"abc", "def-gzip"', '"def"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches(None, '"abc"')
+    assert choose_encoding("gzip;q=0, deflate") is None
+    assert choose_encoding("gzip;q=0.5") == "gzip"
+    assert gzip.decompress(http_cache.compress(b"x" * 10, "gzip")) == b"x" * 10
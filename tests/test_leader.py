@@ -0,0 +1,107 @@
+import asyncio
+import time
+
+import pytest
+import redis
+from backend.cache import LocalCache
+from backend.leader import LeaderElection, LeaderLock
+from tests.loadtest import LOADTEST_REDIS_URL
+
+
+@pytest.fixture
+def redis_client():
+    client = redis.from_url(LOADTEST_REDIS_URL)
+    try:
+        client.ping()
+    except redis.ConnectionError:
+        pytest.skip("需要本地Redis")
+    client.flushdb()
+    yield client
+    client.flushdb()
+
+
+def test_lock_is_exclusive(redis_client):
+    first = LeaderLock(redis_client, "leader:test", ttl=5)
+    second = LeaderLock(redis_client, "leader:test", ttl=5)
+    assert first.acquire()
+    assert not second.acquire()
+    assert not second.renew() and not second.release()
+    assert first.renew()
+    assert first.holder() == first.token
+
+    assert first.release()
+    assert second.acquire()
+
+
+@pytest.mark.asyncio
+async def test_single_leader_runs_tasks_and_hands_over(redis_client):
+    running = []
+
+    def make_task(name):
+        async def task():
+            running.append(name)
+            try:
+                await asyncio.Event().wait()
+            finally:
+                running.remove(name)
+        return task
+
+    elections = [
+        LeaderElection(LeaderLock(redis_client, "leader:test", ttl=5), [make_task(name)], renew_interval=0.05)
+        for name in ("a", "b")
+    ]
+    tasks = [asyncio.create_task(election.run()) for election in elections]
+    await asyncio.sleep(0.2)
+    assert len(running) == 1
+    leader = 0 if running == ["a"] else 1
+
+    # 主节点关闭时释放锁，另一个worker在下一次竞选时接管
+    tasks[leader].cancel()
+    await asyncio.gather(tasks[leader], return_exceptions=True)
+    await asyncio.sleep(0.2)
+    assert running == ["b" if leader == 0 else "a"]
+
+    tasks[1 - leader].cancel()
+    await asyncio.gather(tasks[1 - leader], return_exceptions=True)
+    assert running == []
+    assert redis_client.get("leader:test") is None
+
+
+@pytest.mark.asyncio
+async def test_leader_stops_tasks_when_lock_is_lost(redis_client):
+    running = []
+
+    async def task():
+        running.append(1)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            running.pop()
+
+    election = LeaderElection(LeaderLock(redis_client, "leader:test", ttl=5), [task], renew_interval=0.05)
+    runner = asyncio.create_task(election.run())
+    await asyncio.sleep(0.1)
+    assert election.is_leader and running
+
+    redis_client.set("leader:test", "other-worker")  # 锁过期后被其他worker取得
+    await asyncio.sleep(0.1)
+    assert not election.is_leader and not running
+    runner.cancel()
+    await asyncio.gather(runner, return_exceptions=True)
+    assert redis_client.get("leader:test") == b"other-worker"
+
+
+def test_local_cache_ttl_and_lru():
+    cache = LocalCache(max_size=2, ttl=0.05)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    assert cache.get("a") == b"1"
+    cache.set("c", b"3")  # 淘汰最久未使用的b
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1"
+    time.sleep(0.06)
+    assert cache.get("a") is None
+
+    disabled = LocalCache(max_size=2, ttl=0)
+    disabled.set("a", b"1")
+    assert disabled.get("a") is None
@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+from backend.llm_scheduler import BATCH, INTERACTIVE, LLMScheduler
+
+
+async def run_in_order(scheduler, requests):
+    """占住唯一名额后让requests全部排队，再逐个释放，返回获得名额的顺序"""
+    order = []
+    await scheduler.acquire("holder")
+
+    async def worker(user, priority):
+        await scheduler.acquire(user, priority)
+        order.append(user)
+        await asyncio.sleep(0)
+        scheduler.release()
+
+    tasks = [asyncio.create_task(worker(user, priority)) for user, priority in requests]
+    await asyncio.sleep(0)
+    scheduler.release()
+    await asyncio.gather(*tasks)
+    return order
+
+
+@pytest.mark.asyncio
+async def test_users_are_served_fairly():
+    scheduler = LLMScheduler(max_concurrency=1)
+    order = await run_in_order(scheduler, [("alice", INTERACTIVE)] * 4 + [("bob", INTERACTIVE)] * 2)
+    assert order == ["alice", "bob", "alice", "bob", "alice", "alice"]
+
+
+@pytest.mark.asyncio
+async def test_interactive_before_batch():
+    scheduler = LLMScheduler(max_concurrency=1)
+    order = await run_in_order(scheduler, [("batch", BATCH)] * 3 + [("user", INTERACTIVE)] * 2)
+    assert order == ["user", "user", "batch", "batch", "batch"]
+
+
+@pytest.mark.asyncio
+async def test_weights_share_capacity():
+    scheduler = LLMScheduler(max_concurrency=1, weights={"alice": 2})
+    order = await run_in_order(scheduler, [("alice", INTERACTIVE)] * 6 + [("bob", INTERACTIVE)] * 3)
+    assert order[:6].count("alice") == 4
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_slot():
+    scheduler = LLMScheduler(max_concurrency=1)
+    await scheduler.acquire("holder")
+    waiting = asyncio.create_task(scheduler.acquire("alice"))
+    await asyncio.sleep(0)
+    assert scheduler.queue_depth() == 1
+
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    assert scheduler.queue_depth() == 0
+
+    scheduler.release()
+    assert scheduler.running == 0
+    await asyncio.wait_for(scheduler.acquire("bob"), timeout=1)
+    assert scheduler.running == 1
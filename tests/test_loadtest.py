@@ -0,0 +1,211 @@
+import asyncio
+import csv
+import io
+import json
+import httpx
+import pytest
+import redis
+from tests.loadtest import LOADTEST_REDIS_URL, LoadTestStack, run_scenario, search_request
+from tests.simulator import FaultConfig
+
+
+def _redis_available() -> bool:
+    try:
+        return redis.from_url(LOADTEST_REDIS_URL).ping()
+    except redis.RedisError:
+        return False
+
+
+pytestmark = pytest.mark.skipif(not _redis_available(), reason="压测需要可用的Redis")
+
+
+@pytest.fixture(scope="module")
+def trace_file(tmp_path_factory):
+    return tmp_path_factory.mktemp("traces") / "traces.jsonl"
+
+
+@pytest.fixture(scope="module")
+def stack(trace_file):
+    env = {"TRACE_EXPORTER": "file", "TRACE_FILE": str(trace_file)}
+    with LoadTestStack(seed=1, extra_env=env) as stack:
+        yield stack
+
+
+@pytest.mark.asyncio
+async def test_search_load(stack):
+    report = await run_scenario(stack, "search", total=8, concurrency=4)
+    assert report.statuses == {"200": 8}
+    assert report.upstream["search"] == 8
+    assert report.upstream["index"] == report.upstream["init"] == 1  # 会话只初始化一次
+    assert report.percentile(50) <= report.percentile(99)
+
+
+@pytest.mark.asyncio
+async def test_expired_session_refreshed_once(stack):
+    stack.upstream.expire_sessions()
+    report = await run_scenario(stack, "search", total=4, concurrency=4)
+    assert report.statuses == {"200": 4}
+    assert report.upstream["index"] == 1
+    assert report.upstream["invalid_token"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_summarize_load(stack):
+    report = await run_scenario(stack, "summarize", total=4, concurrency=2)
+    assert report.statuses == {"200": 4}
+    assert report.upstream["detail"] == 4
+    assert report.upstream["llm_chat"] == 12
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_fails_fast_and_serves_stale_results():
+    env = {"BREAKER_FAILURE_THRESHOLD": "2", "BREAKER_RECOVERY_TIMEOUT": "60"}
+    payload = {"page": 1, "settings": {"max_papers": 20, "min_citations": 0}}
+    with LoadTestStack(seed=1, extra_env=env) as stack:
+        async with httpx.AsyncClient(base_url=stack.url, timeout=60) as client:
+            fresh = await client.post("/search", json={**payload, "query": "人工智能"})
+            assert fresh.status_code == 200
+
+            stack.upstream.faults = FaultConfig(error_rate=1.0)
+            failed = await client.post("/search", json={**payload, "query": "深度学习"})
+            assert failed.status_code == 503  # 两次5xx后熔断，第三次尝试直接失败
+            assert stack.upstream.counts["5xx"] == 2
+
+            stale = await client.post("/search", json={**payload, "query": "人工智能"})
+            uncached = await client.post("/search", json={**payload, "query": "知识图谱"})
+
+    assert stale.status_code == 200
+    assert stale.json()["stale"] is True
+    assert stale.json()["data"] == fresh.json()["data"]
+    assert stale.elapsed.total_seconds() < 1  # 跳过智能延迟
+    assert uncached.status_code == 503
+    assert "Retry-After" in uncached.headers
+    assert stack.upstream.counts["search"] == 3
+
+
+@pytest.mark.asyncio
+async def test_metrics_cover_request_path(stack):
+    await run_scenario(stack, "summarize", total=1, concurrency=1)
+    async with httpx.AsyncClient(base_url=stack.url) as client:
+        body = (await client.get("/metrics")).text
+    assert 'http_requests_total{method="GET",route="/summarize/{article_id}",status="200"}' in body
+    assert 'upstream_fetch_duration_seconds_count{endpoint="/KCMS/detail/detail.aspx",outcome="ok"}' in body
+    assert 'llm_tokens_count{kind="prompt_tokens",section="innovation"}' in body
+    assert 'redis_command_duration_seconds_count{command="decrby"}' in body
+
+
+@pytest.mark.asyncio
+async def test_trace_spans_exported(stack, trace_file):
+    async with httpx.AsyncClient(base_url=stack.url, timeout=30) as client:
+        response = await client.get("/summarize/CJFD.JSJX20150201001")
+    trace_id = response.headers["X-Trace-Id"]
+    assert response.headers["traceparent"].split("-")[1] == trace_id
+
+    names = []
+    for _ in range(50):
+        await asyncio.sleep(0.2)
+        if not trace_file.exists():
+            continue
+        names = [
+            span["name"]
+            for line in trace_file.read_text(encoding="utf-8").splitlines()
+            for span in json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+            if span["traceId"] == trace_id
+        ]
+        if "GET /summarize/{article_id}" in names:
+            break
+    assert names.count("llm.chat") == 3
+    assert {"anti_crawler.delay", "upstream.fetch", "parse.detail", "redis.get"} <= set(names)
+
+
+@pytest.mark.asyncio
+async def test_export_streams_gzip_csv(stack):
+    async with httpx.AsyncClient(base_url=stack.url, timeout=60) as client:
+        search = await search_request(client, 0)
+        body = json.loads(search.request.content)
+        response = await client.post("/export", params={"format": "csv"}, json=body)
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "attachment" in response.headers["content-disposition"]
+    rows = list(csv.reader(io.StringIO(response.content.decode("utf-8-sig"))))
+    assert rows[0][:3] == ["id", "title", "authors"]
+    assert [row[0] for row in rows[1:]] == [a["id"] for a in search.json()["data"]["articles"]]
+
+
+@pytest.mark.asyncio
+async def test_summary_conditional_get(stack):
+    async with httpx.AsyncClient(base_url=stack.url, timeout=60) as client:
+        first = await client.get("/summarize/CJFD.JSJX20180401", headers={"Accept-Encoding": "gzip"})
+        details = stack.upstream.counts["detail"]
+        again = await client.get("/summarize/CJFD.JSJX20180401", headers={"If-None-Match": first.headers["etag"]})
+
+    assert first.status_code == 200
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.headers["cache-control"].startswith("public, max-age=")
+    assert again.status_code == 304
+    assert stack.upstream.counts["detail"] == details  # 命中缓存，不再请求上游
+
+
+@pytest.mark.asyncio
+async def test_fast_mode_and_llm_quota_fallback():
+    with LoadTestStack(seed=1) as stack:
+        async with httpx.AsyncClient(base_url=stack.url, timeout=60) as client:
+            fast = await client.get("/summarize/CJFD.JSJX20150201", params={"mode": "fast"})
+            assert fast.status_code == 200
+            assert fast.json()["data"]["summary"]["mode"] == "fast"
+            assert stack.llm.counts["chat"] == 0
+
+            stack.llm.error_rate, stack.llm.error_status = 1.0, 429
+            degraded = await client.get("/summarize/CJFD.JSJX20150202")
+            again = await client.get("/summarize/CJFD.JSJX20150203")
+
+    assert degraded.status_code == again.status_code == 200
+    summary = degraded.json()["data"]["summary"]
+    assert summary["mode"] == "fast"
+    assert "fallback_reason" in summary
+    assert stack.llm.counts["chat"] == 1  # 额度耗尽后立即熔断，后续请求不再调用大模型
+    assert again.json()["data"]["summary"]["mode"] == "fast"
+
+
+@pytest.mark.asyncio
+async def test_multi_worker_mode_elects_single_leader():
+    # 使用单独的库，避免与模块级压测环境的worker竞争同一把锁
+    redis_url = LOADTEST_REDIS_URL.rsplit("/", 1)[0] + "/14"
+    client = redis.from_url(redis_url)
+    with LoadTestStack(seed=1, workers=2, redis_url=redis_url) as stack:
+        report = await run_scenario(stack, "search", total=4, concurrency=4)
+        holder = client.get("leader:background")
+        # 指标汇总所有worker：无论哪个worker响应抓取，请求计数都是全部4次
+        async with httpx.AsyncClient(base_url=stack.url) as http:
+            scrapes = [(await http.get("/metrics")).text for _ in range(4)]
+
+    assert report.statuses == {"200": 4}
+    for body in scrapes:
+        counts = [
+            float(line.rsplit(" ", 1)[1]) for line in body.splitlines()
+            if line.startswith("http_requests_total{") and 'route="/search"' in line
+        ]
+        assert sum(counts) == 4
+    assert holder is not None
+    assert client.get("leader:background") is None  # 优雅关闭时释放主节点锁
+
+
+@pytest.mark.asyncio
+async def test_hot_results_served_from_cache():
+    env = {"SEARCH_CACHE_TTL": "600", "DETAIL_CACHE_TTL": "600", "SUMMARY_CACHE_TTL": "600"}
+    with LoadTestStack(seed=1, extra_env=env) as stack:
+        report = await run_scenario(stack, "search", total=8, concurrency=1)
+        async with httpx.AsyncClient(base_url=stack.url, timeout=60) as client:
+            full = [await client.get("/summarize/CJFD.JSJX20190101") for _ in range(2)]
+            fast = await client.get("/summarize/CJFD.JSJX20190101", params={"mode": "fast"})
+        popular = redis.from_url(LOADTEST_REDIS_URL).zscore("popularity:articles", "CJFD.JSJX20190101")
+
+    assert report.statuses == {"200": 8}
+    assert report.upstream["search"] == 6  # 6个不同检索各请求一次上游
+    assert [r.status_code for r in full] == [200, 200] and fast.status_code == 200
+    assert full[1].json() == full[0].json()
+    assert full[1].headers["etag"] == full[0].headers["etag"]
+    assert stack.upstream.counts["detail"] == 1  # fast模式使用缓存的详情
+    assert stack.llm.counts["chat"] == 3
+    assert popular == 3
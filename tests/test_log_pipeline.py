@@ -0,0 +1,85 @@
+import io
+import json
+import logging
+import time
+
+from backend.log_pipeline import (
+    JSONFormatter, SamplingFilter, create_queue_handler, record_upstream, request_log_context
+)
+from tests import logging_bench
+
+
+def make_logger(name, stream, queue_size=100):
+    output = logging.StreamHandler(stream)
+    output.setFormatter(JSONFormatter())
+    handler, listener = create_queue_handler(output, queue_size)
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.handlers = [handler]
+    return logger, handler, listener
+
+
+def test_json_records_carry_request_context():
+    stream = io.StringIO()
+    logger, _, listener = make_logger("test.context", stream)
+    listener.start()
+    token = request_log_context.set({"request_id": "req-1", "route": "/search"})
+    try:
+        record_upstream(0.25)
+        record_upstream(0.5)
+        logger.info("检索完成", extra={"upstream_ms": request_log_context.get()["upstream_ms"]})
+        try:
+            raise ValueError("坏数据")
+        except ValueError:
+            logger.exception("解析失败")
+    finally:
+        request_log_context.reset(token)
+        listener.stop()
+
+    first, second = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert first["message"] == "检索完成"
+    assert (first["request_id"], first["route"], first["upstream_ms"]) == ("req-1", "/search", 750.0)
+    assert second["level"] == "ERROR" and "ValueError: 坏数据" in second["exception"]
+
+
+def test_repeated_warnings_are_sampled():
+    sampling = SamplingFilter(window=0.05, burst=3)
+    logger = logging.getLogger("test.sampling")
+    logger.propagate = False
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    handler.addFilter(sampling)
+    logger.handlers = [handler]
+
+    def parse_failure(i):
+        logger.warning("解析文章数据失败: 第%s行", i)
+
+    for i in range(10):
+        parse_failure(i)
+    logger.error("错误不采样")
+    assert [r.getMessage() for r in records] == [
+        "解析文章数据失败: 第0行", "解析文章数据失败: 第1行", "解析文章数据失败: 第2行", "错误不采样"
+    ]
+
+    time.sleep(0.06)  # 新窗口的第一条记录带上被省略的条数
+    parse_failure(10)
+    assert records[-1].getMessage() == "解析文章数据失败: 第10行"
+    assert records[-1].suppressed == 7
+
+
+def test_full_queue_drops_without_blocking():
+    stream = io.StringIO()
+    logger, handler, _ = make_logger("test.full", stream, queue_size=2)
+    start = time.perf_counter()
+    for i in range(100):
+        logger.info("记录 %s", i)
+    assert time.perf_counter() - start < 1
+    assert handler.queue.qsize() == 2
+
+
+def test_queue_keeps_slow_output_off_the_event_loop():
+    report = logging_bench.run(records=200, concurrency=10, sink_latency=0.002)
+    assert report["queue"]["call_p50_us"] < report["sync"]["call_p50_us"] / 5
+    assert report["queue"]["written"] == report["sync"]["written"] == 200
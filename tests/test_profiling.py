@@ -0,0 +1,14 @@
+from backend.profiling import RequestProfileStore
+
+
+def test_request_profiles_are_single_flight():
+    store = RequestProfileStore()
+    profile = store.start()
+    assert profile is not None
+    assert store.start() is None  # 重叠的分析请求被拒绝
+
+    profile_id = store.finish(profile, "GET /search")
+    assert "事件循环线程" in store.render_text(profile_id)
+    again = store.start()
+    assert again is not None
+    store.finish(again, "GET /search")
@@ -0,0 +1,110 @@
+import asyncio
+import pytest
+import redis
+import backend.cache as cache_module
+from backend.cache import LocalCache, get_cached, make_cache_key, set_cached
+from backend.warming import CacheWarmer, PopularityTracker, search_cache_key
+from tests.loadtest import LOADTEST_REDIS_URL
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    client = redis.from_url(LOADTEST_REDIS_URL)
+    try:
+        client.ping()
+    except redis.ConnectionError:
+        pytest.skip("需要本地Redis")
+    client.flushdb()
+    monkeypatch.setattr(cache_module, "redis_client", client)
+    monkeypatch.setattr(cache_module, "local_cache", LocalCache(ttl=0))
+    yield client
+    client.flushdb()
+
+
+class FakeCrawler:
+    calls = []
+
+    async def search(self, query, page):
+        self.calls.append(("search", query))
+        return {"articles": [{"id": f"CJFD.{query}"}], "total_pages": 1}
+
+    async def get_article_content(self, article_id):
+        self.calls.append(("detail", article_id))
+        return {"title": article_id, "abstract": "摘要"}
+
+
+class FakeSummarizer:
+    def __init__(self, user, priority, fallback):
+        assert priority == "batch" and not fallback
+
+    async def summarize(self, article):
+        return {"summary": f"总结 {article['title']}"}
+
+
+async def crawler_factory(max_papers=100, min_citations=0):
+    return FakeCrawler()
+
+
+def test_popularity_decays_and_trims(redis_client):
+    tracker = PopularityTracker(redis_client, half_life=100, max_entries=2)
+    tracker.decay(now=0)
+    for query, count in (("人工智能", 4), ("深度学习", 1), ("知识图谱", 2)):
+        for _ in range(count):
+            tracker.record_query(query, 1, 20, 0)
+
+    tracker.decay(now=100)
+    assert [q["query"] for q in tracker.hot_queries(10)] == ["人工智能", "知识图谱"]
+    assert redis_client.zscore(tracker.queries_key, '["人工智能", 1, 20, 0]') == 2
+    assert tracker.hot_queries(1)[0] == {"query": "人工智能", "page": 1, "max_papers": 20, "min_citations": 0}
+
+    tracker.decay(now=100 * 20)  # 长期无访问后衰减到阈值以下被移除
+    assert tracker.hot_queries(10) == []
+
+
+@pytest.mark.asyncio
+async def test_warmer_refreshes_hot_entries_within_budget(redis_client):
+    FakeCrawler.calls = []
+    tracker = PopularityTracker(redis_client)
+    for query, count in (("人工智能", 3), ("深度学习", 2), ("知识图谱", 1)):
+        for _ in range(count):
+            tracker.record_query(query, 1, 20, 0)
+    for article_id, count in (("CJFD.A", 5), ("CJFD.B", 1)):
+        for _ in range(count):
+            tracker.record_article(article_id)
+
+    warmer = CacheWarmer(tracker, crawler_factory, FakeSummarizer, upstream_budget=4, llm_budget=1, fetch_delay=0)
+    assert await warmer.warm_once() == {"upstream": 4, "search": 3, "detail": 1}
+    assert FakeCrawler.calls[-1] == ("detail", "CJFD.A")
+    params = {"query": "人工智能", "page": 1, "max_papers": 20, "min_citations": 0}
+    assert get_cached(search_cache_key("search", **params), "search")["data"]["articles"][0]["id"] == "CJFD.人工智能"
+    assert get_cached(search_cache_key("search_stale", **params), "search_stale") is not None
+    assert get_cached(make_cache_key("summary", "CJFD.A"), "summary") is None  # 从未分析过的文献不生成分析
+
+    # 已刷新的条目不再请求；预算留给剩余的热门文献
+    assert await warmer.warm_once() == {"upstream": 1, "detail": 1}
+    assert await warmer.warm_once() == {}
+
+    # 即将过期的缓存提前刷新，完整分析只续期已有的缓存，每轮受大模型预算限制
+    redis_client.pexpire(search_cache_key("search", **params), 1000)
+    for article_id in ("CJFD.A", "CJFD.B"):
+        set_cached(make_cache_key("summary", article_id), {"status": "success"}, 1)
+    assert await warmer.warm_once() == {"upstream": 1, "search": 1, "llm": 1, "summary": 1}
+    assert FakeCrawler.calls[-1] == ("search", "人工智能")
+    summary = get_cached(make_cache_key("summary", "CJFD.A"), "summary")
+    assert summary["data"]["summary"] == {"summary": "总结 CJFD.A"}
+    assert get_cached(make_cache_key("summary_stale", "CJFD.A"), "summary_stale") == summary
+    assert await warmer.warm_once() == {"llm": 1, "summary": 1}
+
+
+@pytest.mark.asyncio
+async def test_disabled_warmer_still_trims_popularity(redis_client):
+    tracker = PopularityTracker(redis_client, max_entries=2)
+    tracker.decay()
+    for query in ("人工智能", "深度学习", "知识图谱"):
+        tracker.record_query(query, 1, 20, 0)
+
+    warmer = CacheWarmer(tracker, crawler_factory, FakeSummarizer, interval=0)
+    task = asyncio.create_task(warmer.start())
+    await asyncio.sleep(0.05)
+    task.cancel()
+    assert redis_client.zcard(tracker.queries_key) == 2
@@ -0,0 +1,125 @@
+import json
+
+import pytest
+import redis
+import backend.warming as warming_module
+import backend.watchlist as watchlist_module
+from backend.cache import make_cache_key
+from backend.watchlist import Watchlist
+from tests.loadtest import LOADTEST_REDIS_URL
+
+
+@pytest.fixture
+def redis_client():
+    client = redis.from_url(LOADTEST_REDIS_URL)
+    try:
+        client.ping()
+    except redis.ConnectionError:
+        pytest.skip("需要本地Redis")
+    client.flushdb()
+    yield client
+    client.flushdb()
+
+
+class FeedCrawler:
+    """按发表时间倒序返回feed中的文献，记录请求的页码"""
+
+    def __init__(self, count: int):
+        self.feed = [self._article(i) for i in range(count, 0, -1)]
+        self.fetched = []
+
+    @staticmethod
+    def _article(i: int) -> dict:
+        return {"id": f"CJFD.SIM{i:05d}", "title": f"文献{i}"}
+
+    def publish(self, count: int) -> None:
+        start = len(self.feed)
+        self.feed[:0] = [self._article(i) for i in range(start + count, start, -1)]
+
+    async def search_page(self, query: str, page: int = 1, sort_by: str = "relevance"):
+        assert sort_by == "date"
+        self.fetched.append(page)
+        return self.feed[(page - 1) * 20:page * 20], len(self.feed)
+
+
+@pytest.mark.asyncio
+async def test_refresh_stops_at_known_article(redis_client):
+    watchlist = Watchlist(redis_client, fetch_delay=0)
+    crawler = FeedCrawler(200)
+    watch = watchlist.add("alice", "深度学习", 86400)
+
+    assert await watchlist.refresh(watch, crawler) == []  # 首次刷新只建立基线
+    assert crawler.fetched == [1]
+
+    crawler.publish(3)
+    crawler.fetched.clear()
+    new_articles = await watchlist.refresh(watchlist.get(watch["id"]), crawler)
+    assert [a["id"] for a in new_articles] == ["CJFD.SIM00203", "CJFD.SIM00202", "CJFD.SIM00201"]
+    assert crawler.fetched == [1]
+
+    crawler.publish(25)
+    crawler.fetched.clear()
+    new_articles = await watchlist.refresh(watchlist.get(watch["id"]), crawler)
+    assert len(new_articles) == 25
+    assert crawler.fetched == [1, 2]
+
+    queued = [json.loads(item)["article_id"] for item in redis_client.lrange(watchlist.detail_queue_key, 0, -1)]
+    assert len(queued) == 28
+    assert queued[0] == "CJFD.SIM00201"
+    assert [hit["article"]["id"] for hit in watchlist.hits(watch["id"], limit=2)] == ["CJFD.SIM00228", "CJFD.SIM00227"]
+    assert watchlist.get(watch["id"])["last_new_count"] == 25
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_records_nothing(redis_client):
+    watchlist = Watchlist(redis_client, fetch_delay=0)
+    crawler = FeedCrawler(100)
+    watch = watchlist.add("alice", "深度学习", 86400)
+    await watchlist.refresh(watch, crawler)
+
+    crawler.publish(30)
+
+    search_page = crawler.search_page
+
+    async def fail_on_page_two(query, page, sort_by="relevance"):
+        if page == 2:
+            raise Exception("模拟上游错误")
+        return await search_page(query, page, sort_by)
+
+    crawler.search_page = fail_on_page_two
+    with pytest.raises(Exception):
+        await watchlist.refresh(watchlist.get(watch["id"]), crawler)
+    assert redis_client.llen(watchlist.detail_queue_key) == 0
+    assert watchlist.get(watch["id"])["last_error"] == "模拟上游错误"
+
+    del crawler.search_page
+    assert len(await watchlist.refresh(watchlist.get(watch["id"]), crawler)) == 30
+
+
+@pytest.mark.asyncio
+async def test_detail_queue_caches_summaries(redis_client, monkeypatch):
+    cache = {}
+    monkeypatch.setattr(watchlist_module, "get_cached", lambda key, name: cache.get(key))
+    monkeypatch.setattr(warming_module, "set_cached", lambda key, value, ttl: cache.__setitem__(key, value))
+
+    class DetailCrawler:
+        async def get_article_content(self, article_id):
+            return {"title": article_id, "abstract": "摘要"}
+
+    class Summarizer:
+        def __init__(self, user, priority, fallback):
+            assert priority == "batch" and not fallback
+
+        async def summarize(self, article):
+            return {"summary": f"总结 {article['title']}"}
+
+    watchlist = Watchlist(redis_client, fetch_delay=0)
+    for article_id in ("CJFD.A", "CJFD.B", "CJFD.A"):
+        redis_client.rpush(watchlist.detail_queue_key, json.dumps({"article_id": article_id, "attempts": 0}))
+
+    assert await watchlist.process_detail_queue(DetailCrawler(), Summarizer) == 2
+    summaries = {key: value for key, value in cache.items() if key.startswith("summary_stale:")}
+    assert len(summaries) == 2
+    assert summaries[make_cache_key("summary_stale", "CJFD.B")]["data"]["summary"] == {"summary": "总结 CJFD.B"}
+    assert cache[make_cache_key("summary", "CJFD.B")] == summaries[make_cache_key("summary_stale", "CJFD.B")]
+    assert redis_client.llen(watchlist.detail_queue_key) == 0